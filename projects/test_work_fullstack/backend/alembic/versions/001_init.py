@@ -18,8 +18,8 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
-    # Создаю enum для статуса задачи
-    taskstatus_enum = postgresql.ENUM('pending', 'in_progress', 'done', name='taskstatus')
+    # Создаю enum для статуса задачи. create_type=False - create_table ниже не должен создавать его второй раз
+    taskstatus_enum = postgresql.ENUM('pending', 'in_progress', 'done', name='taskstatus', create_type=False)
     taskstatus_enum.create(op.get_bind(), checkfirst=True)
     
     # Создаю таблицу users
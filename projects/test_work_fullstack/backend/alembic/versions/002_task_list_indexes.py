@@ -0,0 +1,54 @@
+"""task list indexes
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '002'
+down_revision: Union[str, None] = '001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Индексы под GET /tasks: WHERE user_id = ... [AND status = ...] ORDER BY created_at DESC.
+    # Создаю CONCURRENTLY вне транзакции, чтобы не блокировать запись в tasks на больших таблицах
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tasks_user_id_created_at',
+            'tasks',
+            ['user_id', sa.text('created_at DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_tasks_user_id_status_created_at',
+            'tasks',
+            ['user_id', 'status', sa.text('created_at DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_tasks_user_id_status_created_at',
+            table_name='tasks',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_tasks_user_id_created_at',
+            table_name='tasks',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
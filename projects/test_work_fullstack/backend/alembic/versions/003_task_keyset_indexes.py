@@ -0,0 +1,82 @@
+"""task keyset indexes
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Для keyset пагинации сортирую по (created_at, id) DESC и сравниваю (created_at, id) < курсор.
+    # Добавляю id в конец индексов из 002: новые покрывают и старые запросы, поэтому старые удаляю
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tasks_user_id_created_at_id',
+            'tasks',
+            ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_tasks_user_id_status_created_at_id',
+            'tasks',
+            ['user_id', 'status', sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_tasks_user_id_status_created_at',
+            table_name='tasks',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_tasks_user_id_created_at',
+            table_name='tasks',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tasks_user_id_created_at',
+            'tasks',
+            ['user_id', sa.text('created_at DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_tasks_user_id_status_created_at',
+            'tasks',
+            ['user_id', 'status', sa.text('created_at DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_tasks_user_id_status_created_at_id',
+            table_name='tasks',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_tasks_user_id_created_at_id',
+            table_name='tasks',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
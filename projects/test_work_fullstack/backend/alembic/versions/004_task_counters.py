@@ -0,0 +1,43 @@
+"""task counters
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Счетчики задач по (пользователь, статус, день) для total без COUNT(*) по всем задачам
+    op.create_table(
+        'task_counters',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('status', postgresql.ENUM(name='taskstatus', create_type=False), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('task_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'status', 'day')
+    )
+    
+    # Заполняю счетчики по уже существующим задачам
+    op.execute("""
+        INSERT INTO task_counters (user_id, status, day, task_count)
+        SELECT user_id, status, CAST(created_at AS DATE), count(*)
+        FROM tasks
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id, status, CAST(created_at AS DATE)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('task_counters')
@@ -0,0 +1,47 @@
+"""task calendar
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Календарь задач: дни и месяцы с задачами для /tasks/dates и /tasks/months
+    op.create_table(
+        'task_calendar',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('period', sa.String(length=8), nullable=False),
+        sa.Column('bucket', sa.Date(), nullable=False),
+        sa.Column('task_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'period', 'bucket')
+    )
+    
+    # Заполняю календарь по уже существующим задачам
+    op.execute("""
+        INSERT INTO task_calendar (user_id, period, bucket, task_count)
+        SELECT user_id, 'day', CAST(created_at AS DATE), count(*)
+        FROM tasks
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id, CAST(created_at AS DATE)
+        UNION ALL
+        SELECT user_id, 'month', CAST(date_trunc('month', created_at) AS DATE), count(*)
+        FROM tasks
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id, CAST(date_trunc('month', created_at) AS DATE)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('task_calendar')
@@ -0,0 +1,38 @@
+"""task events
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Журнал изменений задач для ленты GET /tasks/events: id события - позиция, с которой клиент продолжает ленту
+    op.create_table(
+        'task_events',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('task_ids', postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column('task_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_task_events_user_id_id', 'task_events', ['user_id', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_events_user_id_id', table_name='task_events')
+    op.drop_table('task_events')
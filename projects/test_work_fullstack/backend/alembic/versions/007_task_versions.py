@@ -0,0 +1,38 @@
+"""task updated_at and versions
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Время последнего изменения задачи. Для существующих задач - время создания
+    op.add_column('tasks', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE tasks SET updated_at = created_at")
+    op.alter_column('tasks', 'updated_at', nullable=False)
+
+    # Версия задач пользователя для ETag. Строка появляется при первом изменении задач,
+    # до этого версия 0, поэтому заполнять таблицу не нужно
+    op.create_table(
+        'task_versions',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('task_versions')
+    op.drop_column('tasks', 'updated_at')
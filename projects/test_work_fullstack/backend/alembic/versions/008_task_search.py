@@ -0,0 +1,65 @@
+"""task full-text search
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# То же выражение, что TASK_SEARCH_VECTOR_SQL в модели задачи
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(description, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    # tsvector для поиска q= в GET /tasks. Генерируемая колонка переписывает таблицу под эксклюзивной
+    # блокировкой: на большой таблице запись в tasks стоит на время перезаписи, запускать в окно обслуживания
+    op.add_column(
+        'tasks',
+        sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR_SQL, persisted=True))
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tasks_search_vector',
+            'tasks',
+            ['search_vector'],
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # Триграммный индекс для поиска подстроки в заголовке (TASK_SEARCH_TRIGRAM=true).
+        # pg_trgm из contrib есть не в каждой сборке Postgres - без него индекс пропускаю
+        available = op.get_bind().execute(
+            sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        ).scalar()
+        if available:
+            op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            op.create_index(
+                'ix_tasks_title_trgm',
+                'tasks',
+                ['title'],
+                postgresql_using='gin',
+                postgresql_ops={'title': 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tasks_title_trgm', table_name='tasks', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_tasks_search_vector', table_name='tasks', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('tasks', 'search_vector')
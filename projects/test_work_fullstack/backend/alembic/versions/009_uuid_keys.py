@@ -0,0 +1,235 @@
+"""uuid primary and foreign keys
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18
+
+"""
+import time
+from typing import Sequence, Union
+from alembic import op, context
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Миграции 001-007 создавали id пользователей и задач и все user_id как varchar, а модели объявляют их uuid.
+# Перевожу их в uuid (16 байт вместо 36 символов в каждой строке и записи индекса) без долгой блокировки таблиц:
+# 1. рядом с каждой колонкой добавляю колонку <колонка>_uuid, триггер заполняет ее при INSERT и UPDATE
+# 2. заполняю существующие строки пачками по диапазонам страниц (ctid), каждая пачка - своя транзакция
+# 3. строю первичный ключ и индексы по новым колонкам CONCURRENTLY, NOT NULL проверяю через CHECK ... VALIDATE
+# 4. в одной короткой транзакции меняю колонки местами: удаляю старые, переименовываю новые, ставлю
+#    первичные ключи на готовые индексы и заново создаю внешние ключи (NOT VALID, проверяю после commit)
+# Размер пачки и паузу между пачками можно задать: alembic -x uuid_batch_pages=1000 -x uuid_batch_pause=0.1 upgrade head
+# На БД, созданной через create_all (колонки уже uuid), миграция ничего не делает.
+
+# Таблица -> (колонки для перевода в uuid, первичный ключ, индексы с этими колонками: имя -> колонки индекса).
+# Первичный ключ task_events - bigint, его не трогаю. Порядок таблиц - порядок блокировок: users последней,
+# как при записи задач (сначала задача, потом проверка внешнего ключа на users), иначе возможен deadlock
+TABLES = {
+    'tasks': (('id', 'user_id'), ('id',), {
+        'ix_tasks_user_id_created_at_id': ('user_id', 'created_at DESC', 'id DESC'),
+        'ix_tasks_user_id_status_created_at_id': ('user_id', 'status', 'created_at DESC', 'id DESC'),
+    }),
+    'task_counters': (('user_id',), ('user_id', 'status', 'day'), {}),
+    'task_calendar': (('user_id',), ('user_id', 'period', 'bucket'), {}),
+    'task_events': (('user_id', 'task_ids'), None, {
+        'ix_task_events_user_id_id': ('user_id', 'id'),
+    }),
+    'task_versions': (('user_id',), ('user_id',), {}),
+    'users': (('id',), ('id',), {}),
+}
+
+# Сколько страниц таблицы (по 8 КБ) заполнять за одну транзакцию
+DEFAULT_BATCH_PAGES = 1000
+# Сколько ждать блокировку таблиц (шаги 1 и 4), если они заняты: лучше упасть и повторить миграцию,
+# чем стоять в очереди за долгой транзакцией и блокировать все запросы к задачам
+LOCK_TIMEOUT = '5s'
+
+
+def shadow(column: str) -> str:
+    return f'{column}_uuid'
+
+
+# Колонки таблицы, которые еще не uuid: имя -> (тип в uuid, NOT NULL)
+def varchar_columns(bind, table: str, columns: tuple) -> dict:
+    rows = bind.execute(sa.text("""
+        SELECT column_name, udt_name, is_nullable
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = :table AND column_name = ANY(:columns)
+    """), {"table": table, "columns": list(columns)}).all()
+    result = {}
+    for name, udt_name, is_nullable in rows:
+        if udt_name == 'varchar':
+            result[name] = ('uuid', is_nullable == 'NO')
+        elif udt_name == '_varchar':
+            result[name] = ('uuid[]', is_nullable == 'NO')
+    return result
+
+
+def plan(bind) -> dict:
+    result = {}
+    for table, (columns, pk, indexes) in TABLES.items():
+        convert = varchar_columns(bind, table, columns)
+        if convert:
+            result[table] = (convert, pk, indexes)
+    return result
+
+
+def sync_function(table: str) -> str:
+    return f'{table}_uuid_sync'
+
+
+def constraint_exists(bind, name: str) -> bool:
+    return bind.execute(sa.text("SELECT 1 FROM pg_constraint WHERE conname = :name"), {"name": name}).scalar() is not None
+
+
+# Внешние ключи на users: (таблица, имя, определение) - снимаю их на время смены типа и создаю заново
+def user_foreign_keys(bind) -> list:
+    return bind.execute(sa.text("""
+        SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE contype = 'f' AND confrelid = 'users'::regclass
+    """)).all()
+
+
+# Блокирую все таблицы шага одной командой в порядке TABLES. Вызывать в транзакции
+def lock_tables(tables: dict) -> None:
+    op.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+    op.execute(f"LOCK TABLE {', '.join(tables)} IN ACCESS EXCLUSIVE MODE")
+
+
+# Шаг 1: колонки-двойники и триггер, который заполняет их у новых и измененных строк
+def add_shadow_columns(table: str, convert: dict) -> None:
+    for column, (uuid_type, _) in convert.items():
+        op.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {shadow(column)} {uuid_type}')
+    assignments = ' '.join(
+        f'NEW.{shadow(column)} := NEW.{column}::{uuid_type};' for column, (uuid_type, _) in convert.items()
+    )
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION {sync_function(table)}() RETURNS trigger AS $$
+        BEGIN
+            {assignments}
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(f'DROP TRIGGER IF EXISTS {sync_function(table)} ON {table}')
+    op.execute(
+        f'CREATE TRIGGER {sync_function(table)} BEFORE INSERT OR UPDATE ON {table} '
+        f'FOR EACH ROW EXECUTE FUNCTION {sync_function(table)}()'
+    )
+
+
+# Шаг 2: заполняю существующие строки пачками по batch_pages страниц. Строки, добавленные или перенесенные
+# UPDATE за уже пройденную границу, заполнил триггер. Вызывать в autocommit_block: каждая пачка - своя транзакция
+def backfill(bind, table: str, convert: dict, batch_pages: int, pause: float) -> None:
+    pages = bind.execute(
+        sa.text("SELECT pg_relation_size(CAST(:table AS regclass)) / current_setting('block_size')::int"),
+        {"table": table}
+    ).scalar()
+    missing = ' OR '.join(
+        f'({shadow(column)} IS NULL AND {column} IS NOT NULL)' for column in convert
+    )
+    assignments = ', '.join(f'{shadow(column)} = {column}::{uuid_type}' for column, (uuid_type, _) in convert.items())
+    for start in range(0, pages + 1, batch_pages):
+        bind.execute(sa.text(f"""
+            UPDATE {table} SET {assignments}
+            WHERE ctid >= '({start},0)'::tid AND ctid < '({start + batch_pages},0)'::tid AND ({missing})
+        """))
+        if pause:
+            time.sleep(pause)
+
+
+# Колонки индекса по колонкам-двойникам: 'user_id' -> 'user_id_uuid', 'id DESC' -> 'id_uuid DESC'
+def shadow_index_columns(index_columns: tuple, convert: dict) -> list:
+    result = []
+    for spec in index_columns:
+        column, _, order = spec.partition(' ')
+        if column in convert:
+            column = shadow(column)
+        result.append(sa.text(f'{column} {order}'.strip()))
+    return result
+
+
+# Шаг 3: CHECK NOT NULL (VALIDATE не блокирует запись, а SET NOT NULL с проверенным CHECK не читает таблицу)
+# и индексы по новым колонкам. Вызывать в autocommit_block
+def build_shadow_indexes(bind, table: str, convert: dict, pk: tuple, indexes: dict) -> None:
+    for column, (_, not_null) in convert.items():
+        name = f'{table}_{shadow(column)}_not_null'
+        if not_null and not constraint_exists(bind, name):
+            op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} CHECK ({shadow(column)} IS NOT NULL) NOT VALID')
+            op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {name}')
+    if pk:
+        op.create_index(f'{table}_pkey_uuid', table, shadow_index_columns(pk, convert), unique=True,
+                        postgresql_concurrently=True, if_not_exists=True)
+    for name, index_columns in indexes.items():
+        op.create_index(f'{name}_uuid', table, shadow_index_columns(index_columns, convert),
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+# Шаг 4: меняю колонки местами. Старые колонки удаляю вместе с их индексами и первичным ключом
+# (место освободит следующий VACUUM FULL / pg_repack, DROP COLUMN таблицу не переписывает)
+def swap_columns(table: str, convert: dict, pk: tuple, indexes: dict) -> None:
+    op.execute(f'DROP TRIGGER {sync_function(table)} ON {table}')
+    op.execute(f'DROP FUNCTION {sync_function(table)}()')
+    for column, (_, not_null) in convert.items():
+        op.execute(f'ALTER TABLE {table} DROP COLUMN {column}')
+        op.execute(f'ALTER TABLE {table} RENAME COLUMN {shadow(column)} TO {column}')
+        if not_null:
+            op.execute(f'ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL')
+            op.execute(f'ALTER TABLE {table} DROP CONSTRAINT {table}_{shadow(column)}_not_null')
+    if pk:
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY USING INDEX {table}_pkey_uuid')
+    for name in indexes:
+        op.execute(f'ALTER INDEX {name}_uuid RENAME TO {name}')
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    tables = plan(bind)
+    if not tables:
+        return
+    x_args = context.get_x_argument(as_dictionary=True)
+    batch_pages = int(x_args.get('uuid_batch_pages', DEFAULT_BATCH_PAGES))
+    pause = float(x_args.get('uuid_batch_pause', 0))
+
+    lock_tables(tables)
+    for table, (convert, _, _) in tables.items():
+        add_shadow_columns(table, convert)
+
+    with op.get_context().autocommit_block():
+        for table, (convert, pk, indexes) in tables.items():
+            backfill(bind, table, convert, batch_pages, pause)
+            build_shadow_indexes(bind, table, convert, pk, indexes)
+
+    lock_tables(tables)
+    foreign_keys = user_foreign_keys(bind)
+    for table, name, _ in foreign_keys:
+        op.execute(f'ALTER TABLE {table} DROP CONSTRAINT {name}')
+    for table, (convert, pk, indexes) in tables.items():
+        swap_columns(table, convert, pk, indexes)
+    for table, name, definition in foreign_keys:
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition} NOT VALID')
+
+    # Проверка внешних ключей читает таблицы, но не блокирует запись
+    with op.get_context().autocommit_block():
+        for table, name, _ in foreign_keys:
+            op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {name}')
+
+
+# Обратно в varchar - ALTER COLUMN TYPE с перезаписью таблиц под блокировкой, без пачек
+def downgrade() -> None:
+    bind = op.get_bind()
+    foreign_keys = user_foreign_keys(bind)
+    for table, name, _ in foreign_keys:
+        op.execute(f'ALTER TABLE {table} DROP CONSTRAINT {name}')
+    for table, (columns, _, _) in TABLES.items():
+        for column in columns:
+            varchar_type = 'varchar[]' if column == 'task_ids' else 'varchar'
+            op.execute(f'ALTER TABLE {table} ALTER COLUMN {column} TYPE {varchar_type} USING {column}::{varchar_type}')
+    for table, name, definition in foreign_keys:
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}')
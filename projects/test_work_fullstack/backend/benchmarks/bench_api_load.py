@@ -0,0 +1,477 @@
+# Нагрузочный тест API задач: засеваю БД пользователями и задачами, гоняю смесь запросов как у живых
+# клиентов (вход, список задач с каждым фильтром, поиск, следующая страница, даты, месяцы, CRUD) и печатаю
+# по каждой операции запросы в секунду, p50/p95/p99 и SQL запросы на запрос. Результат можно сохранить в JSON
+# (--json) и сравнить с прошлым прогоном (--compare), например до и после коммита.
+# Режимы: asgi - приложение в этом же процессе через httpx.ASGITransport (без сети и uvicorn),
+# http - уже запущенный сервер по --url (run.py, uvicorn), как в продакшене. Генератор нагрузки тоже тратит CPU,
+# на одной машине с сервером он отнимает его у сервера - для абсолютных цифр лучше запускать с другой машины.
+# SQL запросы на запрос беру из разницы /metrics (http_request_db_queries) до и после замера, поэтому на сервере
+# нужен METRICS_ENABLED=true (по умолчанию включено), а с другой машины - тот же MONITORING_TOKEN, что у сервера.
+# Пользователи load-000000@example.com... засеваются один раз и переиспользуются, пока совпадает их количество
+# и число задач. Кеш задач и ETag работают как в приложении; без кеша - TASK_CACHE_BACKEND=none у сервера.
+# Запуск из папки backend:
+#   python -m benchmarks.bench_api_load --users 100 --tasks 100000 --duration 30 --json before.json
+#   python -m benchmarks.bench_api_load --mode http --url http://127.0.0.1:8000 --compare before.json
+import argparse
+import asyncio
+import json
+import platform
+import random
+import re
+import subprocess
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import httpx
+from sqlalchemy import text, select, func
+
+from src.core.config import DB_MODE, MONITORING_TOKEN
+from src.core.database import engine, Base
+from src.auth.security import hash_password
+from src.models import User, Task
+from src.schemas.task import TaskStatus
+from src.services.task_counters import rebuild_counters_statements
+from src.services.task_calendar import rebuild_calendar_statements
+
+LOAD_EMAIL = "load-{:06d}@example.com"
+LOAD_EMAIL_PATTERN = "load-%@example.com"
+LOAD_PASSWORD = "load-password"
+# Задачи засеваю за последние SEED_DAYS дней, фильтры по дате и месяцу выбираю из этого же периода
+SEED_DAYS = 730
+PAGE_SIZE = 20
+
+# Операция -> (метод, шаблон пути роута в /metrics)
+OPERATIONS = {
+    "login": ("POST", "/auth/login"),
+    "list": ("GET", "/tasks"),
+    "list_status": ("GET", "/tasks"),
+    "list_date": ("GET", "/tasks"),
+    "list_day_group": ("GET", "/tasks"),
+    "list_month": ("GET", "/tasks"),
+    "list_search": ("GET", "/tasks"),
+    "list_next_page": ("GET", "/tasks"),
+    "dates": ("GET", "/tasks/dates"),
+    "months": ("GET", "/tasks/months"),
+    "get": ("GET", "/tasks/{task_id}"),
+    "create": ("POST", "/tasks"),
+    "update": ("PUT", "/tasks/{task_id}"),
+    "delete": ("DELETE", "/tasks/{task_id}"),
+}
+
+# Смеси операций: веса (доли запросов). Можно задать свою: --mix "list=5,create=1"
+MIXES = {
+    # Обычный клиент: в основном читает список с фильтрами, иногда меняет задачи, редко входит заново
+    "default": {
+        "login": 1, "list": 25, "list_status": 10, "list_date": 5, "list_day_group": 5, "list_month": 5,
+        "list_search": 5, "list_next_page": 5, "dates": 5, "months": 5, "get": 10,
+        "create": 8, "update": 6, "delete": 5,
+    },
+    "read": {
+        "list": 30, "list_status": 10, "list_date": 10, "list_day_group": 10, "list_month": 10,
+        "list_search": 5, "list_next_page": 10, "dates": 5, "months": 5, "get": 5,
+    },
+    "write": {"list": 10, "get": 10, "create": 40, "update": 25, "delete": 15},
+    "login": {"login": 1},
+}
+
+
+def parse_mix(value: str) -> dict:
+    if value in MIXES:
+        return MIXES[value]
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Неизвестная операция {name}, есть: {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# Сколько сейчас засеяно пользователей нагрузочного теста и их задач
+def seeded_counts() -> tuple[int, int]:
+    with engine.connect() as conn:
+        users = conn.execute(select(func.count()).select_from(User).where(User.email.like(LOAD_EMAIL_PATTERN))).scalar()
+        tasks = conn.execute(
+            select(func.count()).select_from(Task).join(User, User.id == Task.user_id)
+            .where(User.email.like(LOAD_EMAIL_PATTERN))
+        ).scalar()
+    return users, tasks
+
+
+# Удаляю пользователей нагрузочного теста и все их строки (задачи, счетчики, календарь, события, версии)
+def drop_load_users() -> None:
+    load_users = select(User.id).where(User.email.like(LOAD_EMAIL_PATTERN))
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            if "user_id" in table.c:
+                conn.execute(table.delete().where(table.c.user_id.in_(load_users)))
+        conn.execute(User.__table__.delete().where(User.email.like(LOAD_EMAIL_PATTERN)))
+
+
+# Засеваю users пользователей и tasks задач (по кругу между пользователями) двумя INSERT ... SELECT, потом
+# пересчитываю счетчики и календарь. Пароль у всех один и хеширую его один раз: bcrypt на каждого
+# пользователя засевал бы тысячи пользователей минутами
+def seed(users: int, tasks: int) -> None:
+    statuses = list(Task.status.type.enums)
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO users (id, email, password, created_at)
+            SELECT gen_random_uuid(), 'load-' || lpad(n::text, 6, '0') || '@example.com', :password,
+                   now() AT TIME ZONE 'utc'
+            FROM generate_series(0, :users - 1) AS n
+        """), {"users": users, "password": hash_password(LOAD_PASSWORD)})
+        # `+ n * interval '0 s'` делает LATERAL зависимым от строки, иначе random() посчитается один раз
+        conn.execute(text(f"""
+            INSERT INTO tasks (id, title, description, status, created_at, updated_at, user_id)
+            SELECT
+                gen_random_uuid(),
+                'Задача ' || n,
+                CASE WHEN n % 3 = 0 THEN NULL ELSE 'Описание задачи номер ' || n END,
+                (ARRAY[{", ".join(f"'{s}'" for s in statuses)}])[1 + n % {len(statuses)}]::taskstatus,
+                t,
+                t,
+                u.id
+            FROM generate_series(1, :tasks) AS n
+            JOIN (
+                SELECT id, row_number() OVER (ORDER BY email) - 1 AS k FROM users WHERE email LIKE :pattern
+            ) AS u ON u.k = n % :users,
+            LATERAL (SELECT now() AT TIME ZONE 'utc' - (random() * interval '{SEED_DAYS} days') + n * interval '0 s') AS ts(t)
+        """), {"tasks": tasks, "users": users, "pattern": LOAD_EMAIL_PATTERN})
+        # Счетчики и календарь пересчитываю целиком: одним проходом по задачам быстрее, чем по пользователю
+        for stmt in rebuild_counters_statements() + rebuild_calendar_statements():
+            conn.execute(stmt)
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("ANALYZE users, tasks, task_counters, task_calendar"))
+
+
+def prepare_data(users: int, tasks: int, reseed: bool) -> None:
+    if not reseed and seeded_counts() == (users, tasks):
+        return
+    print(f"Засеваю {users} пользователей и {tasks} задач...")
+    start = time.perf_counter()
+    drop_load_users()
+    seed(users, tasks)
+    print(f"Засеяно за {time.perf_counter() - start:.1f} с")
+
+
+# Латентности и статусы ответов по операциям
+class Recorder:
+    def __init__(self):
+        self.enabled = False
+        self.latencies: dict[str, list] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, operation: str, latency_ms: float, status) -> None:
+        if self.enabled:
+            self.latencies[operation].append(latency_ms)
+            self.statuses[operation][str(status)] += 1
+
+
+# Один клиент: свой пользователь и токен, id задач, которые видел в ответах, и курсор следующей страницы
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, email: str, rng: random.Random, recorder: Recorder, tasks: int):
+        self.client = client
+        self.email = email
+        self.rng = rng
+        self.recorder = recorder
+        self.tasks = tasks
+        self.headers = {}
+        self.seen_ids: list = []
+        self.created_ids: list = []
+        self.next_cursor: Optional[str] = None
+
+    async def request(self, operation: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            response, status = None, e.__class__.__name__
+        self.recorder.record(operation, (time.perf_counter() - start) * 1000, status)
+        return response
+
+    async def login(self, operation: str = "login") -> None:
+        response = await self.request(operation, "POST", "/auth/login", json={"email": self.email, "password": LOAD_PASSWORD})
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def list_tasks(self, operation: str, **params) -> None:
+        response = await self.request(operation, "GET", "/tasks", params={"limit": PAGE_SIZE, **params})
+        if response is not None and response.status_code == 200:
+            body = response.json()
+            self.next_cursor = body.get("next_cursor")
+            self.seen_ids = [task["id"] for task in body["tasks"]] or self.seen_ids
+
+    def random_day(self) -> date:
+        return (datetime.utcnow() - timedelta(days=self.rng.randrange(SEED_DAYS))).date()
+
+    # Задача для get/update: своя созданная или увиденная в списке
+    def known_id(self) -> Optional[str]:
+        ids = self.created_ids or self.seen_ids
+        if self.created_ids and self.seen_ids:
+            ids = self.rng.choice((self.created_ids, self.seen_ids))
+        return self.rng.choice(ids) if ids else None
+
+    async def run(self, operation: str) -> None:
+        rng = self.rng
+        if operation == "login":
+            await self.login()
+        elif operation == "list":
+            await self.list_tasks(operation)
+        elif operation == "list_status":
+            await self.list_tasks(operation, status=rng.choice(list(TaskStatus)).value)
+        elif operation == "list_date":
+            await self.list_tasks(operation, date=self.random_day().isoformat())
+        elif operation == "list_day_group":
+            await self.list_tasks(operation, day_group=rng.choice(("today", "yesterday", "week", "month")))
+        elif operation == "list_month":
+            await self.list_tasks(operation, month=self.random_day().strftime("%Y-%m"))
+        elif operation == "list_search":
+            await self.list_tasks(operation, q=str(rng.randint(1, max(1, self.tasks))))
+        elif operation == "list_next_page":
+            if self.next_cursor:
+                await self.list_tasks(operation, cursor=self.next_cursor)
+            else:
+                await self.list_tasks(operation)
+        elif operation in ("dates", "months"):
+            await self.request(operation, "GET", f"/tasks/{operation}")
+        elif operation == "create":
+            response = await self.request(operation, "POST", "/tasks", json={
+                "title": f"Нагрузка {rng.randrange(10**6)}", "description": "Задача нагрузочного теста",
+            })
+            if response is not None and response.status_code == 201:
+                self.created_ids.append(response.json()["id"])
+        elif operation == "delete":
+            # Удаляю только свои созданные задачи, чтобы засеянные данные не таяли от прогона к прогону
+            if self.created_ids:
+                task_id = self.created_ids.pop(rng.randrange(len(self.created_ids)))
+                if task_id in self.seen_ids:
+                    self.seen_ids.remove(task_id)
+                await self.request(operation, "DELETE", f"/tasks/{task_id}")
+        else:
+            task_id = self.known_id()
+            if task_id is None:
+                await self.list_tasks("list")
+            elif operation == "get":
+                await self.request(operation, "GET", f"/tasks/{task_id}")
+            elif operation == "update":
+                await self.request(operation, "PUT", f"/tasks/{task_id}", json={
+                    "status": rng.choice(list(TaskStatus)).value,
+                })
+
+
+# Суммы и количества гистограмм /metrics по (метрика, метод, роут). Без /metrics (выключены или нет доступа) - None.
+# С другой машины /metrics отдается только с MONITORING_TOKEN сервера
+async def metrics_snapshot(client: httpx.AsyncClient) -> Optional[dict]:
+    headers = {"Authorization": f"Bearer {MONITORING_TOKEN}"} if MONITORING_TOKEN else None
+    try:
+        response = await client.get("/metrics", headers=headers)
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+    values = {}
+    pattern = re.compile(r'^(\w+)_(sum|count)\{method="([^"]*)",route="([^"]*)"\} (\S+)$')
+    for line in response.text.splitlines():
+        match = pattern.match(line)
+        if match:
+            name, kind, method, route, value = match.groups()
+            values[(name, kind, method, route)] = float(value)
+    return values
+
+
+# Среднее на запрос по роутам за время замера: SQL запросы, время БД и время вне БД
+def route_costs(before: Optional[dict], after: Optional[dict]) -> dict:
+    if before is None or after is None:
+        return {}
+    routes = {}
+    for (name, kind, method, route), value in after.items():
+        if kind != "sum":
+            continue
+        count = after.get((name, "count", method, route), 0) - before.get((name, "count", method, route), 0)
+        if count <= 0:
+            continue
+        total = value - before.get((name, kind, method, route), 0)
+        entry = routes.setdefault(f"{method} {route}", {"requests": int(count)})
+        if name == "http_request_db_queries":
+            entry["db_queries"] = round(total / count, 2)
+        elif name == "http_request_db_duration_seconds":
+            entry["db_ms"] = round(total / count * 1000, 3)
+        elif name == "http_request_app_duration_seconds":
+            entry["app_ms"] = round(total / count * 1000, 3)
+    return routes
+
+
+def percentile(values: list, q: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def summarize(recorder: Recorder, duration: float, costs: dict) -> dict:
+    operations = {}
+    all_latencies = []
+    for operation, latencies in sorted(recorder.latencies.items()):
+        latencies.sort()
+        all_latencies.extend(latencies)
+        statuses = recorder.statuses[operation]
+        method, route = OPERATIONS[operation]
+        operations[operation] = {
+            "requests": len(latencies),
+            "rps": round(len(latencies) / duration, 2),
+            "p50_ms": round(percentile(latencies, 0.50), 3),
+            "p95_ms": round(percentile(latencies, 0.95), 3),
+            "p99_ms": round(percentile(latencies, 0.99), 3),
+            "max_ms": round(latencies[-1], 3),
+            "errors": sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 400),
+            "statuses": dict(statuses),
+            "db_queries": costs.get(f"{method} {route}", {}).get("db_queries"),
+        }
+    all_latencies.sort()
+    total = {
+        "requests": len(all_latencies),
+        "rps": round(len(all_latencies) / duration, 2),
+        "errors": sum(item["errors"] for item in operations.values()),
+    }
+    if all_latencies:
+        total.update({
+            "p50_ms": round(percentile(all_latencies, 0.50), 3),
+            "p95_ms": round(percentile(all_latencies, 0.95), 3),
+            "p99_ms": round(percentile(all_latencies, 0.99), 3),
+        })
+    return {"total": total, "operations": operations, "routes": costs}
+
+
+async def drive(client: httpx.AsyncClient, args, mix: dict) -> dict:
+    recorder = Recorder()
+    names, weights = list(mix), list(mix.values())
+    users = [
+        VirtualUser(client, LOAD_EMAIL.format(i % args.users), random.Random(args.seed * 1000 + i), recorder, args.tasks)
+        for i in range(args.concurrency)
+    ]
+    # Вхожу всеми клиентами до замера (bcrypt), вход в смеси - отдельная операция
+    await asyncio.gather(*(user.login() for user in users))
+    if not all(user.headers for user in users):
+        raise SystemExit("Не удалось войти пользователями нагрузочного теста, проверьте засев и --url")
+
+    stop_at = 0.0
+
+    async def worker(user: VirtualUser) -> None:
+        while time.perf_counter() < stop_at:
+            await user.run(user.rng.choices(names, weights)[0])
+
+    stop_at = time.perf_counter() + args.warmup
+    await asyncio.gather(*(worker(user) for user in users))
+
+    before = await metrics_snapshot(client)
+    recorder.enabled = True
+    started = time.perf_counter()
+    stop_at = started + args.duration
+    await asyncio.gather(*(worker(user) for user in users))
+    duration = time.perf_counter() - started
+    recorder.enabled = False
+    after = await metrics_snapshot(client)
+    # Удаляю оставшиеся созданные задачи вне замера: число задач не меняется и следующий прогон не засевает заново
+    for user in users:
+        while user.created_ids:
+            await user.run("delete")
+    return summarize(recorder, duration, route_costs(before, after))
+
+
+async def run_asgi(args, mix: dict) -> dict:
+    from src.main import app
+    # ASGITransport не запускает lifespan, а в нем стартует пул хеширования паролей и лента изменений
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=args.timeout) as client:
+            return await drive(client, args, mix)
+
+
+async def run_http(args, mix: dict) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        return await drive(client, args, mix)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+        return revision + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: dict, previous: Optional[dict]) -> None:
+    print(f"\n{'operation':<16}{'requests':>9}{'rps':>9}{'p50, ms':>9}{'p95, ms':>9}{'p99, ms':>9}{'errors':>8}{'SQL/req':>9}")
+    rows = list(report["operations"].items()) + [("total", report["total"])]
+    for name, item in rows:
+        queries = item.get("db_queries")
+        print(f"{name:<16}{item['requests']:>9}{item['rps']:>9.1f}{item.get('p50_ms', 0):>9.2f}"
+              f"{item.get('p95_ms', 0):>9.2f}{item.get('p99_ms', 0):>9.2f}{item['errors']:>8}"
+              f"{'-' if queries is None else f'{queries:.2f}':>9}")
+    if previous is None:
+        return
+    print(f"\nСравнение с {previous['meta'].get('revision')} (новое / старое):")
+    print(f"{'operation':<16}{'rps':>9}{'p50':>9}{'p99':>9}")
+    old_rows = dict(previous["operations"], total=previous["total"])
+    for name, item in rows:
+        old = old_rows.get(name)
+        if not old or not old.get("rps") or not old.get("p50_ms") or not old.get("p99_ms"):
+            continue
+        print(f"{name:<16}{item['rps'] / old['rps']:>9.2f}{item.get('p50_ms', 0) / old['p50_ms']:>9.2f}"
+              f"{item.get('p99_ms', 0) / old['p99_ms']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест API задач")
+    parser.add_argument("--mode", choices=("asgi", "http"), default="asgi", help="Приложение в процессе или сервер по --url")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Адрес сервера для --mode http")
+    parser.add_argument("--users", type=int, default=100, help="Сколько пользователей засеять")
+    parser.add_argument("--tasks", type=int, default=100_000, help="Сколько задач засеять (всего, по кругу между пользователями)")
+    parser.add_argument("--reseed", action="store_true", help="Засеять заново, даже если данные уже есть")
+    parser.add_argument("--concurrency", type=int, default=16, help="Сколько клиентов одновременно")
+    parser.add_argument("--duration", type=float, default=30, help="Сколько секунд замер")
+    parser.add_argument("--warmup", type=float, default=5, help="Сколько секунд прогрев перед замером")
+    parser.add_argument("--mix", type=parse_mix, default="default", help=f"Смесь операций: {', '.join(MIXES)} или op=вес,...")
+    parser.add_argument("--seed", type=int, default=1, help="Seed случайных операций и параметров")
+    parser.add_argument("--timeout", type=float, default=30, help="Таймаут одного запроса, с")
+    parser.add_argument("--json", dest="json_path", help="Сохранить результаты в JSON файл")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--cleanup", action="store_true", help="Удалить пользователей нагрузочного теста после замера")
+    args = parser.parse_args()
+
+    prepare_data(args.users, args.tasks, args.reseed)
+    runner = run_asgi if args.mode == "asgi" else run_http
+    report = asyncio.run(runner(args, args.mix))
+    report["meta"] = {
+        "revision": git_revision(),
+        "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "mode": args.mode,
+        "db_mode": DB_MODE if args.mode == "asgi" else None,
+        "users": args.users,
+        "tasks": args.tasks,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "mix": args.mix,
+        "seed": args.seed,
+        "python": platform.python_version(),
+    }
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+    print_report(report, previous)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.cleanup:
+        drop_load_users()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# Бенчмарк накладных расходов метрик /metrics: тот же запрос через роутер приложения без метрик и через
+# MetricsMiddleware с событиями SQLAlchemy на движках. Запросы идут напрямую в ASGI приложение, без HTTP
+# клиента и сети, поэтому доля накладных расходов здесь больше, чем будет под uvicorn.
+# Замеряю GET /health (без БД), GET /tasks (кеш задач сбрасываю перед каждым запросом, чтобы запрос шел в БД)
+# и отдельно один SELECT 1 с событиями и без.
+# Запуск из папки backend: python -m benchmarks.bench_request_metrics --tasks 1000
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from sqlalchemy import text
+
+from src.main import app
+from src.auth.security import create_access_token
+from src.core.database import engine, async_engine
+from src.core.config import METRICS_ENABLED
+from src.core.request_metrics import MetricsMiddleware, instrument_engine, uninstrument_engine
+from src.services.task_service import task_cache
+from benchmarks.common import prepare_user, drop_user
+
+BENCH_EMAIL = "bench-metrics@example.com"
+
+
+# Один GET запрос в ASGI приложение, возвращаю статус
+async def asgi_get(asgi_app, path: str, query: str = "", headers: dict = None) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+        "app": app,
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await asgi_app(scope, receive, send)
+    return status
+
+
+def set_engine_events(enabled: bool) -> None:
+    for target in (engine, async_engine.sync_engine):
+        if enabled:
+            instrument_engine(target)
+        else:
+            uninstrument_engine(target)
+
+
+# Замеряю варианты по очереди на каждом повторе (off, on, off, on...), а не сначала все off, потом все on:
+# иначе прогрев кешей Postgres и интерпретатора по ходу замера попадает в разницу между вариантами.
+# variants - имя -> (включить события на движках, функция запроса). Статистика в миллисекундах, как в measure
+def measure_interleaved(variants: dict, repeat: int, warmup: int = 20) -> dict:
+    timings = {name: [] for name in variants}
+    for i in range(warmup + repeat):
+        for name, (engine_events, fn) in variants.items():
+            set_engine_events(engine_events)
+            start = time.perf_counter()
+            fn()
+            if i >= warmup:
+                timings[name].append((time.perf_counter() - start) * 1000)
+    result = {}
+    for name, values in timings.items():
+        values.sort()
+        result[name] = {
+            "p50_ms": round(statistics.median(values), 4),
+            "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))], 4),
+            "min_ms": round(values[0], 4),
+            "mean_ms": round(statistics.fmean(values), 4),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Накладные расходы метрик запросов (/metrics)")
+    parser.add_argument("--tasks", type=int, default=1000, help="Сколько задач у пользователя")
+    parser.add_argument("--repeat", type=int, default=2000, help="Повторов на запрос")
+    parser.add_argument("--json", dest="json_path", help="Сохранить результаты в JSON файл")
+    parser.add_argument("--cleanup", action="store_true", help="Удалить пользователя бенчмарка после замера")
+    args = parser.parse_args()
+
+    user_id = prepare_user(BENCH_EMAIL, args.tasks)
+    headers = {"Authorization": f"Bearer {create_access_token(user_id)}"}
+    loop = asyncio.new_event_loop()
+    variants = {"off": app.router, "on": MetricsMiddleware(app.router)}
+
+    def list_tasks(asgi_app):
+        task_cache.clear()
+        return loop.run_until_complete(asgi_get(asgi_app, "/tasks", "limit=20", headers))
+
+    requests = {
+        "health": lambda asgi_app: loop.run_until_complete(asgi_get(asgi_app, "/health")),
+        "list_tasks": list_tasks,
+    }
+    report = {"tasks": args.tasks, "requests": {}}
+    for name, request in requests.items():
+        assert request(variants["on"]) == 200
+        # События на движках включаю только для варианта с метриками
+        report["requests"][name] = measure_interleaved({
+            variant: (variant == "on", lambda asgi_app=asgi_app: request(asgi_app))
+            for variant, asgi_app in variants.items()
+        }, args.repeat)
+
+    with engine.connect() as conn:
+        select_one = text("SELECT 1")
+        report["requests"]["select_1"] = measure_interleaved({
+            variant: (variant == "on", lambda: conn.execute(select_one).scalar()) for variant in ("off", "on")
+        }, args.repeat)
+    # Возвращаю движки в состояние, которое задает конфиг
+    set_engine_events(METRICS_ENABLED)
+    loop.close()
+
+    print(f"\n{'p50, ms':<12}{'off':>10}{'on':>10}{'overhead, us':>14}{'overhead, %':>13}")
+    for name, result in report["requests"].items():
+        off, on = result["off"]["p50_ms"], result["on"]["p50_ms"]
+        print(f"{name:<12}{off:>10.3f}{on:>10.3f}{(on - off) * 1000:>14.1f}{(on - off) / off * 100:>13.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.cleanup:
+        drop_user(BENCH_EMAIL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# Бенчмарк вставки с id uuid4 против UUIDv7 (src/core/ids.py): задачи грузятся через COPY пачками в две
+# одинаковые таблицы bench_ids.tasks_v4 и bench_ids.tasks_v7 с первичным ключом uuid. Случайные uuid4 пишут
+# в случайные страницы индекса ключа: когда индекс перестает помещаться в shared_buffers, растут чтения с диска,
+# деления страниц и WAL (после checkpoint каждая впервые измененная страница пишется в WAL целиком).
+# На каждом отрезке в --step строк печатаю строк в секунду, WAL на строку и чтения страниц индекса.
+# Запуск из папки backend: python -m benchmarks.bench_task_ids --rows 10000000
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import text
+
+from src.core.database import engine
+from src.core.ids import uuid7
+
+SCHEMA = "bench_ids"
+GENERATORS = {
+    "v4": lambda at: str(uuid.uuid4()),
+    "v7": uuid7,
+}
+
+
+def prepare_tables() -> None:
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        for name in GENERATORS:
+            conn.execute(text(f"""
+                CREATE TABLE {SCHEMA}.tasks_{name} (
+                    id uuid PRIMARY KEY,
+                    title varchar(200) NOT NULL,
+                    created_at timestamp NOT NULL,
+                    user_id uuid
+                )
+            """))
+
+
+# Позиция WAL и прочитанные с диска страницы индекса ключа (не из shared_buffers)
+def counters(cursor, name: str) -> tuple[int, int]:
+    cursor.execute(f"""
+        SELECT (pg_current_wal_lsn() - '0/0'::pg_lsn)::bigint, coalesce(idx_blks_read, 0)
+        FROM pg_statio_user_indexes WHERE schemaname = '{SCHEMA}' AND indexrelname = 'tasks_{name}_pkey'
+    """)
+    return cursor.fetchone()
+
+
+# Гружу rows строк пачками по batch (пачка - транзакция), id генерирую до COPY и в замер не включаю
+def load(name: str, rows: int, batch: int, step: int) -> list[dict]:
+    generate = GENERATORS[name]
+    user_id = str(uuid.uuid4())
+    segments = []
+    raw = engine.raw_connection()
+    try:
+        connection = raw.driver_connection
+        with connection.cursor() as cursor:
+            wal, blocks_read = counters(cursor, name)
+            seconds = 0.0
+            for start in range(0, rows, batch):
+                now = datetime.utcnow()
+                data = [(generate(now), "Задача", now, user_id) for _ in range(min(batch, rows - start))]
+                began = time.perf_counter()
+                with cursor.copy(f"COPY {SCHEMA}.tasks_{name} (id, title, created_at, user_id) FROM STDIN") as copy:
+                    for row in data:
+                        copy.write_row(row)
+                connection.commit()
+                seconds += time.perf_counter() - began
+
+                done = start + len(data)
+                if done % step == 0 or done == rows:
+                    connection.commit()
+                    new_wal, new_blocks_read = counters(cursor, name)
+                    count = done - (segments[-1]["rows"] if segments else 0)
+                    segments.append({
+                        "rows": done,
+                        "rows_per_second": round(count / seconds),
+                        "wal_bytes_per_row": round((new_wal - wal) / count, 1),
+                        "index_blocks_read": new_blocks_read - blocks_read,
+                    })
+                    wal, blocks_read, seconds = new_wal, new_blocks_read, 0.0
+                    print(f"{name} {done:>11,} {segments[-1]['rows_per_second']:>10,} rows/s "
+                          f"{segments[-1]['wal_bytes_per_row']:>8} WAL B/row "
+                          f"{segments[-1]['index_blocks_read']:>9,} index reads", flush=True)
+            connection.commit()
+    finally:
+        raw.close()
+    return segments
+
+
+def index_size(name: str) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT pg_relation_size('{SCHEMA}.tasks_{name}_pkey')")).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Скорость вставки с id uuid4 против UUIDv7")
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Сколько строк вставить в каждую таблицу")
+    parser.add_argument("--batch", type=int, default=10_000, help="Строк в одной транзакции COPY")
+    parser.add_argument("--step", type=int, default=1_000_000, help="Каждые сколько строк печатать отрезок")
+    parser.add_argument("--json", dest="json_path", help="Сохранить результаты в JSON файл")
+    parser.add_argument("--cleanup", action="store_true", help="Удалить схему bench_ids после замера")
+    args = parser.parse_args()
+
+    prepare_tables()
+    report = {"rows": args.rows, "batch": args.batch, "generators": {}}
+    for name in GENERATORS:
+        segments = load(name, args.rows, args.batch, args.step)
+        report["generators"][name] = {"segments": segments, "pkey_bytes": index_size(name)}
+
+    print(f"\n{'':<4}{'rows/s (last step)':>20}{'WAL B/row (last)':>18}{'pkey, MB':>10}")
+    for name, result in report["generators"].items():
+        last = result["segments"][-1]
+        print(f"{name:<4}{last['rows_per_second']:>20,}{last['wal_bytes_per_row']:>18}"
+              f"{result['pkey_bytes'] / 2**20:>10.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.cleanup:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Бенчмарк загрузки задач: пакеты create_tasks_batch по 500 (многострочный INSERT ... RETURNING) против
+# POST /tasks/import пути (TaskImportReader + COPY во временную таблицу + INSERT ... SELECT).
+# Считаю строки в секунду для NDJSON и CSV и отдельно время разбора и проверки строк без БД.
+# Запуск из папки backend: python -m benchmarks.bench_task_import --rows 200000
+import argparse
+import csv
+import io
+import json
+import time
+
+import orjson
+from sqlalchemy import text
+
+from src.core.database import engine, SessionLocal
+from src.schemas.task import TaskCreate, TaskFileFormat
+from src.services.task_counters import rebuild_counters_statements
+from src.services.task_calendar import rebuild_calendar_statements
+from src.services.task_import import TaskImportReader
+from src.services.task_service import create_tasks_batch, import_tasks_batch
+from src.models import Task
+from benchmarks.common import prepare_user, drop_user
+
+BENCH_EMAIL = "bench-import@example.com"
+STATUSES = ("pending", "in_progress", "done")
+
+
+def make_tasks(count: int) -> list[dict]:
+    return [
+        {"title": f"Задача {i}", "description": f"Описание задачи {i}" if i % 2 else None, "status": STATUSES[i % 3]}
+        for i in range(count)
+    ]
+
+
+def make_file(tasks: list[dict], file_format: TaskFileFormat) -> bytes:
+    if file_format == TaskFileFormat.NDJSON:
+        return b"".join(orjson.dumps(task, option=orjson.OPT_APPEND_NEWLINE) for task in tasks)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(("title", "description", "status"))
+    writer.writerows((task["title"], task["description"] or "", task["status"]) for task in tasks)
+    return buffer.getvalue().encode("utf-8")
+
+
+# Файл кусками по 64 КБ, как приходит тело запроса
+def read_batches(data: bytes, file_format: TaskFileFormat):
+    reader = TaskImportReader(file_format)
+    for i in range(0, len(data), 65536):
+        yield from reader.feed(data[i:i + 65536])
+    yield from reader.close()
+
+
+# Удаляю задачи пользователя и пересчитываю его счетчики и календарь
+def clear_tasks(user_id: str) -> None:
+    with engine.begin() as conn:
+        conn.execute(Task.__table__.delete().where(Task.user_id == user_id))
+        for stmt in rebuild_counters_statements(user_id) + rebuild_calendar_statements(user_id):
+            conn.execute(stmt)
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетный INSERT против COPY при загрузке задач")
+    parser.add_argument("--rows", type=int, default=200_000, help="Сколько задач загружать")
+    parser.add_argument("--baseline-rows", type=int, default=20_000,
+                        help="Сколько задач грузить пакетами по 500 (медленный путь, хватает меньшего объема)")
+    parser.add_argument("--json", dest="json_path", help="Сохранить результаты в JSON файл")
+    parser.add_argument("--cleanup", action="store_true", help="Удалить тестовые данные после замера")
+    args = parser.parse_args()
+
+    user_id = prepare_user(BENCH_EMAIL, 0)
+    tasks = make_tasks(args.rows)
+    files = {file_format: make_file(tasks, file_format) for file_format in TaskFileFormat}
+    report = {"rows": args.rows, "paths": {}}
+
+    def insert_batches():
+        with SessionLocal() as db:
+            for i in range(0, args.baseline_rows, 500):
+                create_tasks_batch(db, [TaskCreate.model_validate(task) for task in tasks[i:i + 500]], user_id)
+
+    paths = {"insert_batch_500": insert_batches}
+    rows = {"insert_batch_500": min(args.baseline_rows, args.rows)}
+    for file_format, data in files.items():
+        paths[f"parse_{file_format.value}"] = lambda data=data, file_format=file_format: list(
+            read_batches(data, file_format)
+        )
+
+        def copy_import(data=data, file_format=file_format):
+            with SessionLocal() as db:
+                for batch in read_batches(data, file_format):
+                    import_tasks_batch(db, batch, user_id)
+
+        paths[f"copy_{file_format.value}"] = copy_import
+
+    print(f"{'path':>18}{'seconds':>10}{'rows/s':>12}")
+    for name, fn in paths.items():
+        clear_tasks(user_id)
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM ANALYZE tasks"))
+        seconds = timed(fn)
+        rate = rows.get(name, args.rows) / seconds
+        report["paths"][name] = {
+            "rows": rows.get(name, args.rows), "seconds": round(seconds, 3), "rows_per_second": round(rate)
+        }
+        print(f"{name:>18}{seconds:>10.3f}{rate:>12,.0f}")
+
+    clear_tasks(user_id)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.cleanup:
+        drop_user(BENCH_EMAIL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# Бенчмарк списка задач: старые фильтры через func.date()/extract() против полуинтервалов по created_at,
+# с индексами из миграций 002-003 и без них. Печатаю планы запросов и время.
+# Запуск из папки backend: python -m benchmarks.bench_task_list_indexes --tasks 1000000
+import argparse
+import json
+from datetime import date as date_class, timedelta
+
+from sqlalchemy import func, text
+
+from src.core.database import engine
+from src.models import Task
+from src.models.task import TaskStatus as TaskStatusEnum
+from src.schemas.task import TaskStatus
+from src.services.task_service import build_task_filters, tasks_page_query, tasks_count_query
+from benchmarks.common import prepare_user, drop_user, measure, explain
+
+BENCH_EMAIL = "bench-list-indexes@example.com"
+INDEXES = ("ix_tasks_user_id_created_at_id", "ix_tasks_user_id_status_created_at_id")
+
+
+# Фильтры в том виде, в котором они были до миграции 002 (функция от столбца - индекс не используется)
+def legacy_filters(user_id, status=None, date=None, day_group=None, month=None) -> list:
+    filters = [Task.user_id == user_id]
+    if status:
+        filters.append(Task.status == TaskStatusEnum(status.value))
+    if date:
+        filters.append(func.date(Task.created_at) == date_class.fromisoformat(date))
+    elif day_group == 'week':
+        filters.append(func.date(Task.created_at) >= date_class.today() - timedelta(days=7))
+    elif month:
+        year, month_num = month.split('-')
+        filters.extend([
+            func.extract('year', Task.created_at) == int(year),
+            func.extract('month', Task.created_at) == int(month_num),
+        ])
+    return filters
+
+
+# Набор сценариев: те же фильтры, что шлет фронтенд
+def cases() -> dict:
+    today = date_class.today()
+    return {
+        "all": {},
+        "status": {"status": TaskStatus.DONE},
+        "date": {"date": (today - timedelta(days=10)).isoformat()},
+        "day_group_week": {"day_group": "week"},
+        "month": {"month": today.strftime("%Y-%m")},
+        "status_month": {"status": TaskStatus.PENDING, "month": today.strftime("%Y-%m")},
+    }
+
+
+
+
+def run_cases(conn, user_id: str, limit: int, repeat: int, show_plans: bool) -> dict:
+    results = {}
+    for name, params in cases().items():
+        for variant, build in (("legacy", legacy_filters), ("sargable", build_task_filters)):
+            filters = build(user_id, **params)
+            # Первая страница и COUNT(*) как в get_tasks
+            page = tasks_page_query(filters, limit=limit)
+            count = tasks_count_query(filters)
+            if show_plans:
+                print(f"\n--- {name} / {variant} / page")
+                print(explain(conn, page))
+            results[f"{name}/{variant}"] = {
+                "page": measure(lambda: conn.execute(page).all(), repeat),
+                "count": measure(lambda: conn.execute(count).scalar(), repeat),
+            }
+    return results
+
+
+def print_table(title: str, results: dict) -> None:
+    print(f"\n=== {title}")
+    print(f"{'case':<30}{'page p50':>12}{'page p95':>12}{'count p50':>12}{'count p95':>12}")
+    for name, r in results.items():
+        print(f"{name:<30}{r['page']['p50_ms']:>12}{r['page']['p95_ms']:>12}"
+              f"{r['count']['p50_ms']:>12}{r['count']['p95_ms']:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Планы и время списка задач с индексами и без")
+    parser.add_argument("--tasks", type=int, default=1_000_000, help="Сколько задач у пользователя")
+    parser.add_argument("--limit", type=int, default=100, help="Размер страницы")
+    parser.add_argument("--repeat", type=int, default=20, help="Повторов на сценарий")
+    parser.add_argument("--plans", action="store_true", help="Печатать EXPLAIN ANALYZE для каждого сценария")
+    parser.add_argument("--json", dest="json_path", help="Сохранить результаты в JSON файл")
+    parser.add_argument("--cleanup", action="store_true", help="Удалить тестовые данные после замера")
+    args = parser.parse_args()
+
+    user_id = prepare_user(BENCH_EMAIL, args.tasks)
+    report = {"tasks": args.tasks, "limit": args.limit}
+
+    with engine.connect() as conn:
+        report["with_indexes"] = run_cases(conn, user_id, args.limit, args.repeat, args.plans)
+        conn.rollback()
+
+        # Без индексов: удаляю их внутри транзакции и откатываю в конце (DDL в Postgres транзакционный)
+        with conn.begin() as trx:
+            for index in INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+            report["without_indexes"] = run_cases(conn, user_id, args.limit, args.repeat, args.plans)
+            trx.rollback()
+
+    print_table("с индексами (миграции 002-003)", report["with_indexes"])
+    print_table("без индексов", report["without_indexes"])
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.cleanup:
+        drop_user(BENCH_EMAIL)
+
+
+if __name__ == "__main__":
+    main()
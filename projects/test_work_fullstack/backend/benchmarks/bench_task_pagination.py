@@ -0,0 +1,65 @@
+# Бенчмарк пагинации GET /tasks: OFFSET против keyset курсора на разной глубине.
+# С курсором страница N должна стоить как первая, с OFFSET растет линейно.
+# Запуск из папки backend: python -m benchmarks.bench_task_pagination --tasks 1000000
+import argparse
+import json
+
+from sqlalchemy.orm import Session
+
+from src.core.database import engine
+from src.services.task_service import build_task_filters, tasks_page_query, encode_task_cursor
+from benchmarks.common import prepare_user, drop_user, measure, explain
+
+BENCH_EMAIL = "bench-pagination@example.com"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OFFSET против keyset пагинации")
+    parser.add_argument("--tasks", type=int, default=1_000_000, help="Сколько задач у пользователя")
+    parser.add_argument("--limit", type=int, default=100, help="Размер страницы")
+    parser.add_argument("--depths", default="0,1000,10000,100000,500000", help="Глубина страниц (номер первой строки)")
+    parser.add_argument("--repeat", type=int, default=20, help="Повторов на замер")
+    parser.add_argument("--plans", action="store_true", help="Печатать EXPLAIN ANALYZE")
+    parser.add_argument("--json", dest="json_path", help="Сохранить результаты в JSON файл")
+    parser.add_argument("--cleanup", action="store_true", help="Удалить тестовые данные после замера")
+    args = parser.parse_args()
+
+    user_id = prepare_user(BENCH_EMAIL, args.tasks)
+    filters = build_task_filters(user_id)
+    report = {"tasks": args.tasks, "limit": args.limit, "depths": {}}
+
+    print(f"{'depth':>10}{'offset p50':>14}{'offset p95':>14}{'cursor p50':>14}{'cursor p95':>14}")
+    with Session(engine) as session:
+        for depth in (int(d) for d in args.depths.split(",")):
+            if depth >= args.tasks:
+                continue
+            offset_stmt = tasks_page_query(filters, skip=depth, limit=args.limit)
+            # Курсор на строку перед нужной страницей - как если бы клиент дошел сюда по next_cursor
+            cursor = None
+            if depth:
+                previous = session.execute(tasks_page_query(filters, skip=depth - 1, limit=0)).scalars().first()
+                cursor = encode_task_cursor(previous)
+            cursor_stmt = tasks_page_query(filters, limit=args.limit, cursor=cursor)
+
+            if args.plans:
+                print(f"\n--- depth {depth} / offset\n{explain(session.connection(), offset_stmt)}")
+                print(f"\n--- depth {depth} / cursor\n{explain(session.connection(), cursor_stmt)}\n")
+
+            result = {
+                "offset": measure(lambda: session.execute(offset_stmt).all(), args.repeat),
+                "cursor": measure(lambda: session.execute(cursor_stmt).all(), args.repeat),
+            }
+            report["depths"][depth] = result
+            print(f"{depth:>10}{result['offset']['p50_ms']:>14}{result['offset']['p95_ms']:>14}"
+                  f"{result['cursor']['p50_ms']:>14}{result['cursor']['p95_ms']:>14}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.cleanup:
+        drop_user(BENCH_EMAIL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Бенчмарк памяти и времени выборки списка задач: ORM объекты Task против строк с колонками
+# (все поля и облегченный список без description, как с fields=). Замер на 10k строк.
+# Запуск из папки backend: python -m benchmarks.bench_task_rows --rows 10000
+import argparse
+import gc
+import json
+import tracemalloc
+
+from sqlalchemy.orm import Session
+
+from src.core.database import engine
+from src.services.task_service import build_task_filters, tasks_page_query, task_list_columns, parse_task_fields
+from benchmarks.common import prepare_user, drop_user, measure
+
+BENCH_EMAIL = "bench-rows@example.com"
+
+
+# Сколько памяти держит результат fetch() (в байтах) и пик во время выборки
+def measure_memory(fetch) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    result = fetch()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {"held_bytes": held, "peak_bytes": peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ORM объекты против строк с колонками для списка задач")
+    parser.add_argument("--rows", type=int, default=10_000, help="Сколько строк выбирать")
+    parser.add_argument("--repeat", type=int, default=20, help="Повторов на замер времени")
+    parser.add_argument("--json", dest="json_path", help="Сохранить результаты в JSON файл")
+    parser.add_argument("--cleanup", action="store_true", help="Удалить тестовые данные после замера")
+    args = parser.parse_args()
+
+    user_id = prepare_user(BENCH_EMAIL, args.rows)
+    filters = build_task_filters(user_id)
+    slim_fields = parse_task_fields("title,status")
+    statements = {
+        "orm": tasks_page_query(filters, limit=args.rows - 1),
+        "columns": tasks_page_query(filters, limit=args.rows - 1, columns=task_list_columns()),
+        "slim_columns": tasks_page_query(filters, limit=args.rows - 1, columns=task_list_columns(slim_fields)),
+    }
+    report = {"rows": args.rows, "paths": {}}
+
+    print(f"{'path':>14}{'p50 ms':>10}{'p95 ms':>10}{'held KB':>10}{'peak KB':>10}{'B/row':>8}")
+    with Session(engine) as session:
+        for name, stmt in statements.items():
+            if name == "orm":
+                # Новый запрос - новые объекты: очищаю identity map, иначе ORM переиспользует старые
+                def fetch():
+                    session.expunge_all()
+                    return session.execute(stmt).scalars().all()
+            else:
+                def fetch():
+                    return session.execute(stmt).all()
+
+            result = measure(fetch, args.repeat)
+            session.expunge_all()
+            result.update(measure_memory(fetch))
+            session.expunge_all()
+            result["bytes_per_row"] = result["held_bytes"] // args.rows
+            report["paths"][name] = result
+            print(f"{name:>14}{result['p50_ms']:>10}{result['p95_ms']:>10}"
+                  f"{result['held_bytes'] // 1024:>10}{result['peak_bytes'] // 1024:>10}{result['bytes_per_row']:>8}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.cleanup:
+        drop_user(BENCH_EMAIL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# Бенчмарк поиска задач: q= (tsvector + GIN индекс, ранжирование) против ILIKE '%слово%' по заголовку
+# и описанию - так искал бы сервер без полнотекстового индекса. Первая страница и COUNT(*) для слов
+# разной частоты. Задачи с разнообразным текстом: слова из словаря с неравномерной частотой, как в живом тексте.
+# Запуск из папки backend: python -m benchmarks.bench_task_search --tasks 1000000
+import argparse
+import itertools
+import json
+
+from sqlalchemy import func, or_, select, text
+
+from src.core.database import engine
+from src.models import Task
+from src.services.task_service import build_task_filters, tasks_page_query, tasks_count_query, TASK_COLUMNS
+from src.services.task_search import parse_search_query, escape_like
+from benchmarks.common import ensure_bench_user, count_tasks, drop_user, measure, explain
+
+BENCH_EMAIL = "bench-search@example.com"
+
+# Словарь: слова из слогов, 20 * 20 = 400 слов
+SYLLABLES = ("ка", "ро", "ми", "на", "то", "ле", "вы", "су", "па", "до",
+             "ри", "мо", "за", "би", "ту", "ге", "лю", "фа", "ше", "цо")
+WORDS = [a + b + "к" for a, b in itertools.product(SYLLABLES, SYLLABLES)]
+
+
+# Задачи пользователя одним INSERT ... SELECT. Номер слова - floor(len * random()^3): первые слова словаря
+# встречаются часто, последние редко. В заголовке 3 слова, в описании 8 (у трети задач описания нет)
+def seed_search_tasks(conn, user_id: str, count: int) -> None:
+    word = "w.words[1 + floor(cardinality(w.words) * power(random(), 3))::int]"
+    conn.execute(text(f"""
+        INSERT INTO tasks (id, title, description, status, created_at, updated_at, user_id)
+        SELECT
+            gen_random_uuid(),
+            concat_ws(' ', {", ".join([word] * 3)}),
+            CASE WHEN n % 3 = 0 THEN NULL ELSE concat_ws(' ', {", ".join([word] * 8)}) END,
+            'PENDING'::taskstatus,
+            t,
+            t,
+            CAST(:user_id AS {Task.user_id.type.compile(engine.dialect)})
+        FROM (SELECT CAST(:words AS text[]) AS words) AS w,
+             generate_series(1, :count) AS n,
+             LATERAL (SELECT now() AT TIME ZONE 'utc' - (random() * interval '730 days') + n * interval '0 s') AS ts(t)
+    """), {"user_id": user_id, "count": count, "words": WORDS})
+
+
+def prepare_search_user(count: int) -> str:
+    with engine.begin() as conn:
+        user_id = ensure_bench_user(conn, BENCH_EMAIL)
+        existing = count_tasks(conn, user_id)
+        if existing != count:
+            print(f"Заполняю {count} задач для {BENCH_EMAIL} (сейчас {existing})...")
+            conn.execute(Task.__table__.delete().where(Task.user_id == user_id))
+            seed_search_tasks(conn, user_id, count)
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM ANALYZE tasks"))
+    return user_id
+
+
+# Поиск без полнотекстового индекса: каждое слово - подстрока заголовка или описания
+def ilike_filters(user_id: str, q: str) -> list:
+    filters = [Task.user_id == user_id]
+    for word in q.split():
+        pattern = f"%{escape_like(word)}%"
+        filters.append(or_(Task.title.ilike(pattern, escape="\\"), Task.description.ilike(pattern, escape="\\")))
+    return filters
+
+
+def cases() -> dict:
+    return {
+        "common_word": WORDS[0],
+        "medium_word": WORDS[40],
+        "rare_word": WORDS[-1],
+        "two_words": f"{WORDS[3]} {WORDS[60]}",
+        "prefix": WORDS[100][:3],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Полнотекстовый поиск задач против ILIKE")
+    parser.add_argument("--tasks", type=int, default=1_000_000, help="Сколько задач у пользователя")
+    parser.add_argument("--limit", type=int, default=100, help="Размер страницы")
+    parser.add_argument("--repeat", type=int, default=10, help="Повторов на сценарий")
+    parser.add_argument("--plans", action="store_true", help="Печатать EXPLAIN ANALYZE первой страницы")
+    parser.add_argument("--json", dest="json_path", help="Сохранить результаты в JSON файл")
+    parser.add_argument("--cleanup", action="store_true", help="Удалить тестовые данные после замера")
+    args = parser.parse_args()
+
+    user_id = prepare_search_user(args.tasks)
+    report = {"tasks": args.tasks, "limit": args.limit, "cases": {}}
+
+    print(f"{'case':<14}{'matches':>10}{'fts page':>11}{'fts count':>11}{'ilike page':>12}{'ilike count':>13}")
+    with engine.connect() as conn:
+        for name, q in cases().items():
+            search = parse_search_query(q)
+            fts_filters = build_task_filters(user_id, search=search)
+            fts_page = tasks_page_query(fts_filters, limit=args.limit, columns=TASK_COLUMNS, search=search)
+            fts_count = tasks_count_query(fts_filters)
+            ilike = ilike_filters(user_id, q)
+            ilike_page = select(*TASK_COLUMNS).where(*ilike).order_by(
+                Task.created_at.desc(), Task.id.desc()
+            ).limit(args.limit + 1)
+            ilike_count = select(func.count()).select_from(Task).where(*ilike)
+
+            if args.plans:
+                print(f"\n--- {name} / fts\n{explain(conn, fts_page)}")
+                print(f"\n--- {name} / ilike\n{explain(conn, ilike_page)}\n")
+
+            matches = conn.execute(fts_count).scalar()
+            result = {
+                "q": q,
+                "matches": matches,
+                "fts_page": measure(lambda: conn.execute(fts_page).all(), args.repeat, 1),
+                "fts_count": measure(lambda: conn.execute(fts_count).scalar(), args.repeat, 1),
+                "ilike_page": measure(lambda: conn.execute(ilike_page).all(), args.repeat, 1),
+                "ilike_count": measure(lambda: conn.execute(ilike_count).scalar(), args.repeat, 1),
+            }
+            report["cases"][name] = result
+            print(f"{name:<14}{matches:>10}{result['fts_page']['p50_ms']:>11}{result['fts_count']['p50_ms']:>11}"
+                  f"{result['ilike_page']['p50_ms']:>12}{result['ilike_count']['p50_ms']:>13}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.cleanup:
+        drop_user(BENCH_EMAIL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# Бенчмарк ответа GET /tasks на 100, 1000 и 10000 задач: старый путь (ORM объекты -> TaskResponse ->
+# повторная валидация по response_model и jsonable_encoder в FastAPI -> json) против нового
+# (колонки из SQL -> словари -> orjson). Перед замером проверяю, что оба пути отдают одинаковый JSON.
+# Запуск из папки backend: python -m benchmarks.bench_task_serialization
+import argparse
+import asyncio
+import json
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy.orm import Session
+
+from src.core.database import engine
+from src.schemas.task import TaskResponse, TaskListResponse, TaskStatus
+from src.services.task_service import build_task_filters, tasks_page_query, TASK_COLUMNS
+from src.api.routes.tasks import task_list_response
+from benchmarks.common import prepare_user, drop_user, measure
+
+BENCH_EMAIL = "bench-serialization@example.com"
+
+# Поле ответа так же, как FastAPI строит его для response_model=TaskListResponse
+RESPONSE_FIELD = create_model_field(name="Response_list_tasks", type_=TaskListResponse, mode="serialization")
+
+
+# Старый путь роута: TaskResponse по полям, потом FastAPI проверяет ответ по response_model и сериализует
+def old_response(tasks) -> bytes:
+    content = TaskListResponse(
+        tasks=[
+            TaskResponse(
+                id=task.id,
+                title=task.title,
+                description=task.description,
+                status=TaskStatus(task.status.value),
+                createdAt=task.created_at,
+                userId=task.user_id
+            )
+            for task in tasks
+        ],
+        total=len(tasks),
+        next_cursor=None,
+    )
+    serialized = asyncio.run(serialize_response(field=RESPONSE_FIELD, response_content=content))
+    return JSONResponse(serialized).body
+
+
+# Новый путь: строки с колонками задачи сразу в словари и orjson
+def new_response(rows) -> bytes:
+    return task_list_response(rows, len(rows), None).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сериализация списка задач: pydantic + jsonable_encoder против orjson")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Размеры страницы")
+    parser.add_argument("--repeat", type=int, default=20, help="Повторов на замер")
+    parser.add_argument("--json", dest="json_path", help="Сохранить результаты в JSON файл")
+    parser.add_argument("--cleanup", action="store_true", help="Удалить тестовые данные после замера")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    user_id = prepare_user(BENCH_EMAIL, max(sizes))
+    filters = build_task_filters(user_id)
+    report = {"sizes": {}}
+
+    print(f"{'size':>7}{'old fetch':>11}{'old json':>10}{'new fetch':>11}{'new json':>10}{'old total':>11}{'new total':>11}")
+    with Session(engine) as session:
+        for size in sizes:
+            entities_stmt = tasks_page_query(filters, limit=size - 1)
+            rows_stmt = tasks_page_query(filters, limit=size - 1, columns=TASK_COLUMNS)
+
+            entities = session.execute(entities_stmt).scalars().all()
+            rows = session.execute(rows_stmt).all()
+            if json.loads(old_response(entities)) != json.loads(new_response(rows)):
+                raise SystemExit(f"Ответы старого и нового пути различаются на {size} задачах")
+
+            # expunge_all - чтобы старый путь каждый раз заново строил ORM объекты, как в новом запросе
+            def fetch_entities():
+                session.expunge_all()
+                return session.execute(entities_stmt).scalars().all()
+
+            result = {
+                "old_fetch": measure(fetch_entities, args.repeat),
+                "old_serialize": measure(lambda: old_response(entities), args.repeat),
+                "new_fetch": measure(lambda: session.execute(rows_stmt).all(), args.repeat),
+                "new_serialize": measure(lambda: new_response(rows), args.repeat),
+            }
+            report["sizes"][size] = result
+            old_total = result["old_fetch"]["p50_ms"] + result["old_serialize"]["p50_ms"]
+            new_total = result["new_fetch"]["p50_ms"] + result["new_serialize"]["p50_ms"]
+            print(f"{size:>7}{result['old_fetch']['p50_ms']:>11}{result['old_serialize']['p50_ms']:>10}"
+                  f"{result['new_fetch']['p50_ms']:>11}{result['new_serialize']['p50_ms']:>10}"
+                  f"{old_total:>11.3f}{new_total:>11.3f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.cleanup:
+        drop_user(BENCH_EMAIL)
+
+
+if __name__ == "__main__":
+    main()
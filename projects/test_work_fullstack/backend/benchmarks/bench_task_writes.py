@@ -0,0 +1,134 @@
+# Бенчмарк изменения и удаления одной задачи: старый ORM путь (SELECT задачи, изменение объекта, commit,
+# refresh) против одного UPDATE/DELETE ... RETURNING. Считаю время и количество обращений к БД на операцию.
+# Запуск из папки backend: python -m benchmarks.bench_task_writes --tasks 100000
+import argparse
+import itertools
+import json
+
+from sqlalchemy import event
+
+from src.core.database import engine, SessionLocal
+from src.models.task import TaskStatus as TaskStatusEnum
+from src.schemas.task import TaskCreate, TaskUpdate
+from src.services.task_service import (
+    get_task_by_id,
+    task_change_statements,
+    execute_statements,
+    update_task,
+    delete_task,
+    create_tasks_batch,
+    delete_tasks_batch,
+)
+from benchmarks.common import prepare_user, drop_user, measure
+
+BENCH_EMAIL = "bench-writes@example.com"
+
+
+# Старый update_task: SELECT задачи, изменение ORM объекта, commit (UPDATE + COMMIT), refresh (SELECT)
+def orm_update_task(db, task_id: str, user_id: str, task_data: TaskUpdate):
+    task = get_task_by_id(db, task_id, user_id)
+    if not task:
+        return None
+    old_status = task.status
+    if task_data.title is not None:
+        task.title = task_data.title
+    if task_data.status is not None:
+        task.status = TaskStatusEnum(task_data.status.value)
+    execute_statements(db, task_change_statements(
+        user_id, removed=[(old_status, task.created_at)], added=[(task.status, task.created_at)]
+    ))
+    db.commit()
+    db.refresh(task)
+    return task
+
+
+# Старый delete_task: SELECT задачи, потом DELETE и COMMIT
+def orm_delete_task(db, task_id: str, user_id: str) -> bool:
+    task = get_task_by_id(db, task_id, user_id)
+    if not task:
+        return False
+    db.delete(task)
+    execute_statements(db, task_change_statements(user_id, removed=[(task.status, task.created_at)]))
+    db.commit()
+    return True
+
+
+# Считаю запросы и COMMIT, которые ушли в БД - это и есть обращения к серверу
+class RoundTrips:
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def _on_commit(self, *args):
+        self.count += 1
+
+    # Запускаю fn один раз и возвращаю сколько обращений к БД она сделала
+    def of(self, fn) -> int:
+        start = self.count
+        fn()
+        return self.count - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ORM путь против UPDATE/DELETE ... RETURNING")
+    parser.add_argument("--tasks", type=int, default=100_000, help="Сколько задач у пользователя (фон для индексов)")
+    parser.add_argument("--repeat", type=int, default=200, help="Повторов на замер")
+    parser.add_argument("--json", dest="json_path", help="Сохранить результаты в JSON файл")
+    parser.add_argument("--cleanup", action="store_true", help="Удалить тестовые данные после замера")
+    args = parser.parse_args()
+
+    user_id = prepare_user(BENCH_EMAIL, args.tasks)
+    trips = RoundTrips()
+    report = {"tasks": args.tasks, "repeat": args.repeat, "operations": {}}
+
+    with SessionLocal() as db:
+        # Задачи для замеров создаю через сервис, чтобы счетчики и календарь оставались согласованными
+        needed = (args.repeat + 2) * 2 + 1
+        created = create_tasks_batch(db, [TaskCreate(title=f"Запись {i}") for i in range(needed)], user_id)
+        ids = [task_id for task_id, _, _ in created]
+        target = ids.pop()
+        statuses = itertools.cycle([TaskUpdate(status="done"), TaskUpdate(status="pending")])
+        titles = (TaskUpdate(title=f"Заголовок {i}") for i in itertools.count())
+        to_delete = {"orm": iter(ids[:len(ids) // 2]), "returning": iter(ids[len(ids) // 2:])}
+
+        cases = {
+            "update_title": {
+                "orm": lambda: orm_update_task(db, target, user_id, next(titles)),
+                "returning": lambda: update_task(db, target, user_id, next(titles)),
+            },
+            "update_status": {
+                "orm": lambda: orm_update_task(db, target, user_id, next(statuses)),
+                "returning": lambda: update_task(db, target, user_id, next(statuses)),
+            },
+            "delete": {
+                "orm": lambda: orm_delete_task(db, next(to_delete["orm"]), user_id),
+                "returning": lambda: delete_task(db, next(to_delete["returning"]), user_id),
+            },
+        }
+
+        print(f"{'operation':>15}{'path':>11}{'p50 ms':>10}{'p95 ms':>10}{'trips':>7}")
+        for name, paths in cases.items():
+            report["operations"][name] = {}
+            for path, fn in paths.items():
+                # Обращения к БД считаю на отдельном вызове, measure - без него
+                result = {"round_trips": trips.of(fn)}
+                result.update(measure(fn, args.repeat, warmup=1))
+                report["operations"][name][path] = result
+                print(f"{name:>15}{path:>11}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['round_trips']:>7}")
+
+        delete_tasks_batch(db, [target], user_id)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.cleanup:
+        drop_user(BENCH_EMAIL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Микробенчмарк проверки JWT в зависимости авторизации: полный jwt.decode против кеша проверенных токенов.
+# БД не нужна. Запуск из папки backend: python -m benchmarks.bench_token_cache --users 1000
+import argparse
+import json
+import random
+
+from src.auth.security import create_access_token
+from src.auth.token_cache import TokenCache
+from src.services import auth_service
+from benchmarks.common import measure
+
+
+def main():
+    parser = argparse.ArgumentParser(description="jwt.decode против кеша проверенных токенов")
+    parser.add_argument("--users", type=int, default=1000, help="Сколько разных токенов в потоке запросов")
+    parser.add_argument("--calls", type=int, default=10000, help="Проверок токена на один замер")
+    parser.add_argument("--cache-size", type=int, default=10000, help="Размер кеша")
+    parser.add_argument("--repeat", type=int, default=20, help="Повторов на замер")
+    parser.add_argument("--json", dest="json_path", help="Сохранить результаты в JSON файл")
+    args = parser.parse_args()
+
+    tokens = [create_access_token(subject=f"user-{i}") for i in range(args.users)]
+    rng = random.Random(42)
+    stream = [rng.choice(tokens) for _ in range(args.calls)]
+
+    def decode_all():
+        for token in stream:
+            auth_service.decode_user_from_token(token)
+
+    # Подменяю кеш модуля на свой, чтобы размер задавался аргументом и замер начинался с пустого кеша
+    cache = TokenCache(args.cache_size, ttl_seconds=300)
+    auth_service.token_cache = cache
+
+    def cached_all():
+        for token in stream:
+            auth_service.get_current_user_from_token(token)
+
+    report = {"users": args.users, "calls": args.calls, "cache_size": args.cache_size}
+    report["decode"] = measure(decode_all, args.repeat)
+    report["cached"] = measure(cached_all, args.repeat)
+    report["cache"] = cache.snapshot()
+
+    print(f"{'':>10}{'p50 ms':>12}{'p95 ms':>12}{'us/call':>12}")
+    for name in ("decode", "cached"):
+        result = report[name]
+        per_call = result["p50_ms"] * 1000 / args.calls
+        result["p50_us_per_call"] = round(per_call, 3)
+        print(f"{name:>10}{result['p50_ms']:>12}{result['p95_ms']:>12}{per_call:>12.2f}")
+    print(f"cache: {report['cache']}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# Бенчмарк ключей varchar против uuid (миграция 009): одни и те же пользователи и задачи в двух парах таблиц
+# bench_keys.users_<тип>/tasks_<тип> со схемой как у users/tasks. Сравниваю размер таблиц и индексов,
+# поиск по первичному ключу, страницу задач пользователя и join задач с пользователями.
+# Запуск из папки backend: python -m benchmarks.bench_uuid_keys --users 10000 --tasks 1000000
+import argparse
+import json
+
+from sqlalchemy import text
+
+from src.core.database import engine
+from benchmarks.common import measure
+
+SCHEMA = "bench_keys"
+KEY_TYPES = ("varchar", "uuid")
+
+
+# Пары таблиц для обоих типов ключа. Данные генерирую в varchar таблицы и копирую в uuid с приведением,
+# чтобы ключи и порядок строк совпадали
+def prepare_tables(conn, users: int, tasks: int) -> None:
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    for key in KEY_TYPES:
+        conn.execute(text(f"""
+            CREATE TABLE {SCHEMA}.users_{key} (
+                id {key} PRIMARY KEY,
+                email varchar(255) NOT NULL
+            )
+        """))
+        conn.execute(text(f"""
+            CREATE TABLE {SCHEMA}.tasks_{key} (
+                id {key} PRIMARY KEY,
+                title varchar(200) NOT NULL,
+                created_at timestamp NOT NULL,
+                user_id {key} REFERENCES {SCHEMA}.users_{key} (id)
+            )
+        """))
+    conn.execute(text(f"""
+        INSERT INTO {SCHEMA}.users_varchar (id, email)
+        SELECT gen_random_uuid()::text, 'user' || n || '@example.com' FROM generate_series(1, :users) AS n
+    """), {"users": users})
+    conn.execute(text(f"""
+        INSERT INTO {SCHEMA}.tasks_varchar (id, title, created_at, user_id)
+        SELECT gen_random_uuid()::text, 'Задача ' || n, now() AT TIME ZONE 'utc' - n * interval '1 minute', u.id
+        FROM generate_series(1, :tasks) AS n
+        JOIN (SELECT id, row_number() OVER () - 1 AS k FROM {SCHEMA}.users_varchar) AS u ON u.k = n % :users
+    """), {"users": users, "tasks": tasks})
+    conn.execute(text(f"INSERT INTO {SCHEMA}.users_uuid SELECT id::uuid, email FROM {SCHEMA}.users_varchar"))
+    conn.execute(text(f"""
+        INSERT INTO {SCHEMA}.tasks_uuid SELECT id::uuid, title, created_at, user_id::uuid FROM {SCHEMA}.tasks_varchar
+    """))
+    for key in KEY_TYPES:
+        conn.execute(text(
+            f"CREATE INDEX ix_tasks_{key}_user_id_created_at_id "
+            f"ON {SCHEMA}.tasks_{key} (user_id, created_at DESC, id DESC)"
+        ))
+
+
+# Размеры таблицы задач и ее индексов в байтах
+def relation_sizes(conn, key: str) -> dict:
+    names = {
+        "tasks_table": f"{SCHEMA}.tasks_{key}",
+        "tasks_pkey": f"{SCHEMA}.tasks_{key}_pkey",
+        "tasks_user_index": f"{SCHEMA}.ix_tasks_{key}_user_id_created_at_id",
+        "users_pkey": f"{SCHEMA}.users_{key}_pkey",
+    }
+    return {
+        metric: conn.execute(text("SELECT pg_relation_size(CAST(:name AS regclass))"), {"name": name}).scalar()
+        for metric, name in names.items()
+    }
+
+
+def queries(key: str) -> dict:
+    tasks, users = f"{SCHEMA}.tasks_{key}", f"{SCHEMA}.users_{key}"
+    return {
+        # sample случайных задач по первичному ключу
+        "pk_lookup": f"SELECT id, title FROM {tasks} WHERE id = ANY(CAST(:ids AS {key}[]))",
+        # первая страница задач одного пользователя, как GET /tasks
+        "user_page": f"""
+            SELECT id, title, created_at FROM {tasks} WHERE user_id = CAST(:user_id AS {key})
+            ORDER BY created_at DESC, id DESC LIMIT 100
+        """,
+        # задачи по id вместе с владельцем: nested loop по двум первичным ключам
+        "join_lookup": f"""
+            SELECT t.id, u.email FROM {tasks} AS t JOIN {users} AS u ON u.id = t.user_id
+            WHERE t.id = ANY(CAST(:ids AS {key}[]))
+        """,
+        # все задачи с владельцами: hash join по ключу
+        "join_all": f"SELECT count(u.email) FROM {tasks} AS t JOIN {users} AS u ON u.id = t.user_id",
+        # задач на пользователя: группировка по ключу
+        "group_by_user": f"SELECT count(*) FROM (SELECT user_id, count(*) FROM {tasks} GROUP BY user_id) AS g",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ключи varchar против uuid: размер индексов, поиск и join")
+    parser.add_argument("--users", type=int, default=10_000, help="Сколько пользователей")
+    parser.add_argument("--tasks", type=int, default=1_000_000, help="Сколько задач")
+    parser.add_argument("--sample", type=int, default=1000, help="Сколько задач искать по id за запрос")
+    parser.add_argument("--repeat", type=int, default=10, help="Повторов на запрос")
+    parser.add_argument("--json", dest="json_path", help="Сохранить результаты в JSON файл")
+    parser.add_argument("--cleanup", action="store_true", help="Удалить схему bench_keys после замера")
+    args = parser.parse_args()
+
+    print(f"Заполняю {SCHEMA}: {args.users} пользователей, {args.tasks} задач в двух вариантах...")
+    with engine.begin() as conn:
+        prepare_tables(conn, args.users, args.tasks)
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        for key in KEY_TYPES:
+            conn.execute(text(f"VACUUM ANALYZE {SCHEMA}.users_{key}, {SCHEMA}.tasks_{key}"))
+
+    report = {"users": args.users, "tasks": args.tasks, "sizes": {}, "queries": {}}
+    with engine.connect() as conn:
+        ids = conn.execute(text(
+            f"SELECT id FROM {SCHEMA}.tasks_varchar ORDER BY random() LIMIT :sample"
+        ), {"sample": args.sample}).scalars().all()
+        user_id = conn.execute(text(f"SELECT id FROM {SCHEMA}.users_varchar LIMIT 1")).scalar()
+        params = {"ids": ids, "user_id": user_id}
+
+        for key in KEY_TYPES:
+            report["sizes"][key] = relation_sizes(conn, key)
+            for name, sql in queries(key).items():
+                stmt = text(sql)
+                report["queries"].setdefault(name, {})[key] = measure(
+                    lambda: conn.execute(stmt, params).all(), args.repeat, 1
+                )
+
+    print(f"\n{'size, MB':<18}{'varchar':>10}{'uuid':>10}{'uuid/varchar':>14}")
+    for metric in report["sizes"]["varchar"]:
+        before, after = report["sizes"]["varchar"][metric], report["sizes"]["uuid"][metric]
+        print(f"{metric:<18}{before / 2**20:>10.1f}{after / 2**20:>10.1f}{after / before:>14.2f}")
+    print(f"\n{'p50, ms':<18}{'varchar':>10}{'uuid':>10}{'uuid/varchar':>14}")
+    for name, result in report["queries"].items():
+        before, after = result["varchar"]["p50_ms"], result["uuid"]["p50_ms"]
+        print(f"{name:<18}{before:>10.2f}{after:>10.2f}{after / before:>14.2f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.cleanup:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
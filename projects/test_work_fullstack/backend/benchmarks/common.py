@@ -0,0 +1,102 @@
+# Общие функции для бенчмарков: заполнение БД тестовыми задачами, замер времени, EXPLAIN.
+# Бенчмарки запускаю из папки backend: python -m benchmarks.<имя_скрипта>
+# БД берется из DATABASE_URL, как и у приложения. Не запускать на боевой базе!
+import statistics
+import time
+import uuid
+from typing import Callable
+
+from sqlalchemy import text, func, select
+from sqlalchemy.engine import Connection
+
+from src.core.database import engine
+from src.models import User, Task
+
+
+# Нахожу или создаю пользователя для бенчмарка, возвращаю его id
+def ensure_bench_user(conn: Connection, email: str) -> str:
+    user_id = conn.execute(select(User.id).where(User.email == email)).scalar()
+    if user_id:
+        return str(user_id)
+    user = User.__table__
+    return str(conn.execute(
+        user.insert().values(
+            id=str(uuid.uuid4()),
+            email=email,
+            password="benchmark",
+            created_at=func.now(),
+        ).returning(user.c.id)
+    ).scalar())
+
+
+# Сколько задач у пользователя
+def count_tasks(conn: Connection, user_id: str) -> int:
+    return conn.execute(select(func.count()).select_from(Task).where(Task.user_id == user_id)).scalar()
+
+
+# Заполняю задачи пользователя одним INSERT ... SELECT generate_series (миллион строк - секунды).
+# created_at равномерно размазан по последним `days` дням, статусы по кругу. updated_at = created_at;
+# `+ n * interval '0 s'` делает LATERAL зависимым от строки, иначе random() посчитается один раз
+def seed_tasks(conn: Connection, user_id: str, count: int, days: int = 730) -> None:
+    statuses = list(Task.status.type.enums)
+    conn.execute(text(f"""
+        INSERT INTO tasks (id, title, description, status, created_at, updated_at, user_id)
+        SELECT
+            gen_random_uuid(),
+            'Задача ' || n,
+            CASE WHEN n % 3 = 0 THEN NULL ELSE 'Описание задачи номер ' || n END,
+            (ARRAY[{", ".join(f"'{s}'" for s in statuses)}])[1 + n % {len(statuses)}]::taskstatus,
+            t,
+            t,
+            CAST(:user_id AS {Task.user_id.type.compile(engine.dialect)})
+        FROM generate_series(1, :count) AS n,
+             LATERAL (SELECT now() AT TIME ZONE 'utc' - (random() * interval '{days} days') + n * interval '0 s') AS ts(t)
+    """), {"user_id": user_id, "count": count})
+
+
+# Готовлю пользователя ровно с `count` задачами, при несовпадении пересоздаю задачи
+def prepare_user(email: str, count: int) -> str:
+    with engine.begin() as conn:
+        user_id = ensure_bench_user(conn, email)
+        existing = count_tasks(conn, user_id)
+        if existing != count:
+            print(f"Заполняю {count} задач для {email} (сейчас {existing})...")
+            conn.execute(Task.__table__.delete().where(Task.user_id == user_id))
+            seed_tasks(conn, user_id, count)
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("ANALYZE tasks"))
+    return user_id
+
+
+# Удаляю пользователя бенчмарка вместе с задачами
+def drop_user(email: str) -> None:
+    with engine.begin() as conn:
+        user_id = conn.execute(select(User.id).where(User.email == email)).scalar()
+        if user_id:
+            conn.execute(Task.__table__.delete().where(Task.user_id == user_id))
+            conn.execute(User.__table__.delete().where(User.id == user_id))
+
+
+# Запускаю fn `repeat` раз (плюс прогрев), возвращаю статистику в миллисекундах
+def measure(fn: Callable[[], object], repeat: int = 20, warmup: int = 2) -> dict:
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "min_ms": round(timings[0], 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+    }
+
+
+# EXPLAIN (ANALYZE, BUFFERS) для SQLAlchemy запроса, возвращаю план текстом
+def explain(conn: Connection, stmt) -> str:
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    rows = conn.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS) " + str(compiled)).all()
+    return "\n".join(row[0] for row in rows)
@@ -0,0 +1,40 @@
+# Сверяю счетчики task_counters с задачами и при необходимости пересчитываю их
+# Запуск: python check_task_counters.py [--user USER_ID] [--fix]
+import argparse
+import sys
+
+from sqlalchemy import text
+
+from src.core.database import engine
+from src.services.task_counters import counter_mismatches_query, rebuild_counters_statements
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Проверка счетчиков задач")
+    parser.add_argument("--user", help="Проверить только одного пользователя (id)")
+    parser.add_argument("--fix", action="store_true", help="Пересчитать счетчики из задач")
+    parser.add_argument("--limit", type=int, default=50, help="Сколько расхождений показать")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        mismatches = conn.execute(counter_mismatches_query(args.user)).all()
+
+    if not mismatches:
+        print("Счетчики совпадают с задачами")
+        sys.exit(0)
+
+    print(f"Найдено расхождений: {len(mismatches)}")
+    for row in mismatches[:args.limit]:
+        print(f"  user={row.user_id} status={row.status.value} day={row.day} "
+              f"ожидаю={row.expected} в счетчиках={row.stored}")
+
+    if not args.fix:
+        print("Для пересчета запустите с --fix")
+        sys.exit(1)
+
+    print("Пересчитываю счетчики...")
+    with engine.begin() as conn:
+        # SHARE блокирует запись задач на время пересчета, чтобы не потерять параллельные изменения
+        conn.execute(text("LOCK TABLE tasks IN SHARE MODE"))
+        for stmt in rebuild_counters_statements(args.user):
+            conn.execute(stmt)
+    print("Счетчики пересчитаны")
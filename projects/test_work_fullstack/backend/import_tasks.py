@@ -0,0 +1,78 @@
+# Загружаю задачи пользователя из NDJSON или CSV файла тем же путем, что и POST /tasks/import
+# (COPY во временную таблицу пачками, счетчики и календарь обновляются вместе с задачами)
+# Запуск: python import_tasks.py --email user@example.com tasks.ndjson [--format csv]
+# Файл "-" - читать из stdin
+import argparse
+import json
+import sys
+import time
+
+from src.core.database import SessionLocal
+from src.schemas.task import TaskFileFormat
+from src.services.auth_service import get_user_by_email
+from src.services.task_import import TaskImportReader, InvalidImportError, IMPORT_DB_ERRORS, import_report
+from src.services.task_service import import_tasks_batch
+
+# Читаю файл блоками по 1 МБ
+READ_BLOCK_SIZE = 1 << 20
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Загрузка задач из NDJSON или CSV")
+    parser.add_argument("path", help="Путь к файлу, - для stdin")
+    parser.add_argument("--email", required=True, help="Email пользователя, которому загружаю задачи")
+    parser.add_argument("--format", choices=[f.value for f in TaskFileFormat],
+                        help="Формат файла, по умолчанию по расширению (csv или ndjson)")
+    parser.add_argument("--report", help="Сохранить полный отчет в JSON файл")
+    args = parser.parse_args()
+
+    import_format = TaskFileFormat(args.format or ("csv" if args.path.endswith(".csv") else "ndjson"))
+    source = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+
+    with SessionLocal() as db:
+        user = get_user_by_email(db, args.email)
+        if not user:
+            print(f"Пользователь {args.email} не найден")
+            sys.exit(1)
+        user_id = user.id
+
+        reader = TaskImportReader(import_format)
+        batches = []
+        error = None
+        started = time.perf_counter()
+        try:
+            with source:
+                while data := source.read(READ_BLOCK_SIZE):
+                    for batch in reader.feed(data):
+                        batches.append(import_tasks_batch(db, batch, user_id))
+                for batch in reader.close():
+                    batches.append(import_tasks_batch(db, batch, user_id))
+        except InvalidImportError as e:
+            if not batches:
+                print(f"Файл не разобран: {e}")
+                sys.exit(1)
+            error = f"Файл не разобран: {e}"
+        except IMPORT_DB_ERRORS as e:
+            error = f"Ошибка БД: {e}"
+        elapsed = time.perf_counter() - started
+
+    # При обрыве уже загруженные пачки остаются, печатаю отчет по ним и с какой строки продолжать
+    report = import_report(batches, error)
+    for batch in report["batches"]:
+        if batch["failed"]:
+            print(f"Пачка {batch['batch']} (строки {batch['first_line']}-{batch['last_line']}): "
+                  f"загружено {batch['imported']}, с ошибками {batch['failed']}")
+            for error in batch["errors"]:
+                print(f"  строка {error['line']}: {error['error']}")
+    rate = report["imported"] / elapsed if elapsed else 0
+    print(f"Загружено задач: {report['imported']}, пропущено строк: {report['failed']}, "
+          f"{elapsed:.2f} с ({rate:,.0f} строк/с)")
+
+    if error:
+        next_line = batches[-1]["last_line"] + 1 if batches else 1
+        print(f"Загрузка оборвалась: {error}. Не загружены строки с {next_line}")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if report["failed"] or error else 0)
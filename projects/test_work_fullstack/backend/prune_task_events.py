@@ -0,0 +1,17 @@
+# Удаляю старые события ленты изменений из task_events. Запускать по расписанию (cron)
+# Запуск: python prune_task_events.py [--days 7]
+import argparse
+
+from src.core.config import TASK_EVENTS_RETENTION_DAYS
+from src.core.database import engine
+from src.services.task_events import prune_events_statement
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Удаление старых событий ленты изменений")
+    parser.add_argument("--days", type=int, default=TASK_EVENTS_RETENTION_DAYS,
+                        help="Сколько дней событий оставить")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        deleted = conn.execute(prune_events_statement(args.days)).rowcount
+    print(f"Удалено событий: {deleted}")
@@ -0,0 +1,21 @@
+# Пересчитываю календарь задач task_calendar из таблицы задач (бэкфилл существующих данных)
+# Запуск: python rebuild_task_calendar.py [--user USER_ID]
+import argparse
+
+from sqlalchemy import text
+
+from src.core.database import engine
+from src.services.task_calendar import rebuild_calendar_statements
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пересчет календаря задач")
+    parser.add_argument("--user", help="Пересчитать только одного пользователя (id)")
+    args = parser.parse_args()
+
+    print("Пересчитываю календарь задач...")
+    with engine.begin() as conn:
+        # SHARE блокирует запись задач на время пересчета, чтобы не потерять параллельные изменения
+        conn.execute(text("LOCK TABLE tasks IN SHARE MODE"))
+        for stmt in rebuild_calendar_statements(args.user):
+            conn.execute(stmt)
+    print("Календарь пересчитан")
@@ -1,14 +1,19 @@
 """
-Скрипт для запуска FastAPI приложения через uvicorn.
+Скрипт для запуска FastAPI приложения.
+APP_ENV=production - продакшен сервер: gunicorn с воркерами uvicorn (src/core/server.py),
+иначе uvicorn в одном процессе с перезагрузкой при изменении кода.
 """
 import uvicorn
-from src.core.config import APP_HOST, APP_PORT
+from src.core.config import APP_HOST, APP_PORT, APP_PRODUCTION
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "src.main:app",
-        host=APP_HOST,
-        port=APP_PORT,
-        reload=True
-    )
-
+    if APP_PRODUCTION:
+        from src.core.server import ProductionServer
+        ProductionServer("src.main:app").run()
+    else:
+        uvicorn.run(
+            "src.main:app",
+            host=APP_HOST,
+            port=APP_PORT,
+            reload=True
+        )
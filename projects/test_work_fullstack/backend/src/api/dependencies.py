@@ -1,21 +1,36 @@
 # Получаю user_id из JWT токена, использую в защищенных роутах
-from fastapi import Depends, HTTPException, status
+import hmac
+import ipaddress
+import time
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
 
-from src.core.database import get_db
+from src.core.config import MONITORING_TOKEN, MONITORING_NETWORKS
+from src.core.request_metrics import record_auth
 from src.services.auth_service import get_current_user_from_token
 
 security = HTTPBearer()
+monitoring_security = HTTPBearer(auto_error=False)
+
+
+# Проверяю токен и записываю время проверки в метрики запроса (/metrics)
+def user_id_from_token(token: str):
+    start = time.perf_counter()
+    try:
+        return get_current_user_from_token(token)
+    finally:
+        record_auth((time.perf_counter() - start) * 1000)
 
 
-# Вытаскиваю токен из заголовка, декодирую его, возвращаю user_id. Если токен невалидный - ошибка 401
+# Вытаскиваю токен из заголовка, декодирую его, возвращаю user_id. Если токен невалидный - ошибка 401.
+# Сессия БД тут не нужна: проверка токена не ходит в БД и не берет соединение из пула
 def get_current_user_id(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> str:
     token = credentials.credentials
-    user_id = get_current_user_from_token(token)
+    user_id = user_id_from_token(token)
     
     if not user_id:
         raise HTTPException(
@@ -26,6 +41,47 @@ def get_current_user_id(
     
     return user_id
 
+
+# То же самое для async роутов (DB_MODE=async), без ухода в threadpool
+async def get_current_user_id_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> str:
+    user_id = user_id_from_token(credentials.credentials)
+    
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Невалидный токен авторизации",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return user_id
+
+
+# Пускаю к /metrics и /health/* только мониторинг: запрос с адреса из MONITORING_NETWORKS
+# или с токеном MONITORING_TOKEN. Иначе 403 - снаружи не видно ни метрик, ни состояния пулов и кешей.
+# async def - проверка не уходит в threadpool
+async def require_monitoring_access(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(monitoring_security)
+) -> None:
+    # Заголовки приходят декодированными как latin-1: сравниваю исходные байты с токеном в UTF-8
+    if MONITORING_TOKEN and credentials and hmac.compare_digest(
+        credentials.credentials.encode("latin-1"), MONITORING_TOKEN.encode()
+    ):
+        return
+    if request.client:
+        try:
+            address = ipaddress.ip_address(request.client.host)
+        except ValueError:
+            address = None
+        if address is not None and any(address in network for network in MONITORING_NETWORKS):
+            return
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Нет доступа к мониторингу"
+    )
+
 # TODO(!!! tests): unit-тесты зависимости:
 # - успешное получение user_id из валидного токена
 # - ошибка при отсутствии токена
@@ -1,4 +1,4 @@
 # Routes package exports
-from . import auth, tasks
+from . import auth, tasks, auth_async, tasks_async, task_events, debug
 
-__all__ = ['auth', 'tasks']
+__all__ = ['auth', 'tasks', 'auth_async', 'tasks_async', 'task_events', 'debug']
@@ -1,21 +1,51 @@
 # Роуты для регистрации и входа: POST /auth/register, POST /auth/login
 from fastapi import APIRouter, Depends, HTTPException, status
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
 from src.core.database import get_db
 from src.schemas.auth import UserRegister, UserLogin, TokenResponse, UserResponse
-from src.services.auth_service import create_user, authenticate_user, get_user_by_email
+from src.services.auth_service import save_user, get_user_by_email
 from src.auth.security import create_access_token
+from src.auth.hashing import PasswordHashingOverloaded, hash_password_async, verify_password_async
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-# Регистрирую нового пользователя, проверяю что email не занят
+# Превращаю ошибку БД в HTTP 500. Если таблиц нет - подсказываю применить миграции.
+# Общая функция для sync и async роутов
+def db_error_to_http(e: Exception, action: str) -> HTTPException:
+    error_msg = str(e).lower()
+    if "table" in error_msg or "relation" in error_msg or "does not exist" in error_msg:
+        return HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="База данных не настроена. Примените миграции: alembic upgrade head"
+        )
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail=f"Ошибка при {action}: {str(e)}"
+    )
+
+
+# Очередь хеширования паролей заполнена - отвечаю 503 с Retry-After, клиент повторит позже.
+# Общая функция для sync и async роутов
+def hashing_overloaded_to_http(e: PasswordHashingOverloaded) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": "1"},
+    )
+
+
+# Регистрирую нового пользователя, проверяю что email не занят.
+# Роуты авторизации async def и в sync режиме: bcrypt жду в пуле процессов без потока threadpool (иначе поток
+# занят все время очереди и хеширования, и вход толпой забирает потоки у роутов задач),
+# в threadpool ухожу только за запросами к БД через sync сервис
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     try:
-        existing_user = get_user_by_email(db, user_data.email)
+        existing_user = await run_in_threadpool(get_user_by_email, db, user_data.email)
         
         if existing_user:
             raise HTTPException(
@@ -23,10 +53,13 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
                 detail="Пользователь с таким email уже существует"
             )
         
-        user = create_user(db, user_data.email, user_data.password)
+        hashed_password = await hash_password_async(user_data.password)
+        user = await run_in_threadpool(save_user, db, user_data.email, hashed_password)
         return UserResponse(id=user.id, email=user.email)
     except HTTPException:
         raise
+    except PasswordHashingOverloaded as e:
+        raise hashing_overloaded_to_http(e)
     except IntegrityError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -34,25 +67,16 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
     except Exception as e:
         # Если ошибка БД - скорее всего таблицы не созданы или БД недоступна
-        error_msg = str(e).lower()
-        if "table" in error_msg or "relation" in error_msg or "does not exist" in error_msg:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="База данных не настроена. Примените миграции: alembic upgrade head"
-            )
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Ошибка при регистрации: {str(e)}"
-        )
+        raise db_error_to_http(e, "регистрации")
 
 
 # Проверяю email и пароль, возвращаю JWT токен если все ок
 @router.post("/login", response_model=TokenResponse)
-def login(login_data: UserLogin, db: Session = Depends(get_db)):
+async def login(login_data: UserLogin, db: Session = Depends(get_db)):
     try:
-        user = authenticate_user(db, login_data.email, login_data.password)
+        user = await run_in_threadpool(get_user_by_email, db, login_data.email)
         
-        if not user:
+        if not user or not await verify_password_async(login_data.password, user.password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Неверный email или пароль",
@@ -63,17 +87,10 @@ def login(login_data: UserLogin, db: Session = Depends(get_db)):
         return TokenResponse(access_token=access_token)
     except HTTPException:
         raise
+    except PasswordHashingOverloaded as e:
+        raise hashing_overloaded_to_http(e)
     except Exception as e:
-        error_msg = str(e).lower()
-        if "table" in error_msg or "relation" in error_msg or "does not exist" in error_msg:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="База данных не настроена. Примените миграции: alembic upgrade head"
-            )
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Ошибка при входе: {str(e)}"
-        )
+        raise db_error_to_http(e, "входе")
 
 # TODO(!!! tests): integration-тесты для эндпоинтов:
 # - успешная регистрация пользователя
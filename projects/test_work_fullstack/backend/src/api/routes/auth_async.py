@@ -0,0 +1,63 @@
+# Async версия роутов авторизации для режима DB_MODE=async: POST /auth/register, POST /auth/login
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+
+from src.core.database import get_async_db
+from src.api.routes.auth import db_error_to_http, hashing_overloaded_to_http
+from src.schemas.auth import UserRegister, UserLogin, TokenResponse, UserResponse
+from src.services.auth_service_async import create_user, authenticate_user, get_user_by_email
+from src.auth.security import create_access_token
+from src.auth.hashing import PasswordHashingOverloaded
+
+router = APIRouter(prefix="/auth", tags=["auth"])
+
+
+# Регистрирую нового пользователя, проверяю что email не занят
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
+    try:
+        existing_user = await get_user_by_email(db, user_data.email)
+
+        if existing_user:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Пользователь с таким email уже существует"
+            )
+
+        user = await create_user(db, user_data.email, user_data.password)
+        return UserResponse(id=user.id, email=user.email)
+    except HTTPException:
+        raise
+    except PasswordHashingOverloaded as e:
+        raise hashing_overloaded_to_http(e)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Пользователь с таким email уже существует"
+        )
+    except Exception as e:
+        raise db_error_to_http(e, "регистрации")
+
+
+# Проверяю email и пароль, возвращаю JWT токен если все ок
+@router.post("/login", response_model=TokenResponse)
+async def login(login_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    try:
+        user = await authenticate_user(db, login_data.email, login_data.password)
+
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Неверный email или пароль",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        access_token = create_access_token(subject=user.id)
+        return TokenResponse(access_token=access_token)
+    except HTTPException:
+        raise
+    except PasswordHashingOverloaded as e:
+        raise hashing_overloaded_to_http(e)
+    except Exception as e:
+        raise db_error_to_http(e, "входе")
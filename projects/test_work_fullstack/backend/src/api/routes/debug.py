@@ -0,0 +1,60 @@
+# Отладочные роуты для живого воркера. Подключаются только с DEBUG_PROFILE_ENABLED=true,
+# доступ - по JWT пользователям из DEBUG_PROFILE_USERS
+import asyncio
+from enum import Enum
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse
+
+from src.core.config import DEBUG_PROFILE_USERS, DEBUG_PROFILE_MAX_SECONDS
+from src.core.profiler import SamplingProfiler
+from src.api.dependencies import get_current_user_id_async
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+# Один замер на процесс: два профилировщика мешали бы друг другу и удвоили бы нагрузку
+_profile_lock = asyncio.Lock()
+
+
+class ProfileFormat(str, Enum):
+    JSON = "json"
+    COLLAPSED = "collapsed"
+
+
+def ensure_profile_access(user_id: str = Depends(get_current_user_id_async)) -> str:
+    if user_id not in DEBUG_PROFILE_USERS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Нет доступа к профилировщику"
+        )
+    return user_id
+
+
+# Профилирую процесс, который принял запрос, seconds секунд и отдаю CPU по роутам и свернутые стеки.
+# format=collapsed - только стеки текстом для flamegraph.pl или speedscope. Async роут: ожидание замера
+# не занимает поток threadpool
+@router.get("/profile")
+async def profile(
+    request: Request,
+    seconds: float = Query(10, gt=0, le=DEBUG_PROFILE_MAX_SECONDS, description="Сколько секунд профилировать"),
+    interval_ms: float = Query(5, ge=1, le=1000, description="Интервал между снимками стеков, мс"),
+    profile_format: ProfileFormat = Query(ProfileFormat.JSON, alias="format", description="Формат ответа (json, collapsed)"),
+    top: int = Query(50, ge=1, le=1000, description="Сколько самых тяжелых стеков вернуть в json"),
+    user_id: str = Depends(ensure_profile_access),
+):
+    if _profile_lock.locked():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Профилирование уже идет"
+        )
+    async with _profile_lock:
+        profiler = SamplingProfiler(interval_ms / 1000, request.app.routes)
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await asyncio.to_thread(profiler.stop)
+
+    if profile_format == ProfileFormat.COLLAPSED:
+        return PlainTextResponse(profiler.collapsed())
+    return {**profiler.summary(seconds, top), "collapsed": profiler.collapsed()}
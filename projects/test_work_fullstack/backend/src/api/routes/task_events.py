@@ -0,0 +1,97 @@
+# Роуты ленты изменений задач: SSE GET /tasks/events и WebSocket /tasks/events/ws.
+# Общие для обоих DB_MODE, лента всегда работает на AsyncEngine (см. task_feed.py)
+import asyncio
+from typing import AsyncIterator, Optional
+
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from src.core.config import TASK_FEED_ENABLED
+from src.api.dependencies import get_current_user_id_async
+from src.services.auth_service import get_current_user_from_token
+from src.services.task_feed import iter_task_events
+
+router = APIRouter(prefix="/tasks", tags=["tasks"])
+
+# Сколько секунд жду первое сообщение WebSocket с токеном
+WS_AUTH_TIMEOUT = 10
+
+
+def ensure_feed_enabled() -> None:
+    if not TASK_FEED_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Лента изменений отключена"
+        )
+
+
+# Last-Event-ID, который браузер присылает при переподключении. Мусор в заголовке - читаю ленту с начала
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    if value is not None and value.strip().isdigit():
+        return int(value.strip())
+    return None
+
+
+# Одно сообщение SSE. У события reset нет id: Last-Event-ID клиента остается прежним
+def sse_message(event: Optional[dict]) -> bytes:
+    if event is None:
+        return b": ping\n\n"
+    event_id = f"id: {event['id']}\n".encode() if "id" in event else b""
+    return event_id + f"event: {event['type']}\n".encode() + b"data: " + orjson.dumps(event) + b"\n\n"
+
+
+async def iter_sse(user_id: str, after: Optional[int]) -> AsyncIterator[bytes]:
+    async for event in iter_task_events(user_id, after):
+        yield sse_message(event)
+
+
+# Лента изменений задач текущего пользователя в формате Server-Sent Events.
+# Продолжаю с after или заголовка Last-Event-ID, без них - с текущего момента
+@router.get("/events")
+async def task_events_stream(
+    after: Optional[int] = Query(None, ge=0, description="id последнего полученного события"),
+    last_event_id: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user_id_async)
+):
+    ensure_feed_enabled()
+    start = after if after is not None else parse_last_event_id(last_event_id)
+    return StreamingResponse(
+        iter_sse(user_id, start),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Та же лента через WebSocket. Браузер не дает передать заголовок Authorization, поэтому первым
+# сообщением клиент присылает {"token": "...", "after": id или null}. Дальше сервер шлет события
+# JSON сообщениями и {"type": "ping"} вместо heartbeat
+@router.websocket("/events/ws")
+async def task_events_ws(websocket: WebSocket):
+    await websocket.accept()
+    if not TASK_FEED_ENABLED:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Лента изменений отключена")
+        return
+    # Бинарный кадр вместо текстового receive_json отдает как KeyError, не JSON - как ValueError (JSONDecodeError).
+    # Клиент, закрывший соединение до токена, закрывать уже не нужно
+    try:
+        hello = await asyncio.wait_for(websocket.receive_json(), timeout=WS_AUTH_TIMEOUT)
+    except WebSocketDisconnect:
+        return
+    except (asyncio.TimeoutError, KeyError, ValueError):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Нет токена авторизации")
+        return
+    token = hello.get("token") if isinstance(hello, dict) else None
+    user_id = get_current_user_from_token(token) if isinstance(token, str) else None
+    if not user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Невалидный токен авторизации")
+        return
+    after = hello.get("after")
+    if not isinstance(after, int) or isinstance(after, bool) or after < 0:
+        after = None
+
+    try:
+        async for event in iter_task_events(user_id, after):
+            await websocket.send_text(orjson.dumps(event or {"type": "ping"}).decode())
+    except WebSocketDisconnect:
+        pass
@@ -1,50 +1,261 @@
-# Роуты для задач. Все требуют JWT токен. GET /tasks, POST /tasks, GET /tasks/{id}, PUT /tasks/{id}, DELETE /tasks/{id}
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+# Роуты для задач. Все требуют JWT токен. GET /tasks, POST /tasks, GET /tasks/{id}, PUT /tasks/{id}, DELETE /tasks/{id},
+# пакетные POST/PATCH/DELETE /tasks/batch, выгрузка GET /tasks/export и загрузка POST /tasks/import
+import logging
+from datetime import date as date_class
+from typing import AsyncIterator, Iterator, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
 from src.core.database import get_db
 from src.api.dependencies import get_current_user_id
-from src.schemas.task import TaskCreate, TaskUpdate, TaskResponse, TaskListResponse, TaskStatus
+from src.schemas.task import (
+    TaskCreate,
+    TaskUpdate,
+    TaskResponse,
+    TaskListResponse,
+    TaskStatus,
+    TaskFileFormat,
+    TaskBatchCreate,
+    TaskBatchUpdate,
+    TaskBatchDelete,
+    TaskBatchResponse,
+    TaskImportResponse,
+)
 from src.services.task_service import (
     create_task,
-    get_task_by_id,
+    get_task_cached,
     get_tasks,
     get_available_dates,
     get_available_months,
     update_task,
-    delete_task
+    delete_task,
+    create_tasks_batch,
+    update_tasks_batch,
+    delete_tasks_batch,
+    import_tasks_batch,
+    get_task_version,
+    parse_task_fields,
+    InvalidCursorError,
+    InvalidFieldsError
 )
+from src.services.task_batch import DuplicateBatchIdError
+from src.services.task_export import iter_task_export, EXPORT_MEDIA_TYPES, export_filename
+from src.services.task_import import TaskImportReader, InvalidImportError, IMPORT_DB_ERRORS, import_report
+from src.services.task_search import parse_search_query, InvalidSearchError
+from src.services.task_versions import task_etag, etag_matches
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+logger = logging.getLogger(__name__)
+
+
+# Перевожу задачу из БД (строку с колонками задачи, объект Task или снимок из кеша) в JSON ответа:
+# поля и их порядок как в TaskResponse. Общая функция для sync и async роутов
+def task_to_json(task) -> dict:
+    return {
+        "title": task.title,
+        "description": task.description,
+        "status": task.status.value,
+        "id": task.id,
+        "createdAt": task.created_at,
+        "userId": task.user_id,
+    }
+
+
+# Отдаю ответ, уже собранный в форме response_model, через orjson. Возвращаю Response сам,
+# поэтому FastAPI не валидирует ответ повторно и не гоняет его через jsonable_encoder.
+# response_model у роутов остается для документации
+def json_response(content: dict, status_code: int = status.HTTP_200_OK) -> ORJSONResponse:
+    return ORJSONResponse(content, status_code=status_code)
+
+
+# Ответ с одной задачей
+def task_response(task, status_code: int = status.HTTP_200_OK) -> ORJSONResponse:
+    return json_response(task_to_json(task), status_code)
+
+
+# Ответ со страницей задач (TaskListResponse). Задачи списка - кортежи с колонками task_list_columns(fields),
+# поэтому распаковываю их по позиции: на странице в 1000 задач это в разы быстрее обращения к атрибутам строки.
+# С fields в строке только выбранные поля в их порядке, статус orjson сам отдает значением enum
+def task_list_response(
+    tasks: list,
+    total: Optional[int],
+    next_cursor: Optional[str],
+    fields: Optional[tuple[str, ...]] = None
+) -> ORJSONResponse:
+    if fields is None:
+        items = [
+            {
+                "title": title,
+                "description": description,
+                "status": task_status.value,
+                "id": task_id,
+                "createdAt": created_at,
+                "userId": task_user_id,
+            }
+            for task_id, title, description, task_status, created_at, task_user_id in tasks
+        ]
+    else:
+        items = [dict(zip(fields, task)) for task in tasks]
+    return json_response({
+        "tasks": items,
+        "total": total,
+        "next_cursor": next_cursor,
+    })
+
+
+# Собираю ответ пакетного запроса (TaskBatchResponse) из (id, результат, задача)
+def batch_to_response(results: list[tuple], status_code: int = status.HTTP_200_OK) -> ORJSONResponse:
+    return json_response({
+        "results": [
+            {"id": task_id, "result": result, "task": task_to_json(task) if task is not None else None}
+            for task_id, result, task in results
+        ]
+    }, status_code)
+
+
+# ETag ответа чтения задач: версия задач пользователя, путь и параметры запроса.
+# Для day_group добавляю сегодняшнюю дату: после полуночи "today" - другой список при той же версии
+def read_etag(request: Request, user_id: str, task_version: int) -> str:
+    parts = [request.url.path, request.url.query]
+    if request.query_params.get("day_group"):
+        parts.append(date_class.today().isoformat())
+    return task_etag(user_id, task_version, *parts)
 
-# Получаю список задач пользователя, можно отфильтровать по статусу, дате, группе дней или месяцу
+
+# Заголовки кеширования ответов чтения: браузер хранит ответ, но каждый раз переспрашивает сервер с If-None-Match
+def etag_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+# 304 без тела, если ETag клиента совпадает с текущим, иначе None - нужно собрать ответ
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
+    return None
+
+
+# Добавляю ETag к собранному ответу
+def with_etag(response: Response, etag: str) -> Response:
+    response.headers.update(etag_headers(etag))
+    return response
+
+
+# Повторяющиеся id в пакете - ошибка 400. Общая функция для sync и async роутов
+def duplicate_ids_to_http(e: DuplicateBatchIdError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=str(e)
+    )
+
+
+# Получаю список задач пользователя, можно отфильтровать по статусу, дате, группе дней или месяцу.
+# fields=title,status - отдать только эти поля задач (для облегченных списков без description).
+# q - поиск по заголовку и описанию: задачи по релевантности, фильтры и курсор работают как без поиска.
+# С If-None-Match и неизменной версией задач отвечаю 304, не читая задачи
 @router.get("", response_model=TaskListResponse)
 def list_tasks(
+    request: Request,
     status_filter: Optional[TaskStatus] = Query(None, alias="status", description="Фильтр по статусу"),
     date_filter: Optional[str] = Query(None, alias="date", description="Фильтр по дате (YYYY-MM-DD)"),
     day_group: Optional[str] = Query(None, alias="day_group", description="Фильтр по группе дней (today, yesterday, week, month)"),
     month_filter: Optional[str] = Query(None, alias="month", description="Фильтр по месяцу (YYYY-MM)"),
     skip: int = Query(0, ge=0, description="Количество пропущенных записей"),
     limit: int = Query(100, ge=1, le=1000, description="Максимальное количество записей"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы из next_cursor (skip при этом не используется)"),
+    with_total: Optional[bool] = Query(None, description="Считать total. По умолчанию считаю без курсора и не считаю с курсором"),
+    exact_total: bool = Query(False, description="Точный COUNT(*) вместо счетчиков задач"),
+    fields: Optional[str] = Query(None, description="Поля задач через запятую (title, description, status, userId), id и createdAt отдаются всегда"),
+    q: Optional[str] = Query(None, max_length=200, description="Поиск по заголовку и описанию, результаты по релевантности"),
     user_id: str = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
-    tasks, total = get_tasks(db, user_id, status_filter, date_filter, day_group, month_filter, skip, limit)
-    return TaskListResponse(
-        tasks=[TaskResponse(
-            id=task.id,
-            title=task.title,
-            description=task.description,
-            status=TaskStatus(task.status.value),
-            createdAt=task.created_at,
-            userId=task.user_id
-        ) for task in tasks],
-        total=total
+    # Без курсора по умолчанию отдаю total как раньше, с курсором COUNT(*) не делаю - страница стоит как первая
+    if with_total is None:
+        with_total = cursor is None
+    
+    task_version = get_task_version(db, user_id)
+    etag = read_etag(request, user_id, task_version)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    
+    try:
+        task_fields = parse_task_fields(fields)
+        search = parse_search_query(q)
+        tasks, total, next_cursor = get_tasks(
+            db, user_id, status_filter, date_filter, day_group, month_filter,
+            skip, limit, cursor, with_total, exact_total, task_fields, task_version, search
+        )
+    except (InvalidCursorError, InvalidFieldsError, InvalidSearchError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return with_etag(task_list_response(tasks, total, next_cursor, task_fields), etag)
+
+
+# Отдаю выгрузку потоком: куски из генератора уходят клиенту по мере чтения из БД, файл целиком не собираю
+def export_response(
+    chunks: Union[Iterator[bytes], AsyncIterator[bytes]],
+    export_format: TaskFileFormat
+) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(export_format)}"'}
     )
 
 
+# Выгружаю все задачи пользователя в NDJSON или CSV с теми же фильтрами, что и у списка.
+# Память не растет с количеством задач: строки читаются с серверного курсора пачками
+@router.get("/export")
+def export_tasks(
+    export_format: TaskFileFormat = Query(TaskFileFormat.NDJSON, alias="format", description="Формат выгрузки (ndjson, csv)"),
+    status_filter: Optional[TaskStatus] = Query(None, alias="status", description="Фильтр по статусу"),
+    date_filter: Optional[str] = Query(None, alias="date", description="Фильтр по дате (YYYY-MM-DD)"),
+    day_group: Optional[str] = Query(None, alias="day_group", description="Фильтр по группе дней (today, yesterday, week, month)"),
+    month_filter: Optional[str] = Query(None, alias="month", description="Фильтр по месяцу (YYYY-MM)"),
+    user_id: str = Depends(get_current_user_id)
+):
+    chunks = iter_task_export(user_id, export_format, status_filter, date_filter, day_group, month_filter)
+    return export_response(chunks, export_format)
+
+
+# Получаю список доступных дат для фильтрации (даты когда были созданы задачи)
+# /export, /dates и /months объявлены раньше /{task_id}, иначе их перехватывает роут задачи по ID
+@router.get("/dates")
+def get_task_dates(
+    request: Request,
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    etag = read_etag(request, user_id, get_task_version(db, user_id))
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    dates = get_available_dates(db, user_id)
+    return with_etag(json_response({"dates": dates}), etag)
+
+
+# Получаю список доступных месяцев для фильтрации (месяцы когда были созданы задачи)
+@router.get("/months")
+def get_task_months(
+    request: Request,
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    etag = read_etag(request, user_id, get_task_version(db, user_id))
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    months = get_available_months(db, user_id)
+    return with_etag(json_response({"months": months}), etag)
+
+
 # Создаю новую задачу для текущего пользователя
 @router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
 def create_new_task(
@@ -53,24 +264,119 @@ def create_new_task(
     db: Session = Depends(get_db)
 ):
     task = create_task(db, task_data, user_id)
-    return TaskResponse(
-        id=task.id,
-        title=task.title,
-        description=task.description,
-        status=TaskStatus(task.status.value),
-        createdAt=task.created_at,
-        userId=task.user_id
+    return task_response(task, status.HTTP_201_CREATED)
+
+
+# /batch объявлен раньше /{task_id}, иначе PATCH и DELETE уходят в роуты задачи по ID.
+# Создаю пакет задач одним запросом в одной транзакции. Задачи в ответе в порядке запроса
+@router.post("/batch", response_model=TaskBatchResponse, status_code=status.HTTP_201_CREATED)
+def create_tasks_batch_route(
+    batch: TaskBatchCreate,
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    results = create_tasks_batch(db, batch.tasks, user_id)
+    return batch_to_response(results, status.HTTP_201_CREATED)
+
+
+# Обновляю пакет задач в одной транзакции (например, "отметить все выполненными").
+# По каждому элементу отдаю updated с задачей или not_found
+@router.patch("/batch", response_model=TaskBatchResponse)
+def update_tasks_batch_route(
+    batch: TaskBatchUpdate,
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    try:
+        results = update_tasks_batch(db, batch.tasks, user_id)
+    except DuplicateBatchIdError as e:
+        raise duplicate_ids_to_http(e)
+    return batch_to_response(results)
+
+
+# Удаляю пакет задач одним DELETE в одной транзакции. По каждому id отдаю deleted или not_found
+@router.delete("/batch", response_model=TaskBatchResponse)
+def delete_tasks_batch_route(
+    batch: TaskBatchDelete,
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    try:
+        results = delete_tasks_batch(db, batch.ids, user_id)
+    except DuplicateBatchIdError as e:
+        raise duplicate_ids_to_http(e)
+    return batch_to_response(results)
+
+
+# Файл нельзя разобрать - 400
+def invalid_import_to_http(e: InvalidImportError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=str(e)
+    )
+
+
+# Загрузка оборвалась на середине файла. Пачки до ошибки уже закоммичены, поэтому отдаю отчет по ним вместе
+# с ошибкой: клиент видит, какие строки загружены, и повторяет только остаток, а не весь файл (задвоил бы задачи).
+# Файл не разобран до первой пачки - обычный 400 как раньше
+def import_failed_response(batches: list[dict], e: Exception) -> ORJSONResponse:
+    if isinstance(e, InvalidImportError):
+        if not batches:
+            raise invalid_import_to_http(e)
+        return json_response(import_report(batches, str(e)), status.HTTP_400_BAD_REQUEST)
+    logger.exception("Загрузка задач оборвалась после %s пачек", len(batches))
+    return json_response(
+        import_report(batches, "Ошибка БД при загрузке пачки, строки после последней загруженной пачки не загружены"),
+        status.HTTP_500_INTERNAL_SERVER_ERROR
     )
 
 
+# Разбираю очередной кусок файла и загружаю готовые пачки. Выполняется в threadpool целиком.
+# Отчет каждой загруженной пачки сразу добавляю в reports: если следующая пачка упадет, он не потеряется
+def import_tasks_data(db: Session, reader: TaskImportReader, data: Optional[bytes], user_id: str, reports: list[dict]) -> None:
+    batches = reader.feed(data) if data is not None else reader.close()
+    for batch in batches:
+        reports.append(import_tasks_batch(db, batch, user_id))
+
+
+# Загружаю задачи из NDJSON или CSV в теле запроса. Тело читаю потоком и гружу пачками по
+# TASK_IMPORT_CHUNK_SIZE строк, каждая пачка - своя транзакция: если загрузка оборвется, уже
+# загруженные пачки останутся. Строки с ошибками пропускаю и перечисляю в отчете по пачке.
+# Роут async, потому что тело запроса читается только асинхронно, проверка и запись в БД идут в threadpool
+@router.post("/import", response_model=TaskImportResponse)
+async def import_tasks(
+    request: Request,
+    import_format: TaskFileFormat = Query(TaskFileFormat.NDJSON, alias="format", description="Формат файла (ndjson, csv)"),
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    reader = TaskImportReader(import_format)
+    batches = []
+    try:
+        async for data in request.stream():
+            if data:
+                await run_in_threadpool(import_tasks_data, db, reader, data, user_id, batches)
+        await run_in_threadpool(import_tasks_data, db, reader, None, user_id, batches)
+    except (InvalidImportError, *IMPORT_DB_ERRORS) as e:
+        return import_failed_response(batches, e)
+    return json_response(import_report(batches))
+
+
 # Получаю задачу по ID, пользователь может получить только свои задачи
 @router.get("/{task_id}", response_model=TaskResponse)
 def get_task(
     task_id: str,
+    request: Request,
     user_id: str = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
-    task = get_task_by_id(db, task_id, user_id)
+    task_version = get_task_version(db, user_id)
+    etag = read_etag(request, user_id, task_version)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    
+    task = get_task_cached(db, task_id, user_id, task_version)
     
     if not task:
         raise HTTPException(
@@ -78,14 +384,7 @@ def get_task(
             detail="Задача не найдена"
         )
     
-    return TaskResponse(
-        id=task.id,
-        title=task.title,
-        description=task.description,
-        status=TaskStatus(task.status.value),
-        createdAt=task.created_at,
-        userId=task.user_id
-    )
+    return with_etag(task_response(task), etag)
 
 
 # Обновляю задачу, меняю только переданные поля
@@ -104,14 +403,7 @@ def update_task_route(
             detail="Задача не найдена"
         )
     
-    return TaskResponse(
-        id=updated_task.id,
-        title=updated_task.title,
-        description=updated_task.description,
-        status=TaskStatus(updated_task.status.value),
-        createdAt=updated_task.created_at,
-        userId=updated_task.user_id
-    )
+    return task_response(updated_task)
 
 
 # Удаляю задачу пользователя
@@ -129,25 +421,6 @@ def delete_task_route(
             detail="Задача не найдена"
         )
 
-
-# Получаю список доступных дат для фильтрации (даты когда были созданы задачи)
-@router.get("/dates")
-def get_task_dates(
-    user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
-):
-    dates = get_available_dates(db, user_id)
-    return {"dates": dates}
-
-# Получаю список доступных месяцев для фильтрации (месяцы когда были созданы задачи)
-@router.get("/months")
-def get_task_months(
-    user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
-):
-    months = get_available_months(db, user_id)
-    return {"months": months}
-
 # TODO(!!! tests): integration-тесты для всех эндпоинтов:
 # - получение списка задач (с фильтрацией и без)
 # - создание задачи
@@ -0,0 +1,281 @@
+# Async версия роутов задач для режима DB_MODE=async. Те же пути и схемы что и в tasks.py,
+# но роуты async def и работают через AsyncSession, без threadpool
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.database import get_async_db
+from src.api.dependencies import get_current_user_id_async
+from src.api.routes.tasks import (
+    task_response,
+    task_list_response,
+    batch_to_response,
+    duplicate_ids_to_http,
+    export_response,
+    import_failed_response,
+    json_response,
+    read_etag,
+    not_modified,
+    with_etag
+)
+from src.schemas.task import (
+    TaskCreate,
+    TaskUpdate,
+    TaskResponse,
+    TaskListResponse,
+    TaskStatus,
+    TaskFileFormat,
+    TaskBatchCreate,
+    TaskBatchUpdate,
+    TaskBatchDelete,
+    TaskBatchResponse,
+    TaskImportResponse,
+)
+from src.services.task_service_async import (
+    create_task,
+    get_task_cached,
+    get_tasks,
+    get_available_dates,
+    get_available_months,
+    update_task,
+    delete_task,
+    create_tasks_batch,
+    update_tasks_batch,
+    delete_tasks_batch,
+    import_tasks_batch,
+    get_task_version
+)
+from src.services.task_service import parse_task_fields, InvalidCursorError, InvalidFieldsError
+from src.services.task_batch import DuplicateBatchIdError
+from src.services.task_export import iter_task_export_async
+from src.services.task_import import TaskImportReader, InvalidImportError, IMPORT_DB_ERRORS, import_report
+from src.services.task_search import parse_search_query, InvalidSearchError
+
+router = APIRouter(prefix="/tasks", tags=["tasks"])
+
+
+# Получаю список задач пользователя, можно отфильтровать по статусу, дате, группе дней или месяцу.
+# fields=title,status - отдать только эти поля задач (для облегченных списков без description).
+# q - поиск по заголовку и описанию: задачи по релевантности, фильтры и курсор работают как без поиска.
+# С If-None-Match и неизменной версией задач отвечаю 304, не читая задачи
+@router.get("", response_model=TaskListResponse)
+async def list_tasks(
+    request: Request,
+    status_filter: Optional[TaskStatus] = Query(None, alias="status", description="Фильтр по статусу"),
+    date_filter: Optional[str] = Query(None, alias="date", description="Фильтр по дате (YYYY-MM-DD)"),
+    day_group: Optional[str] = Query(None, alias="day_group", description="Фильтр по группе дней (today, yesterday, week, month)"),
+    month_filter: Optional[str] = Query(None, alias="month", description="Фильтр по месяцу (YYYY-MM)"),
+    skip: int = Query(0, ge=0, description="Количество пропущенных записей"),
+    limit: int = Query(100, ge=1, le=1000, description="Максимальное количество записей"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы из next_cursor (skip при этом не используется)"),
+    with_total: Optional[bool] = Query(None, description="Считать total. По умолчанию считаю без курсора и не считаю с курсором"),
+    exact_total: bool = Query(False, description="Точный COUNT(*) вместо счетчиков задач"),
+    fields: Optional[str] = Query(None, description="Поля задач через запятую (title, description, status, userId), id и createdAt отдаются всегда"),
+    q: Optional[str] = Query(None, max_length=200, description="Поиск по заголовку и описанию, результаты по релевантности"),
+    user_id: str = Depends(get_current_user_id_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Без курсора по умолчанию отдаю total как раньше, с курсором COUNT(*) не делаю - страница стоит как первая
+    if with_total is None:
+        with_total = cursor is None
+
+    task_version = await get_task_version(db, user_id)
+    etag = read_etag(request, user_id, task_version)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+
+    try:
+        task_fields = parse_task_fields(fields)
+        search = parse_search_query(q)
+        tasks, total, next_cursor = await get_tasks(
+            db, user_id, status_filter, date_filter, day_group, month_filter,
+            skip, limit, cursor, with_total, exact_total, task_fields, task_version, search
+        )
+    except (InvalidCursorError, InvalidFieldsError, InvalidSearchError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    return with_etag(task_list_response(tasks, total, next_cursor, task_fields), etag)
+
+
+# Выгружаю все задачи пользователя в NDJSON или CSV с теми же фильтрами, что и у списка
+@router.get("/export")
+async def export_tasks(
+    export_format: TaskFileFormat = Query(TaskFileFormat.NDJSON, alias="format", description="Формат выгрузки (ndjson, csv)"),
+    status_filter: Optional[TaskStatus] = Query(None, alias="status", description="Фильтр по статусу"),
+    date_filter: Optional[str] = Query(None, alias="date", description="Фильтр по дате (YYYY-MM-DD)"),
+    day_group: Optional[str] = Query(None, alias="day_group", description="Фильтр по группе дней (today, yesterday, week, month)"),
+    month_filter: Optional[str] = Query(None, alias="month", description="Фильтр по месяцу (YYYY-MM)"),
+    user_id: str = Depends(get_current_user_id_async)
+):
+    chunks = iter_task_export_async(user_id, export_format, status_filter, date_filter, day_group, month_filter)
+    return export_response(chunks, export_format)
+
+
+# Получаю список доступных дат для фильтрации (даты когда были созданы задачи)
+@router.get("/dates")
+async def get_task_dates(
+    request: Request,
+    user_id: str = Depends(get_current_user_id_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    etag = read_etag(request, user_id, await get_task_version(db, user_id))
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    dates = await get_available_dates(db, user_id)
+    return with_etag(json_response({"dates": dates}), etag)
+
+
+# Получаю список доступных месяцев для фильтрации (месяцы когда были созданы задачи)
+@router.get("/months")
+async def get_task_months(
+    request: Request,
+    user_id: str = Depends(get_current_user_id_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    etag = read_etag(request, user_id, await get_task_version(db, user_id))
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    months = await get_available_months(db, user_id)
+    return with_etag(json_response({"months": months}), etag)
+
+
+# Создаю новую задачу для текущего пользователя
+@router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
+async def create_new_task(
+    task_data: TaskCreate,
+    user_id: str = Depends(get_current_user_id_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    task = await create_task(db, task_data, user_id)
+    return task_response(task, status.HTTP_201_CREATED)
+
+
+# /batch объявлен раньше /{task_id}, иначе PATCH и DELETE уходят в роуты задачи по ID.
+# Создаю пакет задач одним запросом в одной транзакции. Задачи в ответе в порядке запроса
+@router.post("/batch", response_model=TaskBatchResponse, status_code=status.HTTP_201_CREATED)
+async def create_tasks_batch_route(
+    batch: TaskBatchCreate,
+    user_id: str = Depends(get_current_user_id_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    results = await create_tasks_batch(db, batch.tasks, user_id)
+    return batch_to_response(results, status.HTTP_201_CREATED)
+
+
+# Обновляю пакет задач в одной транзакции (например, "отметить все выполненными").
+# По каждому элементу отдаю updated с задачей или not_found
+@router.patch("/batch", response_model=TaskBatchResponse)
+async def update_tasks_batch_route(
+    batch: TaskBatchUpdate,
+    user_id: str = Depends(get_current_user_id_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        results = await update_tasks_batch(db, batch.tasks, user_id)
+    except DuplicateBatchIdError as e:
+        raise duplicate_ids_to_http(e)
+    return batch_to_response(results)
+
+
+# Удаляю пакет задач одним DELETE в одной транзакции. По каждому id отдаю deleted или not_found
+@router.delete("/batch", response_model=TaskBatchResponse)
+async def delete_tasks_batch_route(
+    batch: TaskBatchDelete,
+    user_id: str = Depends(get_current_user_id_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        results = await delete_tasks_batch(db, batch.ids, user_id)
+    except DuplicateBatchIdError as e:
+        raise duplicate_ids_to_http(e)
+    return batch_to_response(results)
+
+
+# Загружаю задачи из NDJSON или CSV в теле запроса пачками, каждая пачка - своя транзакция.
+# Разбор и проверка куска файла (тысячи строк через pydantic) идут в threadpool, чтобы не держать event loop,
+# запись пачек - на AsyncEngine
+@router.post("/import", response_model=TaskImportResponse)
+async def import_tasks(
+    request: Request,
+    import_format: TaskFileFormat = Query(TaskFileFormat.NDJSON, alias="format", description="Формат файла (ndjson, csv)"),
+    user_id: str = Depends(get_current_user_id_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    reader = TaskImportReader(import_format)
+    batches = []
+    try:
+        async for data in request.stream():
+            for batch in await run_in_threadpool(reader.feed, data):
+                batches.append(await import_tasks_batch(db, batch, user_id))
+        for batch in await run_in_threadpool(reader.close):
+            batches.append(await import_tasks_batch(db, batch, user_id))
+    except (InvalidImportError, *IMPORT_DB_ERRORS) as e:
+        return import_failed_response(batches, e)
+    return json_response(import_report(batches))
+
+
+# Получаю задачу по ID, пользователь может получить только свои задачи
+@router.get("/{task_id}", response_model=TaskResponse)
+async def get_task(
+    task_id: str,
+    request: Request,
+    user_id: str = Depends(get_current_user_id_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    task_version = await get_task_version(db, user_id)
+    etag = read_etag(request, user_id, task_version)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+
+    task = await get_task_cached(db, task_id, user_id, task_version)
+
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Задача не найдена"
+        )
+
+    return with_etag(task_response(task), etag)
+
+
+# Обновляю задачу, меняю только переданные поля
+@router.put("/{task_id}", response_model=TaskResponse)
+async def update_task_route(
+    task_id: str,
+    task_data: TaskUpdate,
+    user_id: str = Depends(get_current_user_id_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    updated_task = await update_task(db, task_id, user_id, task_data)
+
+    if not updated_task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Задача не найдена"
+        )
+
+    return task_response(updated_task)
+
+
+# Удаляю задачу пользователя
+@router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_task_route(
+    task_id: str,
+    user_id: str = Depends(get_current_user_id_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    deleted = await delete_task(db, task_id, user_id)
+
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Задача не найдена"
+        )
@@ -0,0 +1,137 @@
+# Выношу bcrypt (hash_password/verify_password) в отдельный пул процессов, чтобы вход и регистрация
+# не занимали CPU и слоты threadpool, нужные роутам задач. Очередь ограничена HASH_MAX_QUEUE:
+# если она заполнена, сразу бросаю PasswordHashingOverloaded (роуты отвечают 503), а не копим запросы
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from src.core.config import HASH_POOL_ENABLED, HASH_WORKERS, HASH_MAX_QUEUE
+from src.core.metrics import Histogram
+from src.auth.security import hash_password, verify_password
+
+
+# Очередь хеширования заполнена - запрос отклонен
+class PasswordHashingOverloaded(Exception):
+    pass
+
+
+# Выполняется в процессе пула: вызываю функцию и возвращаю результат вместе с временем работы
+def _timed_call(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+# Пул процессов для bcrypt с ограничением очереди и метриками
+class PasswordHasher:
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        # Время bcrypt в процессе пула и время ожидания в очереди до начала работы
+        self.hash_latency = Histogram()
+        self.queue_wait = Histogram()
+
+    # Процессы запускаю лениво в текущем процессе: после fork у каждого воркера uvicorn свой пул.
+    # spawn, а не fork - форкать процесс с потоками event loop и threadpool небезопасно
+    def start(self) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # Ставлю задачу в пул, если есть место в очереди. Возвращаю future с результатом функции
+    def submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self.in_flight >= self.max_queue:
+                self.rejected += 1
+                raise PasswordHashingOverloaded("Сервис перегружен, повторите вход позже")
+            self.in_flight += 1
+        self.start()
+
+        submitted = time.perf_counter()
+        result: Future = Future()
+
+        def on_done(inner: Future) -> None:
+            total_ms = (time.perf_counter() - submitted) * 1000
+            with self._lock:
+                self.in_flight -= 1
+            error = inner.exception()
+            if error is not None:
+                with self._lock:
+                    self.failed += 1
+                result.set_exception(error)
+                return
+            value, run_ms = inner.result()
+            with self._lock:
+                self.completed += 1
+            self.hash_latency.observe(run_ms)
+            self.queue_wait.observe(max(0.0, total_ms - run_ms))
+            result.set_result(value)
+
+        try:
+            try:
+                inner = self._executor.submit(_timed_call, fn, *args)
+            except BrokenProcessPool:
+                # Процесс пула упал - пересоздаю пул и пробую еще раз
+                self.shutdown()
+                self.start()
+                inner = self._executor.submit(_timed_call, fn, *args)
+        except Exception:
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        inner.add_done_callback(on_done)
+        return result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = {
+                "enabled": HASH_POOL_ENABLED,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+        stats["hash_latency_ms"] = self.hash_latency.snapshot()
+        stats["queue_wait_ms"] = self.queue_wait.snapshot()
+        return stats
+
+
+password_hasher = PasswordHasher(HASH_WORKERS, HASH_MAX_QUEUE)
+
+
+# Хеширую пароль в пуле, не блокируя event loop (для роутов авторизации).
+# Без пула - в threadpool, чтобы bcrypt все равно не блокировал event loop
+async def hash_password_async(plain_password: str) -> str:
+    if not HASH_POOL_ENABLED:
+        return await run_in_threadpool(hash_password, plain_password)
+    return await asyncio.wrap_future(password_hasher.submit(hash_password, plain_password))
+
+
+# Проверяю пароль в пуле, не блокируя event loop (для роутов авторизации)
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    if not HASH_POOL_ENABLED:
+        return await run_in_threadpool(verify_password, plain_password, hashed_password)
+    return await asyncio.wrap_future(password_hasher.submit(verify_password, plain_password, hashed_password))
@@ -5,7 +5,7 @@ from jose import jwt
 from passlib.context import CryptContext
 import bcrypt
 
-from src.core.config import JWT_SECRET, JWT_ALGORITHM, JWT_EXPIRES_MIN
+from src.core.config import JWT_SECRET, JWT_ALGORITHM, JWT_EXPIRES_MIN, BCRYPT_ROUNDS
 
 password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -25,8 +25,9 @@ def hash_password(plain_password: str) -> str:
         password_bytes = truncated
     
     # Использую bcrypt напрямую с байтами для гарантии обрезки
-    # Генерирую соль и хеширую пароль
-    salt = bcrypt.gensalt()
+    # Генерирую соль и хеширую пароль, стоимость из BCRYPT_ROUNDS.
+    # При проверке стоимость берется из самого хеша, поэтому старые хеши продолжают работать
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     # Возвращаю как строку (passlib формат)
     return hashed.decode('utf-8')
@@ -0,0 +1,78 @@
+# Кеш проверенных JWT токенов: jwt.decode на каждый запрос к задачам стоит заметно дороже поиска в словаре.
+# Ключ - sha256 от токена (сам токен в памяти не держу), запись живет до exp токена,
+# но не дольше TOKEN_CACHE_TTL, размер ограничен TOKEN_CACHE_SIZE (вытесняю самые старые по LRU)
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from src.core.config import TOKEN_CACHE_ENABLED, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL
+
+
+# LRU кеш token -> user_id с истечением записей. Пишу из разных потоков, поэтому под локом
+class TokenCache:
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[bytes, tuple[str, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    # user_id для токена, если он уже проверен и запись не истекла
+    def get(self, token: str) -> Optional[str]:
+        key = self._key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            user_id, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return user_id
+
+    # Запоминаю проверенный токен. exp - время истечения из payload (unix time), если есть
+    def put(self, token: str, user_id: str, exp: Optional[float] = None) -> None:
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (user_id, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": TOKEN_CACHE_ENABLED,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
@@ -0,0 +1,115 @@
+# Кеш для чтения: общий интерфейс бэкенда и реализация в памяти процесса (LRU + TTL).
+# Общий кеш между процессами (Redis, memcached) подключается реализацией CacheBackend
+# и выбором в create_cache_backend, код сервисов от этого не меняется
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+# Интерфейс бэкенда кеша. Значения - готовые неизменяемые объекты, общий бэкенд сам их сериализует.
+# Методы синхронные и вызываются в том числе из async роутов, поэтому должны быть быстрыми
+class CacheBackend:
+    name = "base"
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    # ttl в секундах, None - без ограничения (запись живет пока ее не вытеснят)
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def snapshot(self) -> dict:
+        return {"backend": self.name}
+
+
+# Кеш выключен: ничего не хранит, каждый get - промах
+class NullCache(CacheBackend):
+    name = "none"
+
+    def get(self, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        pass
+
+    def delete(self, key: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+# LRU кеш в памяти процесса с истечением записей. Пишу из разных потоков, поэтому под локом.
+# У каждого процесса (воркера uvicorn) свой кеш
+class LocalCache(CacheBackend):
+    name = "local"
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[Any, Optional[float]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Создаю бэкенд по имени из конфига: local - в памяти процесса, none - без кеша
+def create_cache_backend(name: str, max_size: int) -> CacheBackend:
+    if name == "local":
+        return LocalCache(max_size)
+    if name == "none":
+        return NullCache()
+    raise ValueError(f"Неизвестный бэкенд кеша: {name}")
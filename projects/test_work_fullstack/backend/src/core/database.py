@@ -1,18 +1,75 @@
 # Работаю с БД через SQLAlchemy
+from typing import AsyncIterator
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
-from src.core.config import DATABASE_URL
+from src.core.config import (
+    DATABASE_URL,
+    DB_ASYNC,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_TIMEOUT_MS,
+    METRICS_ENABLED,
+)
+from src.core.pool import InstrumentedQueuePool, InstrumentedAsyncQueuePool
+from src.core.request_metrics import instrument_engine
 
 # Преобразую URL для использования psycopg3 (psycopg)
 # Если URL начинается с postgresql://, заменяю на postgresql+psycopg://
 db_url = DATABASE_URL.replace("postgresql://", "postgresql+psycopg://", 1)
 
+# Параметры пула из конфига, общие для sync и async движка
+pool_options = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+# statement_timeout выставляю при подключении, чтобы зависший запрос не держал соединение вечно
+connect_args = {}
+if DB_STATEMENT_TIMEOUT_MS > 0:
+    connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
 # Создаю движок БД с явным указанием psycopg3 драйвера
-engine = create_engine(db_url, echo=False)
+engine = create_engine(
+    db_url,
+    echo=False,
+    poolclass=InstrumentedQueuePool,
+    connect_args=connect_args,
+    **pool_options,
+)
+
+# Асинхронный движок для режима DB_MODE=async. psycopg3 умеет работать и в async режиме,
+# поэтому URL тот же. Подключения создаются лениво, так что в sync режиме он ничего не стоит
+async_engine = create_async_engine(
+    db_url,
+    echo=False,
+    poolclass=InstrumentedAsyncQueuePool,
+    connect_args=connect_args,
+    **pool_options,
+)
+
+# Считаю SQL запросы и их время для /metrics. У AsyncEngine события вешаются на его sync_engine
+if METRICS_ENABLED:
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
 
 # Сессии БД
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронные сессии. expire_on_commit=False - после commit объекты остаются доступными
+# без повторного SELECT (в async режиме ленивая подгрузка атрибутов не работает)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # Базовый класс для моделей
 Base = declarative_base()
 
@@ -26,14 +83,45 @@ def get_db() -> Session:
         db.close()
 
 
+# Получаю асинхронную сессию БД для async роутов
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Метрики пула соединений для introspection эндпоинта
+def get_pool_stats() -> dict:
+    return {
+        "mode": "async" if DB_ASYNC else "sync",
+        "pools": {
+            "sync": InstrumentedQueuePool.metrics.snapshot(engine.pool),
+            "async": InstrumentedAsyncQueuePool.metrics.snapshot(async_engine.pool),
+        },
+    }
+
+
 # Подключаюсь к БД при старте приложения
 async def connect_db():
     # Создаю таблицы если их нет
-    Base.metadata.create_all(bind=engine)
+    if DB_ASYNC:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    else:
+        Base.metadata.create_all(bind=engine)
+
+
+# Новые пулы в воркере сразу после fork. Движки создаются при импорте, а продакшен сервер импортирует
+# приложение в мастере до fork (run.py): без этого воркеры получили бы копию пула мастера и могли бы делить
+# с ним и друг с другом соединения (один сокет Postgres на несколько процессов). close=False - соединения
+# родителя не закрываю, они принадлежат ему
+def dispose_engines_after_fork() -> None:
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
 
 
 # Отключаюсь от БД при остановке приложения
 async def disconnect_db():
     engine.dispose()
+    await async_engine.dispose()
 
 # TODO(!!! tests): unit-тесты для подключения/отключения БД, тесты изоляции транзакций
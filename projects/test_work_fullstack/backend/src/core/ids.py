@@ -0,0 +1,73 @@
+# Id новых строк: UUIDv7 (RFC 9562). Старшие 48 бит - время в миллисекундах от эпохи Unix, поэтому новые id
+# растут со временем и вставка попадает в правый край индекса первичного ключа, а не на случайную страницу
+# как с uuid4. Тип колонок тот же uuid, старые uuid4 id остаются как есть и работают вместе с новыми.
+# Внутри одной миллисекунды id процесса тоже растут (12 бит счетчика), поэтому в сортировке
+# (created_at, id) задачи с одинаковым created_at (пакет, загрузка) идут в порядке создания
+import secrets
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import cast, func, literal
+from sqlalchemy.dialects.postgresql import BYTEA, UUID
+
+_EPOCH = datetime(1970, 1, 1)
+# Счетчик после смены миллисекунды начинаю со случайного значения в нижней половине диапазона:
+# в старшей половине остается запас на 2048+ id за миллисекунду до переноса в следующую
+_COUNTER_SEED_BITS = 11
+_COUNTER_MAX = 0xFFF
+
+_lock = threading.Lock()
+_last_ms = -1
+_counter = 0
+
+
+# Миллисекунды от эпохи. datetime без зоны считаю UTC, как created_at в моделях (datetime.utcnow)
+def unix_ms(at: datetime) -> int:
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = at - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1000 + delta.microseconds // 1000
+
+
+def _next_timestamp(ms: int) -> tuple[int, int]:
+    global _last_ms, _counter
+    with _lock:
+        if ms > _last_ms:
+            _last_ms, _counter = ms, secrets.randbits(_COUNTER_SEED_BITS)
+        else:
+            # Та же миллисекунда (или часы ушли назад, или at раньше прошлого) - продолжаю последовательность
+            _counter += 1
+            if _counter > _COUNTER_MAX:
+                _last_ms, _counter = _last_ms + 1, secrets.randbits(_COUNTER_SEED_BITS)
+        return _last_ms, _counter
+
+
+# Новый id строкой, как у колонок UUID(as_uuid=False). at - время строки (created_at), чтобы время в id
+# совпадало с ним; по умолчанию - текущее
+def uuid7(at: Optional[datetime] = None) -> str:
+    ms, counter = _next_timestamp(unix_ms(at or datetime.utcnow()))
+    value = (ms << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | secrets.randbits(62)
+    h = f"{value:032x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+# UUIDv7 для строк, которые создает сама БД (INSERT ... SELECT при загрузке задач): 48 бит времени at
+# поверх gen_random_uuid() и версия 7. Счетчика нет - порядок id внутри одной миллисекунды случайный
+def uuid7_sql(at: datetime):
+    prefix = unix_ms(at).to_bytes(6, "big")
+    raw = func.overlay(func.uuid_send(func.gen_random_uuid()), literal(prefix, BYTEA), 1, 6)
+    # Версия - старшие 4 бита байта 6: у uuid4 там 0100, ставлю биты 52 и 53 и получаю 0111
+    raw = func.set_bit(func.set_bit(raw, 52, 1), 53, 1)
+    return cast(func.encode(raw, "hex"), UUID(as_uuid=False))
+
+
+# id из запроса (путь, тело пакета) в виде канонической UUID строки, None - если это не UUID.
+# Колонки id в Postgres - uuid: некорректную строку он не сравнивает, а отвергает весь запрос ошибкой,
+# поэтому такой id заведомо не найдется и в БД его не отправляю
+def parse_id(value) -> Optional[str]:
+    try:
+        return str(uuid.UUID(value))
+    except (ValueError, AttributeError, TypeError):
+        return None
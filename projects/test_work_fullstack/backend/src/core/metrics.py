@@ -0,0 +1,49 @@
+# Простые метрики процесса: гистограммы задержек. Пишу из разных потоков, поэтому под локом
+import bisect
+import threading
+
+# Границы бакетов по умолчанию, в миллисекундах
+DEFAULT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+# Гистограмма значений в миллисекундах: бакеты, количество, сумма и максимум
+class Histogram:
+    def __init__(self, buckets_ms: tuple = DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            # Последний бакет - все что дольше самой большой границы (+Inf)
+            self.bucket_counts = [0] * (len(self.buckets_ms) + 1)
+            self.count = 0
+            self.sum_ms = 0.0
+            self.max_ms = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        # Первый бакет с границей >= значения, за последней границей - бакет +Inf
+        index = bisect.bisect_left(self.buckets_ms, value_ms)
+        with self._lock:
+            self.bucket_counts[index] += 1
+            self.count += 1
+            self.sum_ms += value_ms
+            if value_ms > self.max_ms:
+                self.max_ms = value_ms
+
+    # Снимок гистограммы. Бакеты накопительные, как в Prometheus: сколько значений уложились в границу
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets = {}
+            cumulative = 0
+            for bound, count in zip(self.buckets_ms, self.bucket_counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            buckets["+Inf"] = cumulative + self.bucket_counts[-1]
+            return {
+                "count": self.count,
+                "sum": round(self.sum_ms, 3),
+                "avg": round(self.sum_ms / self.count, 3) if self.count else 0.0,
+                "max": round(self.max_ms, 3),
+                "buckets": buckets,
+            }
@@ -0,0 +1,79 @@
+# Пул соединений с метриками: гистограмма ожидания checkout, таймауты, активные/свободные соединения.
+# По этим данным подбираю размер пула на реплику
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+from src.core.metrics import Histogram
+from src.core.request_metrics import record_pool_wait
+
+
+# Счетчики одного пула. Пишу из разных потоков, поэтому под локом
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkout_wait = Histogram()
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkout_wait.reset()
+        with self._lock:
+            self.timeouts = 0
+
+    # Записываю сколько ждал соединение из пула (включая создание нового и pre-ping)
+    def observe_checkout(self, wait_ms: float) -> None:
+        self.checkout_wait.observe(wait_ms)
+
+    # Соединение так и не дождались за pool_timeout
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    # Снимок метрик вместе с текущим состоянием пула
+    def snapshot(self, pool) -> dict:
+        wait = self.checkout_wait.snapshot()
+        stats = {
+            "checkouts": wait.pop("count"),
+            "checkout_timeouts": self.timeouts,
+            "checkout_wait_ms": wait,
+        }
+
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "size": pool.size(),
+                "active": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "timeout": pool.timeout(),
+            })
+        return stats
+
+
+# Примесь для пулов: замеряю время каждого checkout (и добавляю его к метрикам текущего запроса) и считаю таймауты.
+# Метрики храню на классе, потому что engine.dispose() пересоздает пул через recreate()
+class _InstrumentedPoolMixin:
+    metrics: PoolMetrics
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        wait_ms = (time.perf_counter() - start) * 1000
+        self.metrics.observe_checkout(wait_ms)
+        record_pool_wait(wait_ms)
+        return connection
+
+
+# Пул для sync движка
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    metrics = PoolMetrics("sync")
+
+
+# Пул для async движка (DB_MODE=async)
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metrics = PoolMetrics("async")
@@ -0,0 +1,155 @@
+# Статистический профилировщик живого процесса для GET /debug/profile.
+# Отдельный поток раз в interval снимает стеки всех потоков (sys._current_frames): поток event loop,
+# потоки threadpool sync роутов, фоновые потоки. Вес стека - сколько CPU поток потратил с прошлого снимка
+# (часы CPU потока, pthread_getcpuclockid), поэтому потоки, которые ждут (epoll, очередь threadpool, сокет БД),
+# в профиль не попадают, а горячий код получает вес по реально потраченному CPU.
+# Стек отношу к роуту: функция роута (sync роуты в threadpool) или кадр MetricsMiddleware со scope запроса
+# (все, что выполняется в event loop для этого запроса: зависимости, async роут, сериализация ответа).
+# Снимок берется, когда профилировщик получает GIL, а это часто момент, когда поток только что закончил работу
+# и заснул (поток threadpool ждет следующую задачу, event loop - epoll). CPU, замеченный на таком стеке ожидания,
+# отношу к прошлому рабочему стеку потока, а если его не было - к отдельному корню "(между снимками)".
+# Результат - свернутые стеки (формат flamegraph.pl / speedscope: "кадр;кадр;... вес") и CPU по роутам.
+# Работает без перезапуска воркера, на время замера добавляет один поток. Его собственный CPU (profiler_cpu_ms)
+# отдаю вместе с результатом, в профиль он не входит
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from src.core.request_metrics import MetricsMiddleware, request_metrics
+
+# Корень стека для кода вне HTTP запросов (слушатель ленты, пул хеширования, очистка кеша)
+NO_ROUTE = "-"
+# Корень для CPU, потраченного между снимками кодом, который ни один снимок не застал
+MISSED = "(между снимками)"
+# Функции, в которых поток ждет работу: лист такого стека без роута - поток простаивает.
+# Runner.run - лист event loop на uvloop (цикл целиком в C), EpollSelector.select - на стандартном asyncio
+IDLE_LEAVES = {"Condition.wait", "Event.wait", "Queue.get", "Runner.run", "EpollSelector.select"}
+
+_MIDDLEWARE_CODE = MetricsMiddleware.__call__.__code__
+
+
+# Часы CPU потока в наносекундах. Поток мог завершиться между снимком стеков и чтением часов
+def _thread_cpu_ns(thread_id: int) -> Optional[int]:
+    try:
+        return time.clock_gettime_ns(time.pthread_getcpuclockid(thread_id))
+    except (OSError, AttributeError):
+        return None
+
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_qualname}".replace(";", ",")
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float, routes: list):
+        self.interval = interval
+        # Код функций роутов -> "МЕТОД путь"
+        self.endpoint_codes = {}
+        for route in routes:
+            endpoint = getattr(route, "endpoint", None)
+            code = getattr(endpoint, "__code__", None)
+            if code is not None:
+                methods = ",".join(sorted(getattr(route, "methods", None) or ["WS"]))
+                self.endpoint_codes[code] = f"{methods} {route.path}"
+        self.stacks: Counter = Counter()
+        self.routes: Counter = Counter()
+        self.threads: Counter = Counter()
+        self.samples = 0
+        self.own_cpu_ns = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._cpu_ns: dict[int, int] = {}
+        # Поток -> (роут, стек) последнего рабочего снимка, если прошлый снимок потока был рабочим
+        self._last_busy: dict[int, tuple] = {}
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        # Первый снимок часов CPU - точка отсчета, без стеков
+        for thread_id in sys._current_frames():
+            cpu_ns = _thread_cpu_ns(thread_id)
+            if cpu_ns is not None:
+                self._cpu_ns[thread_id] = cpu_ns
+        start_ns = time.thread_time_ns()
+        while not self._stop.wait(self.interval):
+            self._sample(own_id)
+        self.own_cpu_ns = time.thread_time_ns() - start_ns
+
+    def _sample(self, own_id: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        self.samples += 1
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            cpu_ns = _thread_cpu_ns(thread_id)
+            if cpu_ns is None:
+                continue
+            spent_ns = cpu_ns - self._cpu_ns.get(thread_id, cpu_ns)
+            self._cpu_ns[thread_id] = cpu_ns
+            route, frames = self._walk(frame)
+            idle = route == NO_ROUTE and frame.f_code.co_qualname in IDLE_LEAVES
+            if idle:
+                route, stack = self._last_busy.pop(thread_id, (MISSED, f"{MISSED};{_frame_label(frame.f_code)}"))
+            else:
+                stack = ";".join([route, *frames])
+                self._last_busy[thread_id] = (route, stack)
+            if spent_ns <= 0:
+                continue
+            weight_us = spent_ns // 1000
+            self.stacks[stack] += weight_us
+            self.routes[route] += weight_us
+            self.threads[names.get(thread_id, str(thread_id))] += weight_us
+
+    # Кадры стека от корня к листу и роут, к которому он относится (ближайший к листу найденный)
+    def _walk(self, frame) -> tuple[str, list]:
+        frames = []
+        route = None
+        while frame is not None:
+            code = frame.f_code
+            frames.append(_frame_label(code))
+            if route is None:
+                if code in self.endpoint_codes:
+                    route = self.endpoint_codes[code]
+                elif code is _MIDDLEWARE_CODE:
+                    scope = frame.f_locals.get("scope")
+                    if scope is not None and scope.get("type") == "http":
+                        route = f"{scope['method']} {request_metrics.route_label(scope)}"
+            frame = frame.f_back
+        frames.reverse()
+        return route or NO_ROUTE, frames
+
+    # Свернутые стеки, вес - микросекунды CPU
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {weight}\n" for stack, weight in self.stacks.most_common())
+
+    def summary(self, seconds: float, top: int) -> dict:
+        total_us = sum(self.routes.values())
+
+        def breakdown(counter: Counter) -> list:
+            return [
+                {"name": name, "cpu_ms": round(us / 1000, 3), "share": round(us / total_us, 4) if total_us else 0.0}
+                for name, us in counter.most_common()
+            ]
+
+        return {
+            "seconds": seconds,
+            "interval_ms": round(self.interval * 1000, 3),
+            "samples": self.samples,
+            "cpu_ms": round(total_us / 1000, 3),
+            "profiler_cpu_ms": round(self.own_cpu_ns / 1e6, 3),
+            "routes": breakdown(self.routes),
+            "threads": breakdown(self.threads),
+            "top_stacks": [
+                {"stack": stack, "cpu_ms": round(us / 1000, 3)} for stack, us in self.stacks.most_common(top)
+            ],
+        }
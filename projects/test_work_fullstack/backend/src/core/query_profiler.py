@@ -0,0 +1,213 @@
+# Профилировщик SQL запросов внутри HTTP запроса: ищу медленные запросы и N+1.
+# Каждый SQL запрос (события движка из request_metrics) привожу к отпечатку: параметры, строки и числа
+# заменяю на ?, списки (?, ?, ...) схлопываю, пробелы сжимаю. Так SELECT задачи по разным id - один отпечаток.
+# В конце HTTP запроса, если какой-то запрос шел дольше QUERY_SLOW_MS или один отпечаток повторился
+# QUERY_REPEAT_THRESHOLD раз и больше (ленивая загрузка в цикле, лишний SELECT на каждую задачу),
+# пишу одну JSON запись в лог src.queries: роут, статус, время и помеченные запросы.
+# С QUERY_EXPLAIN=true к помеченным запросам добавляю план (EXPLAIN без ANALYZE, запрос не выполняется):
+# запись уходит в очередь процесса, планы на отдельном соединении получает фоновая задача, и только потом
+# запись попадает в лог. Middleware и соединение клиента EXPLAIN не ждут
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from contextlib import suppress
+from functools import lru_cache
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from src.core.config import DB_ASYNC, QUERY_SLOW_MS, QUERY_REPEAT_THRESHOLD, QUERY_EXPLAIN, QUERY_EXPLAIN_QUEUE
+
+logger = logging.getLogger("src.queries")
+
+# Сколько символов отпечатка писать в лог
+SQL_LOG_LIMIT = 2000
+# EXPLAIN умеет только для таких запросов (DDL, COPY, SET и т.п. пропускаю)
+EXPLAINABLE = ("select", "insert", "update", "delete", "with")
+# Сколько секунд при остановке процесса ждать записи, которые еще ждут EXPLAIN
+EXPLAIN_STOP_TIMEOUT = 5
+
+_PARAMETER = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+# Отпечаток SQL запроса. Тексты запросов SQLAlchemy берет из кеша компиляции, так что их немного,
+# но литералы (literal_execute) дают новые тексты - кеш ограничен
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    normalized = _STRING.sub("?", statement)
+    normalized = _PARAMETER.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _LIST.sub("(?...)", normalized)
+    return _SPACE.sub(" ", normalized).strip()
+
+
+# Статистика одного отпечатка за HTTP запрос. statement и parameters - самого долгого выполнения (для EXPLAIN)
+class QueryStat:
+    __slots__ = ("count", "total_ms", "max_ms", "statement", "parameters")
+
+    def __init__(self, statement: str):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.statement = statement
+        self.parameters = None
+
+
+# SQL запросы одного HTTP запроса по отпечаткам
+class QueryProfile:
+    __slots__ = ("queries",)
+
+    def __init__(self):
+        self.queries: dict[str, QueryStat] = {}
+
+    def add(self, statement: str, parameters, elapsed_ms: float, executemany: bool) -> None:
+        key = fingerprint(statement)
+        stat = self.queries.get(key)
+        if stat is None:
+            stat = self.queries[key] = QueryStat(statement)
+        stat.count += 1
+        stat.total_ms += elapsed_ms
+        if elapsed_ms >= stat.max_ms:
+            stat.max_ms = elapsed_ms
+            stat.statement = statement
+            # Параметры executemany - список строк, EXPLAIN по ним не сделать
+            stat.parameters = None if executemany else parameters
+
+    # Помеченные отпечатки: (отпечаток, статистика, медленный, повторяется)
+    def flagged(self) -> list[tuple]:
+        result = []
+        for key, stat in self.queries.items():
+            slow = stat.max_ms >= QUERY_SLOW_MS
+            repeated = stat.count >= QUERY_REPEAT_THRESHOLD
+            if slow or repeated:
+                result.append((key, stat, slow, repeated))
+        return result
+
+
+# План запроса без выполнения: EXPLAIN (FORMAT JSON) с теми же параметрами драйвера. Ошибку (например, запрос
+# к временной таблице другого соединения) возвращаю текстом вместо плана.
+# Движки импортирую внутри: database.py сам импортирует метрики запросов, а они - этот модуль
+def _explain_sync(statement: str, parameters) -> object:
+    from src.core.database import engine
+    try:
+        with engine.connect() as conn:
+            return conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    except Exception as e:
+        return f"EXPLAIN не выполнен: {e.__class__.__name__}: {e}"
+
+
+async def _explain_async(statement: str, parameters) -> object:
+    from src.core.database import async_engine
+    try:
+        async with async_engine.connect() as conn:
+            return (await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)).scalar()
+    except Exception as e:
+        return f"EXPLAIN не выполнен: {e.__class__.__name__}: {e}"
+
+
+async def explain(statement: str, parameters) -> Optional[object]:
+    if not statement.lstrip().lower().startswith(EXPLAINABLE):
+        return None
+    if DB_ASYNC:
+        return await _explain_async(statement, parameters)
+    return await run_in_threadpool(_explain_sync, statement, parameters)
+
+
+def _log(record: dict) -> None:
+    logger.warning(json.dumps(record, ensure_ascii=False, default=str), extra={"query_profile": record})
+
+
+# Очередь записей, ждущих EXPLAIN, и фоновая задача, которая по одной дополняет их планами и пишет в лог.
+# Одна задача на процесс - EXPLAIN занимает не больше одного соединения пула. Если очередь заполнена
+# (БД тормозит, а помеченных запросов много), запись пишу сразу без планов, чтобы не копить память
+class ExplainReporter:
+    def __init__(self, maxsize: int):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._task: Optional[asyncio.Task] = None
+        self.explained = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    # Даю дописать то, что уже в очереди (не дольше EXPLAIN_STOP_TIMEOUT), и останавливаю задачу
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._queue.join(), EXPLAIN_STOP_TIMEOUT)
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+    # pending - (запись запроса в record["queries"], SQL, параметры) для EXPLAIN
+    def submit(self, record: dict, pending: list[tuple]) -> None:
+        if self._task is None:
+            _log(record)
+            return
+        try:
+            self._queue.put_nowait((record, pending))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            for query, _, _ in pending:
+                query["plan"] = "EXPLAIN пропущен: очередь заполнена"
+            _log(record)
+
+    async def _run(self) -> None:
+        while True:
+            record, pending = await self._queue.get()
+            try:
+                for query, statement, parameters in pending:
+                    query["plan"] = await explain(statement, parameters)
+                self.explained += 1
+                _log(record)
+            except Exception:
+                logger.exception("Не удалось получить EXPLAIN для записи профилировщика")
+            finally:
+                self._queue.task_done()
+
+
+explain_reporter = ExplainReporter(QUERY_EXPLAIN_QUEUE)
+
+
+# Пишу запись в лог, если в запросе есть медленные или повторяющиеся SQL запросы.
+# request - метод, роут, функция роута, статус и время HTTP запроса. С QUERY_EXPLAIN запись уходит
+# в explain_reporter, сам вызов не ждет БД
+def report(profile: QueryProfile, request: dict) -> None:
+    flagged = profile.flagged()
+    if not flagged:
+        return
+    queries = []
+    pending = []
+    for key, stat, slow, repeated in sorted(flagged, key=lambda item: item[1].total_ms, reverse=True):
+        query = {
+            "fingerprint": hashlib.sha1(key.encode()).hexdigest()[:12],
+            "sql": key[:SQL_LOG_LIMIT],
+            "count": stat.count,
+            "total_ms": round(stat.total_ms, 3),
+            "max_ms": round(stat.max_ms, 3),
+            "slow": slow,
+            "repeated": repeated,
+        }
+        if QUERY_EXPLAIN:
+            pending.append((query, stat.statement, stat.parameters))
+        queries.append(query)
+    record = {
+        "event": "query_profile",
+        **request,
+        "db_queries": sum(stat.count for stat in profile.queries.values()),
+        "db_ms": round(sum(stat.total_ms for stat in profile.queries.values()), 3),
+        "queries": queries,
+    }
+    if pending:
+        explain_reporter.submit(record, pending)
+    else:
+        _log(record)
@@ -0,0 +1,288 @@
+# Метрики запросов для GET /metrics в текстовом формате Prometheus.
+# ASGI middleware замеряет каждый HTTP запрос: время, статус, размер ответа. События SQLAlchemy на движках
+# считают запросы к БД и их время, пул соединений добавляет ожидание checkout, зависимость авторизации -
+# время проверки токена. Все это пишу в RequestStats текущего запроса через contextvar: он доходит и до
+# threadpool sync роутов, и до greenlet async движка. Гистограммы по (метод, шаблон пути роута), так что
+# число рядов не растет от id в путях. На запрос - несколько perf_counter и observe под локом, на SQL запрос -
+# два perf_counter, поэтому метрики можно держать включенными в продакшене
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from src.core.config import QUERY_PROFILER_ENABLED
+from src.core.metrics import Histogram
+from src.core.query_profiler import QueryProfile, report as report_queries
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Бакеты для количества SQL запросов за HTTP запрос и для размера ответа в байтах.
+# Histogram считает в миллисекундах, но для количеств и байт работает так же, меняются только границы
+DB_QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+RESPONSE_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Метод вне списка пишу как OTHER, чтобы мусорные методы не плодили ряды
+KNOWN_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+# Запросы, которые не попали ни в один роут (404, редирект на путь со слешем)
+UNMATCHED_ROUTE = "unmatched"
+
+
+# Что успело произойти за один HTTP запрос. profile - SQL запросы по отпечаткам для профилировщика
+class RequestStats:
+    __slots__ = ("db_queries", "db_ms", "pool_wait_ms", "auth_ms", "profile")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.pool_wait_ms = 0.0
+        self.auth_ms: Optional[float] = None
+        self.profile = QueryProfile() if QUERY_PROFILER_ENABLED else None
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+# Ожидание соединения из пула (вызывает пул). Вне HTTP запроса (фоновые задачи) не пишу
+def record_pool_wait(wait_ms: float) -> None:
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.pool_wait_ms += wait_ms
+
+
+# Время проверки JWT токена (вызывает зависимость авторизации)
+def record_auth(auth_ms: float) -> None:
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.auth_ms = (stats.auth_ms or 0.0) + auth_ms
+
+
+# Гистограммы одного роута
+class RouteMetrics:
+    def __init__(self):
+        self.duration = Histogram()
+        # Время вне БД, пула и авторизации: загрузка ORM объектов, сериализация, код роута
+        self.app_time = Histogram()
+        self.db_time = Histogram()
+        self.db_queries = Histogram(DB_QUERY_BUCKETS)
+        self.pool_wait = Histogram()
+        self.auth = Histogram()
+        self.response_size = Histogram(RESPONSE_SIZE_BUCKETS)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: dict[tuple, RouteMetrics] = {}
+        self.statuses: dict[tuple, int] = {}
+        # Каждый SQL запрос процесса, в том числе вне HTTP запросов (лента изменений, фоновые задачи)
+        self.statement_duration = Histogram()
+        # Функция роута (или приложение Mount) -> шаблон пути
+        self._route_paths: dict = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.routes.clear()
+            self.statuses.clear()
+        self.statement_duration.reset()
+
+    # Шаблон пути роута, в который попал запрос. Router кладет функцию роута в scope["endpoint"]
+    def route_label(self, scope: dict) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        path = self._route_paths.get(endpoint)
+        if path is None and "router" in scope:
+            # Новый роут - перечитываю список роутов приложения
+            paths = {}
+            for route in scope["router"].routes:
+                if hasattr(route, "endpoint"):
+                    paths[route.endpoint] = route.path
+                elif hasattr(route, "app"):
+                    paths[route.app] = route.path + "/{path}"
+            # Если роута так и нет в списке (вложенное приложение), запоминаю это, чтобы не перечитывать на каждый запрос
+            path = paths.setdefault(endpoint, UNMATCHED_ROUTE)
+            self._route_paths = paths
+        return path or UNMATCHED_ROUTE
+
+    def observe(self, scope: dict, status: int, duration_ms: float, response_size: int, stats: RequestStats) -> tuple:
+        method = scope["method"] if scope["method"] in KNOWN_METHODS else "OTHER"
+        key = (method, self.route_label(scope))
+        status_key = key + (status,)
+        with self._lock:
+            route = self.routes.get(key)
+            if route is None:
+                route = self.routes[key] = RouteMetrics()
+            self.statuses[status_key] = self.statuses.get(status_key, 0) + 1
+
+        route.duration.observe(duration_ms)
+        route.db_time.observe(stats.db_ms)
+        route.db_queries.observe(stats.db_queries)
+        route.pool_wait.observe(stats.pool_wait_ms)
+        route.response_size.observe(response_size)
+        if stats.auth_ms is not None:
+            route.auth.observe(stats.auth_ms)
+        route.app_time.observe(max(0.0, duration_ms - stats.db_ms - stats.pool_wait_ms - (stats.auth_ms or 0.0)))
+        return key
+
+    # Все метрики в текстовом формате Prometheus. pools - снимки пулов из get_pool_stats()["pools"]
+    def render(self, pools: dict) -> str:
+        lines = []
+        with self._lock:
+            routes = list(self.routes.items())
+            statuses = list(self.statuses.items())
+
+        lines += _counter(
+            "http_requests_total", "HTTP запросы по роуту и статусу",
+            [({"method": method, "route": route, "status": str(status)}, count)
+             for (method, route, status), count in statuses],
+        )
+        route_histograms = (
+            ("http_request_duration_seconds", "Время HTTP запроса целиком", "duration", 0.001),
+            ("http_request_app_duration_seconds",
+             "Время запроса вне БД, пула и авторизации: ORM, сериализация, код роута", "app_time", 0.001),
+            ("http_request_db_duration_seconds", "Суммарное время SQL запросов за HTTP запрос", "db_time", 0.001),
+            ("http_request_db_queries", "Количество SQL запросов за HTTP запрос", "db_queries", 1),
+            ("http_request_pool_wait_seconds", "Ожидание соединений из пула за HTTP запрос", "pool_wait", 0.001),
+            ("http_request_auth_duration_seconds", "Проверка JWT токена", "auth", 0.001),
+            ("http_response_size_bytes", "Размер тела ответа", "response_size", 1),
+        )
+        for name, help_text, attribute, scale in route_histograms:
+            # Роуты без авторизации не показываю в гистограмме проверки токена
+            lines += _histogram(name, help_text, [
+                ({"method": method, "route": route}, getattr(metrics, attribute).snapshot())
+                for (method, route), metrics in routes
+                if attribute != "auth" or metrics.auth.count
+            ], scale)
+
+        lines += _histogram(
+            "db_statement_duration_seconds", "Время каждого SQL запроса процесса",
+            [({}, self.statement_duration.snapshot())], 0.001,
+        )
+        lines += _histogram("db_pool_checkout_wait_seconds", "Ожидание соединения из пула", [
+            ({"pool": name}, {**stats["checkout_wait_ms"], "count": stats["checkouts"]})
+            for name, stats in pools.items()
+        ], 0.001)
+        lines += _counter("db_pool_checkout_timeouts_total", "Соединение не дождались за pool_timeout", [
+            ({"pool": name}, stats["checkout_timeouts"]) for name, stats in pools.items()
+        ])
+        lines += _gauge("db_pool_connections", "Соединения пула: выданные и свободные", [
+            ({"pool": name, "state": state}, stats[state])
+            for name, stats in pools.items() for state in ("active", "idle") if state in stats
+        ])
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+# Значение метки по формату Prometheus: экранирую обратный слеш, кавычки и перевод строки
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _counter(name: str, help_text: str, series: list) -> list:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    lines += [f"{name}{_labels(labels)} {value}" for labels, value in series]
+    return lines
+
+
+def _gauge(name: str, help_text: str, series: list) -> list:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    lines += [f"{name}{_labels(labels)} {value}" for labels, value in series]
+    return lines
+
+
+# Гистограмма из снимков Histogram.snapshot(). scale переводит единицы снимка в единицы метрики (мс -> с)
+def _histogram(name: str, help_text: str, series: list, scale: float) -> list:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, snapshot in series:
+        for bound, count in snapshot["buckets"].items():
+            le = bound if bound == "+Inf" else f"{float(bound) * scale:g}"
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {count}")
+        lines.append(f"{name}_sum{_labels(labels)} {snapshot['sum'] * scale:g}")
+        lines.append(f"{name}_count{_labels(labels)} {snapshot['count']}")
+    return lines
+
+
+# ASGI middleware вокруг приложения. Чистый ASGI, а не BaseHTTPMiddleware: не буферизует потоковые
+# ответы (/tasks/export, /tasks/events) и дешевле на каждый запрос. WebSocket пропускаю как есть
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        # Если приложение упало до ответа, ServerErrorMiddleware снаружи ответит 500
+        status = 500
+        response_size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, response_size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            _current_stats.reset(token)
+            method, route = request_metrics.observe(scope, status, duration_ms, response_size, stats)
+        # Ответ уже отправлен. EXPLAIN здесь не жду: с QUERY_EXPLAIN запись уходит в фоновую очередь
+        if stats.profile is not None and stats.profile.queries:
+            endpoint = scope.get("endpoint")
+            report_queries(stats.profile, {
+                "method": method,
+                "route": route,
+                "endpoint": getattr(endpoint, "__name__", None),
+                "status": status,
+                "duration_ms": round(duration_ms, 3),
+            })
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_metrics_start", None)
+    if start is None:
+        return
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    request_metrics.statement_duration.observe(elapsed_ms)
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_ms += elapsed_ms
+        if stats.profile is not None:
+            stats.profile.add(statement, parameters, elapsed_ms, executemany)
+
+
+# Замер SQL запросов движка. Для AsyncEngine передавать async_engine.sync_engine. Повторный вызов ничего не делает
+def instrument_engine(engine) -> None:
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def uninstrument_engine(engine) -> None:
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,85 @@
+# Продакшен сервер для run.py (APP_ENV=production): мастер gunicorn и воркеры uvicorn.
+# Мастер импортирует приложение до fork (preload): код, модели, роуты и FastAPI app загружаются один раз, и воркеры
+# делят эту память с мастером copy-on-write. Чтобы подсчет ссылок сборщиком мусора не копировал страницы
+# в каждый воркер, объекты мастера замораживаю (gc.freeze) перед запуском воркеров.
+# Мастер следит за воркерами: упавший или зависший (APP_WORKER_TIMEOUT) перезапускает, после APP_MAX_REQUESTS
+# запросов мягко заменяет новым (утечки памяти и фрагментация не копятся), по SIGTERM/SIGINT останавливает
+# воркеры, давая им APP_GRACEFUL_TIMEOUT секунд. SIGHUP - плавно перезапустить все воркеры, SIGTTIN/SIGTTOU -
+# добавить или убрать воркер.
+# Воркер - uvicorn на uvloop и httptools. Пулы БД, пул bcrypt, слушатель ленты, кеши и метрики у каждого
+# воркера свои: пулы БД пересоздаю после fork, остальное запускается в lifespan воркера
+import gc
+import warnings
+
+from gunicorn.app.base import BaseApplication
+from gunicorn.util import import_app
+
+from src.core.config import (
+    APP_HOST,
+    APP_PORT,
+    APP_WORKERS,
+    APP_KEEPALIVE,
+    APP_BACKLOG,
+    APP_MAX_REQUESTS,
+    APP_MAX_REQUESTS_JITTER,
+    APP_GRACEFUL_TIMEOUT,
+    APP_WORKER_TIMEOUT,
+)
+
+# uvicorn.workers помечен устаревшим в пользу пакета uvicorn-worker, в закрепленной версии uvicorn он работает
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    from uvicorn.workers import UvicornWorker
+
+# uvicorn закрывает оставшиеся соединения (ленты SSE и WebSocket висят бесконечно) чуть раньше, чем мастер
+# убьет воркер по APP_GRACEFUL_TIMEOUT: так воркер успевает выполнить остановку lifespan (лента, пулы БД)
+GRACEFUL_SHUTDOWN_MARGIN = 5
+
+
+class AppWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "lifespan": "on",
+        "timeout_graceful_shutdown": max(1, APP_GRACEFUL_TIMEOUT - GRACEFUL_SHUTDOWN_MARGIN),
+    }
+
+
+# Мастер запускает воркеры, когда приложение уже загружено (preload_app)
+def when_ready(server) -> None:
+    gc.freeze()
+
+
+def post_fork(server, worker) -> None:
+    from src.core.database import dispose_engines_after_fork
+    dispose_engines_after_fork()
+
+
+class ProductionServer(BaseApplication):
+    def __init__(self, app_path: str):
+        self.app_path = app_path
+        super().__init__()
+
+    def load_config(self) -> None:
+        options = {
+            "bind": f"{APP_HOST}:{APP_PORT}",
+            "workers": APP_WORKERS,
+            "worker_class": f"{__name__}.AppWorker",
+            "preload_app": True,
+            "keepalive": APP_KEEPALIVE,
+            "backlog": APP_BACKLOG,
+            "max_requests": APP_MAX_REQUESTS,
+            "max_requests_jitter": APP_MAX_REQUESTS_JITTER,
+            "graceful_timeout": APP_GRACEFUL_TIMEOUT,
+            "timeout": APP_WORKER_TIMEOUT,
+            "when_ready": when_ready,
+            "post_fork": post_fork,
+            "accesslog": "-",
+            "errorlog": "-",
+        }
+        for key, value in options.items():
+            self.cfg.set(key, value)
+
+    # Вызывается в мастере (preload_app), воркеры получают уже загруженное приложение
+    def load(self):
+        return import_app(self.app_path)
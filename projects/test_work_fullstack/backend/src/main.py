@@ -1,21 +1,48 @@
 # Главный файл приложения. Подключаю БД при старте, роуты для auth и tasks
 from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from fastapi.staticfiles import StaticFiles
 
-from src.core.database import connect_db, disconnect_db
-from src.api.routes import auth, tasks
+from src.core.config import (
+    DB_ASYNC,
+    HASH_POOL_ENABLED,
+    TASK_FEED_ENABLED,
+    METRICS_ENABLED,
+    QUERY_PROFILER_ENABLED,
+    QUERY_EXPLAIN,
+    DEBUG_PROFILE_ENABLED,
+)
+from src.core.database import connect_db, disconnect_db, get_pool_stats
+from src.core.request_metrics import MetricsMiddleware, request_metrics, PROMETHEUS_CONTENT_TYPE
+from src.core.query_profiler import explain_reporter
+from src.api.dependencies import require_monitoring_access
+from src.auth.hashing import password_hasher
+from src.auth.token_cache import token_cache
+from src.services.task_service import task_cache
+from src.services.task_feed import task_feed
+from src.api.routes import auth, tasks, auth_async, tasks_async, task_events, debug
 # Импортирую модели чтобы они были зарегистрированы в Base.metadata
 from src.models import User, Task
 
 
-# При старте подключаюсь к БД, при остановке отключаюсь
+# При старте подключаюсь к БД, запускаю пул хеширования паролей, слушатель ленты изменений
+# и фоновый EXPLAIN профилировщика SQL, при остановке все закрываю
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_db()
+    if HASH_POOL_ENABLED:
+        password_hasher.start()
+    if TASK_FEED_ENABLED:
+        task_feed.start()
+    if METRICS_ENABLED and QUERY_PROFILER_ENABLED and QUERY_EXPLAIN:
+        explain_reporter.start()
     yield
+    await explain_reporter.stop()
+    await task_feed.stop()
+    password_hasher.shutdown()
     await disconnect_db()
 
 
@@ -35,9 +62,72 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Подключение роутов
-app.include_router(auth.router)
-app.include_router(tasks.router)
+# Метрики запросов для /metrics. Добавляю последним, чтобы middleware был снаружи CORS и замерял запрос целиком
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Подключение роутов. DB_MODE=async включает async def роуты на AsyncEngine,
+# по умолчанию работают обычные sync роуты (для A/B сравнения режимов).
+# Лента изменений одна для обоих режимов, подключаю до роутов задач, чтобы /tasks/events
+# не попал в /tasks/{task_id}
+app.include_router(task_events.router)
+if DB_ASYNC:
+    app.include_router(auth_async.router)
+    app.include_router(tasks_async.router)
+else:
+    app.include_router(auth.router)
+    app.include_router(tasks.router)
+
+# Профилировщик живого воркера /debug/profile - только если явно включен
+if DEBUG_PROFILE_ENABLED:
+    app.include_router(debug.router)
+
+
+# Эндпоинт для health check, используется для мониторинга. Открыт всем (проверки балансировщика и Docker),
+# подробные /health/* и /metrics - только с адресов MONITORING_NETWORKS или с MONITORING_TOKEN.
+# Объявляю до статики фронтенда, иначе mount на "/" перехватывает эти пути
+@app.get("/health")
+async def health_check():
+    return {"status": "ok"}
+
+
+# Состояние пула соединений: гистограмма ожидания checkout, активные/свободные соединения, таймауты
+@app.get("/health/pool", dependencies=[Depends(require_monitoring_access)])
+async def pool_health():
+    return get_pool_stats()
+
+
+# Состояние пула хеширования паролей: очередь, отказы (503), время bcrypt и ожидания в очереди
+@app.get("/health/hashing", dependencies=[Depends(require_monitoring_access)])
+async def hashing_health():
+    return password_hasher.snapshot()
+
+
+# Кеш проверенных JWT токенов: размер, попадания и промахи
+@app.get("/health/tokens", dependencies=[Depends(require_monitoring_access)])
+async def token_cache_health():
+    return token_cache.snapshot()
+
+
+# Кеш чтения задач: бэкенд, размер, попадания, промахи и вытеснения
+@app.get("/health/cache", dependencies=[Depends(require_monitoring_access)])
+async def task_cache_health():
+    return task_cache.snapshot()
+
+
+# Лента изменений: слушает ли процесс NOTIFY, сколько открыто лент, уведомления и переподключения
+@app.get("/health/feed", dependencies=[Depends(require_monitoring_access)])
+async def task_feed_health():
+    return {"enabled": TASK_FEED_ENABLED, **task_feed.snapshot()}
+
+
+# Метрики в формате Prometheus: время запросов по роутам (и из чего оно сложилось: БД, пул, авторизация,
+# остальное), количество SQL запросов, размер ответов, состояние пулов соединений
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_monitoring_access)])
+    async def metrics():
+        return Response(request_metrics.render(get_pool_stats()["pools"]), media_type=PROMETHEUS_CONTENT_TYPE)
+
 
 # Подключение статических файлов фронтенда (для production)
 # Путь для Docker контейнера (от backend/ до корня /app)
@@ -54,10 +144,4 @@ if frontend_path.exists():
 else:
     print(f"Frontend dist not found at: {frontend_path}")
 
-
-# Эндпоинт для health check, используется для мониторинга
-@app.get("/health")
-async def health_check():
-    return {"status": "ok"}
-
 # TODO(!!! tests): unit-тесты для health endpoint и проверка подключения БД в lifespan
@@ -1,6 +1,9 @@
 # SQLAlchemy модели для БД
 from src.models.user import User
 from src.models.task import Task, TaskStatus
+from src.models.task_counter import TaskCounter
+from src.models.task_calendar import TaskCalendar
+from src.models.task_event import TaskEvent
+from src.models.task_version import TaskVersion
 
-__all__ = ["User", "Task", "TaskStatus"]
-
+__all__ = ["User", "Task", "TaskStatus", "TaskCounter", "TaskCalendar", "TaskEvent", "TaskVersion"]
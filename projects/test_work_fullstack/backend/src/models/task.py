@@ -1,12 +1,22 @@
 # Модель задачи в БД
-from sqlalchemy import Column, String, DateTime, ForeignKey, Enum as SQLEnum
-from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
-import uuid
+from sqlalchemy import Column, Computed, String, DateTime, ForeignKey, Index, Enum as SQLEnum
+from sqlalchemy.orm import deferred, relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 from datetime import datetime
 import enum
 
 from src.core.database import Base
+from src.core.ids import uuid7
+
+
+# Конфигурация полнотекстового поиска: русская морфология, слова латиницей - английский стеммер
+TASK_SEARCH_CONFIG = "russian"
+
+# tsvector для поиска: слова заголовка с весом A, описания - B (заголовок выше в ранжировании)
+TASK_SEARCH_VECTOR_SQL = (
+    f"setweight(to_tsvector('{TASK_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{TASK_SEARCH_CONFIG}', coalesce(description, '')), 'B')"
+)
 
 
 class TaskStatus(str, enum.Enum):
@@ -18,13 +28,28 @@ class TaskStatus(str, enum.Enum):
 class Task(Base):
     __tablename__ = "tasks"
 
-    id = Column(UUID(as_uuid=False), primary_key=True, default=lambda: str(uuid.uuid4()))
+    # UUIDv7: id растут со временем (см. src/core/ids.py), build_task задает его от created_at
+    id = Column(UUID(as_uuid=False), primary_key=True, default=lambda: uuid7())
     title = Column(String(200), nullable=False)
     description = Column(String(1000), nullable=True)
     status = Column(SQLEnum(TaskStatus), default=TaskStatus.PENDING, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Время последнего изменения: onupdate выставляет его в каждом UPDATE задачи, в том числе пакетном
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     user_id = Column(UUID(as_uuid=False), ForeignKey("users.id"), nullable=True)
+    # Генерируемая колонка для поиска q=, БД пересчитывает ее сама при INSERT и UPDATE.
+    # deferred - в обычных выборках задач не читаю
+    search_vector = deferred(Column(TSVECTOR, Computed(TASK_SEARCH_VECTOR_SQL, persisted=True)))
 
     # Связь с пользователем
     user = relationship("User", back_populates="tasks")
 
+    # Индексы под список задач: фильтр по user_id (и статусу) + сортировка по (created_at, id) DESC,
+    # id в конце нужен для keyset пагинации. Те же индексы создает миграция 003.
+    # GIN по search_vector - для поиска (миграция 008)
+    __table_args__ = (
+        Index("ix_tasks_user_id_created_at_id", user_id, created_at.desc(), id.desc()),
+        Index("ix_tasks_user_id_status_created_at_id", user_id, status, created_at.desc(), id.desc()),
+        Index("ix_tasks_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
@@ -0,0 +1,19 @@
+# Календарь задач пользователя: дни и месяцы, в которые создавались задачи, с количеством задач.
+# Обновляется вместе с задачами в task_service, из него отдаю /tasks/dates и /tasks/months
+from sqlalchemy import Column, Date, ForeignKey, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+
+from src.core.database import Base
+
+# Значения period: день (bucket - сама дата) и месяц (bucket - первое число месяца)
+CALENDAR_DAY = "day"
+CALENDAR_MONTH = "month"
+
+
+class TaskCalendar(Base):
+    __tablename__ = "task_calendar"
+
+    user_id = Column(UUID(as_uuid=False), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    period = Column(String(8), primary_key=True)
+    bucket = Column(Date, primary_key=True)
+    task_count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,17 @@
+# Счетчики задач пользователя по статусу и дню создания. Обновляются вместе с задачами
+# в task_service, из них считаю total для списка задач вместо COUNT(*) по всем задачам.
+# Итоги по месяцу и группе дней - сумма по диапазону дней
+from sqlalchemy import Column, Date, ForeignKey, Integer, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import UUID
+
+from src.core.database import Base
+from src.models.task import TaskStatus
+
+
+class TaskCounter(Base):
+    __tablename__ = "task_counters"
+
+    user_id = Column(UUID(as_uuid=False), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(SQLEnum(TaskStatus), primary_key=True)
+    day = Column(Date, primary_key=True)
+    task_count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,31 @@
+# Журнал изменений задач пользователя для ленты изменений (GET /tasks/events).
+# Событие пишется в той же транзакции, что и изменение задач, и после commit рассылается через NOTIFY.
+# По id события клиент продолжает ленту после переподключения
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+
+from src.core.database import Base
+
+# Виды событий: задачи созданы, изменены, удалены или загружены из файла (без списка id)
+EVENT_CREATED = "created"
+EVENT_UPDATED = "updated"
+EVENT_DELETED = "deleted"
+EVENT_IMPORTED = "imported"
+
+
+class TaskEvent(Base):
+    __tablename__ = "task_events"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(UUID(as_uuid=False), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(16), nullable=False)
+    task_ids = Column(ARRAY(UUID(as_uuid=False)), nullable=True)
+    task_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Лента читает события пользователя после последнего увиденного id
+    __table_args__ = (
+        Index("ix_task_events_user_id_id", user_id, id),
+    )
@@ -0,0 +1,13 @@
+# Версия задач пользователя: счетчик, который растет в той же транзакции, что и любое изменение
+# его задач. Из версии строю ETag ответов чтения задач - если она не изменилась, отвечаю 304
+from sqlalchemy import BigInteger, Column, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+
+from src.core.database import Base
+
+
+class TaskVersion(Base):
+    __tablename__ = "task_versions"
+
+    user_id = Column(UUID(as_uuid=False), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
@@ -4,6 +4,8 @@ from enum import Enum
 from typing import Optional
 from pydantic import BaseModel, Field
 
+from src.core.config import TASK_BATCH_MAX_SIZE
+
 
 # Статусы задачи
 class TaskStatus(str, Enum):
@@ -12,6 +14,12 @@ class TaskStatus(str, Enum):
     DONE = "done"
 
 
+# Форматы файлов задач для выгрузки GET /tasks/export и загрузки POST /tasks/import
+class TaskFileFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
 # Базовые поля задачи
 class TaskBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=200, description="Заголовок задачи")
@@ -42,9 +50,69 @@ class TaskResponse(TaskBase):
         populate_by_name = True  # Разрешаю использовать createdAt вместо created_at
 
 
-# Ответ API со списком задач
+# Ответ API со списком задач. total может не считаться (with_total=false),
+# next_cursor - курсор следующей страницы, None если задач больше нет
 class TaskListResponse(BaseModel):
     tasks: list[TaskResponse]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+# Пакетное создание задач: POST /tasks/batch
+class TaskBatchCreate(BaseModel):
+    tasks: list[TaskCreate] = Field(..., min_length=1, max_length=TASK_BATCH_MAX_SIZE)
+
+
+# Изменение одной задачи в пакете: id и поля как в TaskUpdate
+class TaskBatchUpdateItem(TaskUpdate):
+    id: str
+
+
+# Пакетное обновление задач: PATCH /tasks/batch
+class TaskBatchUpdate(BaseModel):
+    tasks: list[TaskBatchUpdateItem] = Field(..., min_length=1, max_length=TASK_BATCH_MAX_SIZE)
+
+
+# Пакетное удаление задач: DELETE /tasks/batch
+class TaskBatchDelete(BaseModel):
+    ids: list[str] = Field(..., min_length=1, max_length=TASK_BATCH_MAX_SIZE)
+
+
+# Результат для одного элемента пакета: created, updated, deleted или not_found
+class TaskBatchItemResult(BaseModel):
+    id: str
+    result: str
+    task: Optional[TaskResponse] = None
+
+
+# Ответ пакетного запроса - результаты в том же порядке, что и элементы запроса
+class TaskBatchResponse(BaseModel):
+    results: list[TaskBatchItemResult]
+
+
+# Ошибка в строке загружаемого файла
+class TaskImportError(BaseModel):
+    line: int
+    error: str
+
+
+# Результат одной пачки загрузки: строки first_line..last_line файла, одна транзакция.
+# errors - первые ошибки пачки, failed - сколько строк пропущено всего
+class TaskImportBatchResult(BaseModel):
+    batch: int
+    first_line: int
+    last_line: int
+    imported: int
+    failed: int
+    errors: list[TaskImportError]
+
+
+# Ответ POST /tasks/import. При обрыве загрузки (400, 500) - тот же отчет с error
+class TaskImportResponse(BaseModel):
+    imported: int
+    failed: int
+    batches: list[TaskImportBatchResult]
+    # Загрузка оборвалась: batches - уже загруженные пачки, строки после последней из них не загружены
+    error: Optional[str] = None
 
 # TODO(!!! tests): unit-тесты валидации схем (граничные значения, некорректные данные)
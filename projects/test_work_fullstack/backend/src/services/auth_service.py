@@ -1,17 +1,16 @@
-# Регистрирую пользователей, проверяю пароли, работаю с токенами
+# Сохраняю и ищу пользователей, работаю с токенами. Пароли хешируют и проверяют роуты (src/auth/hashing.py)
 from typing import Optional
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
 from jose import JWTError, jwt
 
 from src.models.user import User
-from src.auth.security import hash_password, verify_password, create_access_token
-from src.core.config import JWT_SECRET, JWT_ALGORITHM
+from src.auth.security import create_access_token
+from src.auth.token_cache import token_cache
+from src.core.config import JWT_SECRET, JWT_ALGORITHM, TOKEN_CACHE_ENABLED
 
 
-# Создаю пользователя, хеширую пароль перед сохранением
-def create_user(db: Session, email: str, password: str) -> User:
-    hashed_password = hash_password(password)
+# Сохраняю пользователя с уже захешированным паролем. Пароль хеширует роут (bcrypt в пуле процессов)
+def save_user(db: Session, email: str, hashed_password: str) -> User:
     user = User(email=email, password=hashed_password)
     db.add(user)
     db.commit()
@@ -24,26 +23,35 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
     return db.query(User).filter(User.email == email).first()
 
 
-# Проверяю email и пароль, возвращаю пользователя если все ок
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
-    user = get_user_by_email(db, email)
-    if not user:
-        return None
-    
-    if not verify_password(password, user.password):
-        return None
-    
-    return user
+# Вытаскиваю user_id из JWT токена, возвращаю None если токен невалидный
+def decode_user_from_token(token: str) -> Optional[str]:
+    user_id, _ = _decode_token(token)
+    return user_id
 
 
-# Вытаскиваю user_id из JWT токена, возвращаю None если токен невалидный
-def get_current_user_from_token(token: str) -> Optional[str]:
+# Декодирую и проверяю токен, возвращаю (user_id, exp)
+def _decode_token(token: str) -> tuple[Optional[str], Optional[float]]:
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id: str = payload.get("sub")
-        return user_id
     except JWTError:
-        return None
+        return None, None
+    return payload.get("sub"), payload.get("exp")
+
+
+# То же самое, но уже проверенные токены беру из кеша, без повторного jwt.decode.
+# Невалидные токены не кеширую, чтобы мусорные токены не вытесняли настоящие
+def get_current_user_from_token(token: str) -> Optional[str]:
+    if not TOKEN_CACHE_ENABLED:
+        return decode_user_from_token(token)
+
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
+    user_id, exp = _decode_token(token)
+    if user_id:
+        token_cache.put(token, user_id, exp)
+    return user_id
 
 # TODO(!!! tests): unit-тесты для всех методов:
 # - создание пользователя (с проверкой уникальности email)
@@ -0,0 +1,42 @@
+# Асинхронные версии функций auth_service для режима DB_MODE=async.
+# bcrypt - это чистая нагрузка на CPU, поэтому хеширование и проверку пароля
+# выношу из event loop в пул процессов (src/auth/hashing.py)
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.user import User
+from src.auth.hashing import hash_password_async, verify_password_async
+# Декодирование токена не ходит в БД, использую sync версию как есть
+from src.services.auth_service import get_current_user_from_token
+
+
+# Создаю пользователя, хеширую пароль перед сохранением
+async def create_user(db: AsyncSession, email: str, password: str) -> User:
+    hashed_password = await hash_password_async(password)
+    user = User(email=email, password=hashed_password)
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+# Ищу пользователя по email
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+
+# Проверяю email и пароль, возвращаю пользователя если все ок
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
+    user = await get_user_by_email(db, email)
+    if not user:
+        return None
+
+    if not await verify_password_async(password, user.password):
+        return None
+
+    return user
+
+
+__all__ = ["create_user", "get_user_by_email", "authenticate_user", "get_current_user_from_token"]
@@ -0,0 +1,134 @@
+# Пакетные операции над задачами: запросы для создания, обновления и удаления многих задач за раз.
+# Вместо запроса на каждую задачу - один INSERT ... RETURNING на весь пакет, UPDATE на группу одинаковых
+# изменений и DELETE по id = ANY(...). Запросы общие для sync и async версий сервиса
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import any_, bindparam, delete, insert, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from src.core.ids import uuid7, parse_id
+from src.models.task import Task, TaskStatus as TaskStatusEnum
+from src.schemas.task import TaskCreate, TaskUpdate, TaskBatchUpdateItem
+
+BATCH_CREATED = "created"
+BATCH_UPDATED = "updated"
+BATCH_DELETED = "deleted"
+BATCH_NOT_FOUND = "not_found"
+
+
+# В пакете один и тот же id встречается несколько раз
+class DuplicateBatchIdError(ValueError):
+    pass
+
+
+# Проверяю что id в пакете не повторяются. Возвращаю id из запроса -> id в виде UUID строки
+# только для корректных UUID: задачи с некорректным id заведомо не найдутся, в БД их не отправляю
+def valid_batch_ids(ids: list[str]) -> dict[str, str]:
+    if len(set(ids)) != len(ids):
+        raise DuplicateBatchIdError("В пакете повторяются id задач")
+
+    valid = {}
+    for task_id in ids:
+        parsed = parse_id(task_id)
+        if parsed is not None:
+            valid[task_id] = parsed
+    if len(set(valid.values())) != len(valid):
+        raise DuplicateBatchIdError("В пакете повторяются id задач")
+    return valid
+
+
+# Условие id = ANY(:ids) - весь список одним параметром-массивом, а не IN с параметром на каждый id
+def task_id_in(ids: list[str]):
+    return Task.id == any_(bindparam("batch_ids", list(ids), type_=ARRAY(Task.id.type)))
+
+
+# Строки для пакетной вставки. id и created_at задаю сразу, чтобы знать их без лишнего запроса,
+# updated_at у новой задачи равен created_at. id растут в порядке задач пакета
+def build_task_rows(tasks_data: list[TaskCreate], user_id: str) -> list[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "id": uuid7(now),
+            "title": task_data.title,
+            "description": task_data.description,
+            "status": TaskStatusEnum(task_data.status.value) if task_data.status else TaskStatusEnum.PENDING,
+            "created_at": now,
+            "updated_at": now,
+            "user_id": user_id,
+        }
+        for task_data in tasks_data
+    ]
+
+
+# Пакетный INSERT ... RETURNING. Строки передаю параметрами при выполнении, SQLAlchemy собирает
+# из них многострочный VALUES, а sort_by_parameter_order сохраняет порядок задач из запроса
+def tasks_insert_statement():
+    return insert(Task).returning(Task, sort_by_parameter_order=True)
+
+
+# Блокирую задачи пакета до конца транзакции и беру их статус и дату до изменения - для счетчиков
+def locked_tasks_query(user_id: str, ids: list[str]):
+    return select(Task.id, Task.status, Task.created_at).where(
+        Task.user_id == user_id,
+        task_id_in(ids),
+    ).order_by(Task.id).with_for_update()
+
+
+# Новые значения полей из изменения задачи: только те поля, которые переданы
+def task_update_values(task_data: TaskUpdate) -> dict:
+    values = {}
+    if task_data.title is not None:
+        values["title"] = task_data.title
+    if task_data.description is not None:
+        values["description"] = task_data.description
+    if task_data.status is not None:
+        values["status"] = TaskStatusEnum(task_data.status.value)
+    return values
+
+
+# Группирую изменения по одинаковому набору новых значений: каждая группа - один UPDATE по id = ANY(...).
+# "Отметить все выполненными" - это одна группа и один запрос. Пустые изменения в группу с ключом ().
+# existing - id из запроса -> UUID строка для задач, которые нашлись, остальные пропускаю
+def group_task_updates(items: list[TaskBatchUpdateItem], existing: dict[str, str]) -> dict[tuple, list[str]]:
+    groups: dict[tuple, list[str]] = {}
+    for item in items:
+        if item.id not in existing:
+            continue
+        values = task_update_values(item)
+        groups.setdefault(tuple(sorted(values.items())), []).append(existing[item.id])
+    return groups
+
+
+# UPDATE задач пользователя с id из списка, возвращаю измененные задачи
+def tasks_update_statement(user_id: str, ids: list[str], values: dict):
+    return update(Task).where(
+        Task.user_id == user_id,
+        task_id_in(ids),
+    ).values(**values).returning(Task).execution_options(synchronize_session=False)
+
+
+# Задачи пакета без изменений - отдаю как есть
+def tasks_by_ids_query(user_id: str, ids: list[str]):
+    return select(Task).where(Task.user_id == user_id, task_id_in(ids))
+
+
+# DELETE задач пользователя с id из списка, возвращаю статус и дату удаленных - для счетчиков
+def tasks_delete_statement(user_id: str, ids: list[str]):
+    return delete(Task).where(
+        Task.user_id == user_id,
+        task_id_in(ids),
+    ).returning(Task.id, Task.status, Task.created_at).execution_options(synchronize_session=False)
+
+
+# Результат по каждому элементу пакета в порядке запроса: (id из запроса, результат, задача или None).
+# valid - id из запроса -> UUID строка (valid_batch_ids), found - UUID строка -> задача (или True для удаления)
+def batch_results(ids: list[str], valid: dict[str, str], found: dict, result: str) -> list[tuple[str, str, Optional[Task]]]:
+    results = []
+    for task_id in ids:
+        value = found.get(valid.get(task_id))
+        if value is None:
+            results.append((task_id, BATCH_NOT_FOUND, None))
+        else:
+            results.append((task_id, result, value if isinstance(value, Task) else None))
+    return results
@@ -0,0 +1,100 @@
+# Календарь задач (таблица task_calendar): строю запросы на изменение календаря при записи задач
+# и запросы списка дней/месяцев. Чтение - O(количество дней или месяцев), а не скан всех задач
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, select, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.models.task import Task
+from src.models.task_calendar import TaskCalendar, CALENDAR_DAY, CALENDAR_MONTH
+
+
+# INSERT строк в календарь: при конфликте прибавляю task_count к существующей строке
+def add_task_counts(stmt):
+    return stmt.on_conflict_do_update(
+        index_elements=[TaskCalendar.user_id, TaskCalendar.period, TaskCalendar.bucket],
+        set_={"task_count": TaskCalendar.task_count + stmt.excluded.task_count},
+    )
+
+
+# Запрос, который применяет изменения к календарю. removed/added - (статус, created_at) строк задач,
+# статус календарю не важен, поэтому смена статуса ничего не меняет. None - менять нечего
+def calendar_delta_statement(user_id: str, removed: Iterable[tuple] = (), added: Iterable[tuple] = ()):
+    deltas = defaultdict(int)
+    for _, created_at in removed:
+        deltas[(CALENDAR_DAY, created_at.date())] -= 1
+        deltas[(CALENDAR_MONTH, created_at.date().replace(day=1))] -= 1
+    for _, created_at in added:
+        deltas[(CALENDAR_DAY, created_at.date())] += 1
+        deltas[(CALENDAR_MONTH, created_at.date().replace(day=1))] += 1
+
+    # Сортирую, чтобы параллельные транзакции блокировали строки в одном порядке
+    rows = [
+        {"user_id": user_id, "period": period, "bucket": bucket, "task_count": delta}
+        for (period, bucket), delta in sorted(deltas.items())
+        if delta
+    ]
+    if not rows:
+        return None
+
+    return add_task_counts(pg_insert(TaskCalendar).values(rows))
+
+
+# Прибавляю к календарю строки запроса (user_id, period, bucket, task_count) - для загрузки задач пачкой.
+# Запрос должен быть отсортирован по (period, bucket), как в calendar_delta_statement
+def calendar_add_from_statement(rows_query):
+    return add_task_counts(pg_insert(TaskCalendar).from_select(
+        ["user_id", "period", "bucket", "task_count"], rows_query
+    ))
+
+
+# Запрос дней или месяцев пользователя, в которых есть задачи, по убыванию (идет по первичному ключу)
+def calendar_buckets_query(user_id: str, period: str):
+    return select(TaskCalendar.bucket).where(
+        TaskCalendar.user_id == user_id,
+        TaskCalendar.period == period,
+        TaskCalendar.task_count > 0,
+    ).order_by(TaskCalendar.bucket.desc())
+
+
+# Форматирую дни в YYYY-MM-DD
+def format_calendar_days(buckets) -> list[str]:
+    return [bucket.isoformat() for bucket in buckets]
+
+
+# Форматирую месяцы в YYYY-MM
+def format_calendar_months(buckets) -> list[str]:
+    return [f"{bucket.year:04d}-{bucket.month:02d}" for bucket in buckets]
+
+
+# Эталонный календарь из таблицы задач: для дней и для месяцев
+def expected_calendar_query(user_id: Optional[str] = None):
+    day = func.cast(Task.created_at, TaskCalendar.bucket.type)
+    month = func.cast(func.date_trunc("month", Task.created_at), TaskCalendar.bucket.type)
+
+    queries = []
+    for period, bucket in ((CALENDAR_DAY, day), (CALENDAR_MONTH, month)):
+        stmt = select(
+            Task.user_id.label("user_id"),
+            literal(period).label("period"),
+            bucket.label("bucket"),
+            func.count().label("task_count"),
+        ).where(Task.user_id.is_not(None)).group_by(Task.user_id, bucket)
+        if user_id:
+            stmt = stmt.where(Task.user_id == user_id)
+        queries.append(stmt)
+    return queries[0].union_all(queries[1])
+
+
+# Запросы для полного пересчета календаря (всех или одного пользователя) из таблицы задач
+def rebuild_calendar_statements(user_id: Optional[str] = None) -> list:
+    clear = delete(TaskCalendar)
+    if user_id:
+        clear = clear.where(TaskCalendar.user_id == user_id)
+    fill = pg_insert(TaskCalendar).from_select(
+        ["user_id", "period", "bucket", "task_count"],
+        expected_calendar_query(user_id),
+    )
+    return [clear, fill]
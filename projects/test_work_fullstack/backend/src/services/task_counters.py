@@ -0,0 +1,131 @@
+# Счетчики задач пользователя (таблица task_counters): строю запросы на изменение счетчиков
+# при записи задач и запрос total для списка задач. Запросы выполняются в той же транзакции,
+# что и изменение задач, поэтому счетчики согласованы между воркерами
+from collections import defaultdict
+from datetime import datetime, time
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, select, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.models.task import Task, TaskStatus as TaskStatusEnum
+from src.models.task_counter import TaskCounter
+from src.schemas.task import TaskStatus
+
+# Строка задачи для счетчиков: (статус, created_at)
+TaskKey = tuple[TaskStatusEnum, datetime]
+
+
+# INSERT строк в счетчики: при конфликте прибавляю task_count к существующей строке
+def add_task_counts(stmt):
+    return stmt.on_conflict_do_update(
+        index_elements=[TaskCounter.user_id, TaskCounter.status, TaskCounter.day],
+        set_={"task_count": TaskCounter.task_count + stmt.excluded.task_count},
+    )
+
+
+# Запрос, который применяет изменения к счетчикам: removed - ключи удаленных строк, added - добавленных.
+# Одинаковые ключи схлопываю, строки сортирую, чтобы параллельные транзакции брали блокировки
+# в одном порядке и не ловили deadlock. None - менять нечего (например, статус не изменился)
+def counter_delta_statement(user_id: str, removed: Iterable[TaskKey] = (), added: Iterable[TaskKey] = ()):
+    deltas = defaultdict(int)
+    for status, created_at in removed:
+        deltas[(TaskStatusEnum(status), created_at.date())] -= 1
+    for status, created_at in added:
+        deltas[(TaskStatusEnum(status), created_at.date())] += 1
+
+    rows = [
+        {"user_id": user_id, "status": status, "day": day, "task_count": delta}
+        for (status, day), delta in sorted(deltas.items(), key=lambda item: (item[0][0].value, item[0][1]))
+        if delta
+    ]
+    if not rows:
+        return None
+
+    return add_task_counts(pg_insert(TaskCounter).values(rows))
+
+
+# Прибавляю к счетчикам строки запроса (user_id, status, day, task_count) - для загрузки задач пачкой,
+# когда задачи уже лежат в таблице и посчитать их дешевле в БД. Запрос должен быть отсортирован
+# по (status, day), как в counter_delta_statement
+def counter_add_from_statement(rows_query):
+    return add_task_counts(pg_insert(TaskCounter).from_select(
+        ["user_id", "status", "day", "task_count"], rows_query
+    ))
+
+
+# Запрос total из счетчиков. Работает только для диапазонов по целым дням (все фильтры API такие),
+# для остальных возвращаю None - тогда нужен точный COUNT(*)
+def counters_total_query(
+    user_id: str,
+    status: Optional[TaskStatus] = None,
+    date_range: Optional[tuple[datetime, Optional[datetime]]] = None
+):
+    stmt = select(func.coalesce(func.sum(TaskCounter.task_count), 0)).where(TaskCounter.user_id == user_id)
+
+    if status:
+        stmt = stmt.where(TaskCounter.status == TaskStatusEnum(status.value))
+
+    if date_range:
+        start, end = date_range
+        if start.time() != time.min or (end is not None and end.time() != time.min):
+            return None
+        stmt = stmt.where(TaskCounter.day >= start.date())
+        if end is not None:
+            stmt = stmt.where(TaskCounter.day < end.date())
+
+    return stmt
+
+
+# Агрегат задач по (пользователь, статус, день) - эталон, с которым сверяю счетчики
+def expected_counters_query(user_id: Optional[str] = None):
+    day = func.cast(Task.created_at, TaskCounter.day.type)
+    stmt = select(
+        Task.user_id.label("user_id"),
+        Task.status.label("status"),
+        day.label("day"),
+        func.count().label("task_count"),
+    ).where(Task.user_id.is_not(None)).group_by(Task.user_id, Task.status, day)
+    if user_id:
+        stmt = stmt.where(Task.user_id == user_id)
+    return stmt
+
+
+# Расхождения счетчиков с задачами: строки где ожидаемое и сохраненное значение не совпадают
+def counter_mismatches_query(user_id: Optional[str] = None):
+    expected = expected_counters_query(user_id).subquery("expected")
+    stored = select(TaskCounter).where(TaskCounter.task_count != 0)
+    if user_id:
+        stored = stored.where(TaskCounter.user_id == user_id)
+    stored = stored.subquery("stored")
+
+    joined = expected.join(
+        stored,
+        (expected.c.user_id == stored.c.user_id)
+        & (expected.c.status == stored.c.status)
+        & (expected.c.day == stored.c.day),
+        full=True,
+    )
+    expected_count = func.coalesce(expected.c.task_count, 0)
+    stored_count = func.coalesce(stored.c.task_count, 0)
+    return select(
+        func.coalesce(expected.c.user_id, stored.c.user_id).label("user_id"),
+        func.coalesce(expected.c.status, stored.c.status).label("status"),
+        func.coalesce(expected.c.day, stored.c.day).label("day"),
+        expected_count.label("expected"),
+        stored_count.label("stored"),
+    ).select_from(joined).where(expected_count != stored_count).order_by(
+        literal_column("user_id"), literal_column("day")
+    )
+
+
+# Запросы для полного пересчета счетчиков (всех или одного пользователя) из таблицы задач
+def rebuild_counters_statements(user_id: Optional[str] = None) -> list:
+    clear = delete(TaskCounter)
+    if user_id:
+        clear = clear.where(TaskCounter.user_id == user_id)
+    fill = pg_insert(TaskCounter).from_select(
+        ["user_id", "status", "day", "task_count"],
+        expected_counters_query(user_id),
+    )
+    return [clear, fill]
@@ -0,0 +1,80 @@
+# Журнал изменений задач (таблица task_events) для ленты изменений: запрос, который пишет событие
+# и шлет NOTIFY в той же транзакции, что и изменение задач, и запросы чтения ленты.
+# NOTIFY доставляется слушателям только после commit, откат транзакции отменяет и событие
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import String, cast, delete, func, insert, literal, select
+
+from src.models.task_event import TaskEvent
+
+# Канал NOTIFY, payload - "user_id:id события"
+TASK_EVENTS_CHANNEL = "task_events"
+
+
+# Запрос, который пишет событие и шлет NOTIFY, одним обращением к БД.
+# Перед вставкой беру advisory lock пользователя до конца транзакции: события одного пользователя
+# получают id и коммитятся по очереди, поэтому если лента видит событие N, все его события
+# с меньшим id уже закоммичены и пропустить их нельзя. task_ids - None для загрузки из файла
+def task_event_statement(user_id: str, kind: str, task_ids: Optional[Iterable[str]] = None, count: Optional[int] = None):
+    task_ids = list(task_ids) if task_ids is not None else None
+    lock = select(
+        func.pg_advisory_xact_lock(func.hashtextextended(literal(user_id, String), 0)).label("locked")
+    ).cte("lock")
+    event = insert(TaskEvent).from_select(
+        ["user_id", "kind", "task_ids", "task_count", "created_at"],
+        select(
+            literal(user_id, TaskEvent.user_id.type),
+            literal(kind, TaskEvent.kind.type),
+            literal(task_ids, TaskEvent.task_ids.type),
+            literal(count if count is not None else len(task_ids), TaskEvent.task_count.type),
+            literal(datetime.utcnow(), TaskEvent.created_at.type),
+        ).select_from(lock)
+    ).returning(TaskEvent.id, TaskEvent.user_id).cte("event")
+    return select(
+        func.pg_notify(TASK_EVENTS_CHANNEL, cast(event.c.user_id, String) + ":" + cast(event.c.id, String))
+    ).select_from(event)
+
+
+# Разбираю payload NOTIFY, None - чужой или битый payload
+def parse_event_payload(payload: str) -> Optional[tuple[str, int]]:
+    user_id, _, event_id = payload.rpartition(":")
+    if not user_id or not event_id.isdigit():
+        return None
+    return user_id, int(event_id)
+
+
+# События пользователя после after по порядку
+def events_after_query(user_id: str, after: int, limit: int):
+    return select(
+        TaskEvent.id, TaskEvent.kind, TaskEvent.task_ids, TaskEvent.task_count, TaskEvent.created_at
+    ).where(TaskEvent.user_id == user_id, TaskEvent.id > after).order_by(TaskEvent.id).limit(limit)
+
+
+# Последнее событие пользователя - с него начинается лента без after
+def last_event_id_query(user_id: str):
+    return select(func.coalesce(func.max(TaskEvent.id), 0)).where(TaskEvent.user_id == user_id)
+
+
+# Самое старое хранимое событие пользователя. id общие для всех пользователей, поэтому сравниваю только
+# с событиями этого пользователя: по глобальному минимуму чужие удаленные события давали бы лишний reset,
+# а оставшиеся чужие старые события скрывали бы удаление событий пользователя
+def first_event_id_query(user_id: str):
+    return select(func.min(TaskEvent.id)).where(TaskEvent.user_id == user_id)
+
+
+# Удаление событий старше days дней
+def prune_events_statement(days: int):
+    return delete(TaskEvent).where(TaskEvent.created_at < datetime.utcnow() - timedelta(days=days))
+
+
+# Событие в JSON для клиента. Поля как в ответах API задач
+def event_to_json(row) -> dict:
+    event_id, kind, task_ids, task_count, created_at = row
+    return {
+        "id": event_id,
+        "type": kind,
+        "taskIds": task_ids,
+        "count": task_count,
+        "createdAt": created_at,
+    }
@@ -0,0 +1,124 @@
+# Выгрузка всех задач пользователя потоком: запрос на серверный курсор (stream_results + yield_per)
+# и форматирование пачек строк в NDJSON или CSV. В памяти держу только одну пачку строк,
+# поэтому память не зависит от количества задач. Запросы и форматирование общие для sync и async роутов
+import csv
+import io
+from typing import AsyncIterator, Iterable, Iterator, Optional
+
+import orjson
+from sqlalchemy import select
+
+from src.core.config import TASK_EXPORT_CHUNK_SIZE
+from src.core.database import SessionLocal, AsyncSessionLocal
+from src.models.task import Task
+from src.schemas.task import TaskStatus, TaskFileFormat
+from src.services.task_service import TASK_COLUMNS, build_task_filters
+
+# Поля строки выгрузки - как в ответе API, в порядке TASK_COLUMNS
+EXPORT_FIELDS = ("id", "title", "description", "status", "createdAt", "userId")
+
+
+# Запрос всех задач пользователя под фильтрами (как в get_tasks), по индексу (created_at, id) DESC.
+# yield_per включает серверный курсор: строки приходят пачками по chunk_size, а не все сразу
+def tasks_export_query(
+    user_id: str,
+    status: Optional[TaskStatus] = None,
+    date: Optional[str] = None,
+    day_group: Optional[str] = None,
+    month: Optional[str] = None,
+    chunk_size: int = TASK_EXPORT_CHUNK_SIZE
+):
+    filters = build_task_filters(user_id, status, date, day_group, month)
+    return select(*TASK_COLUMNS).where(*filters).order_by(
+        Task.created_at.desc(), Task.id.desc()
+    ).execution_options(stream_results=True, yield_per=chunk_size)
+
+
+# Пачка строк в NDJSON: одна задача - одна строка JSON
+def ndjson_chunk(rows: Iterable[tuple]) -> bytes:
+    return b"".join(
+        orjson.dumps(
+            {
+                "id": task_id,
+                "title": title,
+                "description": description,
+                "status": task_status.value,
+                "createdAt": created_at,
+                "userId": task_user_id,
+            },
+            option=orjson.OPT_APPEND_NEWLINE,
+        )
+        for task_id, title, description, task_status, created_at, task_user_id in rows
+    )
+
+
+# Заголовок CSV
+def csv_header() -> bytes:
+    return csv_chunk([EXPORT_FIELDS], raw=True)
+
+
+# Пачка строк в CSV. raw - строки уже готовые значения (для заголовка)
+def csv_chunk(rows: Iterable[tuple], raw: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if raw:
+        writer.writerows(rows)
+    else:
+        writer.writerows(
+            (task_id, title, description or "", task_status.value, created_at.isoformat(), task_user_id or "")
+            for task_id, title, description, task_status, created_at, task_user_id in rows
+        )
+    return buffer.getvalue().encode("utf-8")
+
+
+# Тип содержимого и имя файла для каждого формата
+EXPORT_MEDIA_TYPES = {
+    TaskFileFormat.NDJSON: "application/x-ndjson",
+    TaskFileFormat.CSV: "text/csv; charset=utf-8",
+}
+
+
+def export_filename(export_format: TaskFileFormat) -> str:
+    return f"tasks.{export_format.value}"
+
+
+# Выгрузка по кускам для sync роутов. Сессию открываю сам, а не беру из get_db: зависимости с yield
+# закрываются до того, как StreamingResponse начнет читать генератор. Следующую пачку читаю с курсора
+# только когда StreamingResponse попросит следующий кусок, а он просит после того, как отправил
+# предыдущий - медленный клиент притормаживает чтение из БД, а не копит куски в памяти
+def iter_task_export(
+    user_id: str,
+    export_format: TaskFileFormat,
+    status: Optional[TaskStatus] = None,
+    date: Optional[str] = None,
+    day_group: Optional[str] = None,
+    month: Optional[str] = None,
+    chunk_size: int = TASK_EXPORT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    query = tasks_export_query(user_id, status, date, day_group, month, chunk_size)
+    encode = csv_chunk if export_format == TaskFileFormat.CSV else ndjson_chunk
+    if export_format == TaskFileFormat.CSV:
+        yield csv_header()
+    with SessionLocal() as db:
+        for rows in db.execute(query).partitions():
+            yield encode(rows)
+
+
+# То же для async роутов: AsyncSession.stream отдает строки с серверного курсора пачками
+async def iter_task_export_async(
+    user_id: str,
+    export_format: TaskFileFormat,
+    status: Optional[TaskStatus] = None,
+    date: Optional[str] = None,
+    day_group: Optional[str] = None,
+    month: Optional[str] = None,
+    chunk_size: int = TASK_EXPORT_CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    query = tasks_export_query(user_id, status, date, day_group, month, chunk_size)
+    encode = csv_chunk if export_format == TaskFileFormat.CSV else ndjson_chunk
+    if export_format == TaskFileFormat.CSV:
+        yield csv_header()
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            yield encode(rows)
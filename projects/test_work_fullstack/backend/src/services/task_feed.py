@@ -0,0 +1,161 @@
+# Лента изменений задач: одно соединение LISTEN task_events на процесс и раздача уведомлений подписчикам
+# SSE и WebSocket этого процесса. Уведомление только будит подписчиков пользователя, сами события
+# они дочитывают из журнала task_events после своего последнего id, поэтому потерянное уведомление
+# (переподключение слушателя) ничего не ломает - следующее чтение журнала подберет пропущенное.
+# Лента всегда работает на AsyncEngine, в обоих DB_MODE: sync генератор держал бы поток threadpool
+# все время, пока открыто соединение клиента
+import asyncio
+from collections import defaultdict
+from contextlib import contextmanager, suppress
+from typing import AsyncIterator, Iterator, Optional
+
+import psycopg
+
+from src.core.config import TASK_FEED_HEARTBEAT, TASK_FEED_BATCH_SIZE
+from src.core.database import AsyncSessionLocal, db_url
+from src.services.task_events import (
+    TASK_EVENTS_CHANNEL,
+    parse_event_payload,
+    events_after_query,
+    last_event_id_query,
+    first_event_id_query,
+    event_to_json,
+)
+
+# Пауза перед переподключением слушателя: удваиваю после каждой неудачи до максимума
+LISTEN_RETRY_MIN = 0.5
+LISTEN_RETRY_MAX = 30.0
+
+
+# Слушатель NOTIFY и подписчики процесса. Подписчик - asyncio.Event, который слушатель взводит,
+# когда у пользователя появилось новое событие
+class TaskFeed:
+    def __init__(self, conninfo: str):
+        self.conninfo = conninfo
+        self._task: Optional[asyncio.Task] = None
+        self._subscribers: dict[str, set[asyncio.Event]] = defaultdict(set)
+        self.listening = False
+        self.notifications = 0
+        self.reconnects = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        self.listening = False
+
+    # Держу соединение LISTEN, при обрыве переподключаюсь с паузой. После подключения бужу всех
+    # подписчиков: пока слушателя не было, уведомления терялись, и им надо перечитать журнал
+    async def _listen(self) -> None:
+        delay = LISTEN_RETRY_MIN
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {TASK_EVENTS_CHANNEL}")
+                    self.listening = True
+                    delay = LISTEN_RETRY_MIN
+                    self._wake_all()
+                    async for notify in conn.notifies():
+                        self.notifications += 1
+                        parsed = parse_event_payload(notify.payload)
+                        if parsed is not None:
+                            self._wake(parsed[0])
+            except (psycopg.Error, OSError) as e:
+                self.last_error = str(e)
+            self.listening = False
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, LISTEN_RETRY_MAX)
+
+    def _wake(self, user_id: str) -> None:
+        for wakeup in self._subscribers.get(user_id, ()):
+            wakeup.set()
+
+    def _wake_all(self) -> None:
+        for wakeups in self._subscribers.values():
+            for wakeup in wakeups:
+                wakeup.set()
+
+    # Подписка на уведомления пользователя на время соединения клиента
+    @contextmanager
+    def subscribe(self, user_id: str) -> Iterator[asyncio.Event]:
+        wakeup = asyncio.Event()
+        self._subscribers[user_id].add(wakeup)
+        try:
+            yield wakeup
+        finally:
+            wakeups = self._subscribers.get(user_id)
+            if wakeups is not None:
+                wakeups.discard(wakeup)
+                if not wakeups:
+                    del self._subscribers[user_id]
+
+    def snapshot(self) -> dict:
+        return {
+            "listening": self.listening,
+            "users": len(self._subscribers),
+            "subscribers": sum(len(wakeups) for wakeups in self._subscribers.values()),
+            "notifications": self.notifications,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+        }
+
+
+# psycopg принимает обычный postgresql:// URL, без имени драйвера SQLAlchemy
+task_feed = TaskFeed(db_url.replace("postgresql+psycopg://", "postgresql://", 1))
+
+
+async def _scalar(query):
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(query)).scalar()
+
+
+async def _rows(query) -> list:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(query)).all()
+
+
+# События пользователя для SSE и WebSocket: словари event_to_json, None - пора отправить heartbeat.
+# Сначала подписываюсь, потом читаю журнал, чтобы событие между чтением и подпиской не потерялось.
+# Без after начинаю с последнего события пользователя. Первым отдаю {"type": "ready", "id": ...},
+# а если последнего полученного события (after) в журнале пользователя уже нет - {"type": "reset"}: часть событий удалена,
+# клиент должен перечитать задачи целиком. Сессию беру на каждое чтение, а не на все соединение,
+# чтобы открытые ленты не держали соединения пула. Если уведомления нет дольше heartbeat, все равно
+# перечитываю журнал - лента работает и без слушателя, только с задержкой до heartbeat
+async def iter_task_events(
+    user_id: str,
+    after: Optional[int] = None,
+    heartbeat: float = TASK_FEED_HEARTBEAT,
+    batch_size: int = TASK_FEED_BATCH_SIZE
+) -> AsyncIterator[Optional[dict]]:
+    with task_feed.subscribe(user_id) as wakeup:
+        if after is None:
+            after = await _scalar(last_event_id_query(user_id))
+        else:
+            # Последнего полученного клиентом события в журнале уже нет (события удаляются от старых к новым) -
+            # следующие за ним события пользователя тоже могли быть удалены
+            first = await _scalar(first_event_id_query(user_id))
+            if after > 0 and (first is None or after < first):
+                yield {"type": "reset"}
+        yield {"type": "ready", "id": after}
+
+        while True:
+            wakeup.clear()
+            rows = await _rows(events_after_query(user_id, after, batch_size))
+            for row in rows:
+                yield event_to_json(row)
+            if rows:
+                after = rows[-1][0]
+                if len(rows) == batch_size:
+                    continue
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield None
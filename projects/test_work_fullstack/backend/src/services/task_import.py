@@ -0,0 +1,259 @@
+# Загрузка задач из NDJSON или CSV: разбираю поток байт на пачки строк, проверяю каждую строку по TaskCreate
+# и гружу пачку через COPY во временную таблицу, а оттуда одним INSERT ... SELECT в tasks.
+# Каждая пачка - отдельная транзакция. Разбор общий для sync и async роутов и для import_tasks.py
+import csv
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+import orjson
+import psycopg
+from pydantic import ValidationError
+from sqlalchemy import Column, MetaData, String, Table, cast, func, insert, literal, select, union_all
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import CreateTable
+
+from src.core.config import TASK_IMPORT_CHUNK_SIZE
+from src.core.ids import uuid7_sql
+from src.models.task import Task
+from src.models.task_counter import TaskCounter
+from src.models.task_calendar import TaskCalendar, CALENDAR_DAY, CALENDAR_MONTH
+from src.schemas.task import TaskCreate, TaskFileFormat
+from src.services.task_counters import counter_add_from_statement
+from src.services.task_calendar import calendar_add_from_statement
+from src.services.task_versions import version_bump_statement
+
+# Postgres не хранит символ NUL в текстовых колонках: COPY отверг бы всю пачку
+NUL = "\x00"
+
+# Сколько ошибок одной пачки отдавать в отчете, остальные только считаю
+IMPORT_MAX_ERRORS_PER_BATCH = 20
+
+# Колонки, которые читаю из CSV. Остальные (например id и createdAt из выгрузки) пропускаю
+IMPORT_CSV_COLUMNS = ("title", "description", "status")
+
+# Временная таблица для COPY и ее колонки в порядке строк ImportBatch.rows
+IMPORT_STAGING_TABLE = "task_import_staging"
+IMPORT_COLUMNS = ("title", "description", "status")
+
+
+# Ошибки БД при записи пачки: COPY идет через курсор psycopg напрямую, его ошибки SQLAlchemy не оборачивает
+IMPORT_DB_ERRORS = (SQLAlchemyError, psycopg.Error)
+
+
+# Файл нельзя разобрать целиком (например, в CSV нет колонки title) - отвечаю 400
+class InvalidImportError(ValueError):
+    pass
+
+
+# Пачка проверенных строк: rows - (title, description, имя статуса) для COPY, имя - как статус хранит колонка,
+# errors - (номер строки, текст ошибки) не больше IMPORT_MAX_ERRORS_PER_BATCH, failed - всего ошибок
+class ImportBatch(NamedTuple):
+    number: int
+    first_line: int
+    last_line: int
+    rows: list[tuple]
+    errors: list[tuple[int, str]]
+    failed: int
+
+
+# Разбираю файл по мере поступления байт: feed() принимает очередной кусок тела запроса и возвращает
+# готовые пачки по chunk_size записей, close() - остаток. В памяти держу только текущую пачку
+class TaskImportReader:
+    def __init__(self, file_format: TaskFileFormat, chunk_size: int = TASK_IMPORT_CHUNK_SIZE):
+        self.file_format = file_format
+        self.chunk_size = chunk_size
+        self._tail = b""
+        self._line = 0
+        # Начатая запись CSV: поле в кавычках может содержать перевод строки
+        self._record: list[str] = []
+        self._record_line = 0
+        self._quotes = 0
+        self._columns: Optional[tuple] = None
+        # (номер строки, текст записи) текущей пачки
+        self._pending: list[tuple[int, str]] = []
+        self._batches = 0
+
+    def feed(self, data: bytes) -> list[ImportBatch]:
+        lines = (self._tail + data).split(b"\n")
+        self._tail = lines.pop()
+        return self._add_lines(lines)
+
+    def close(self) -> list[ImportBatch]:
+        batches = self._add_lines([self._tail] if self._tail else [])
+        self._tail = b""
+        unclosed = None
+        if self._record:
+            # Кавычка так и не закрылась до конца файла - последняя запись ошибочная
+            if self._columns is None:
+                raise InvalidImportError("Не закрыта кавычка в заголовке CSV")
+            unclosed, self._record = self._record_line, []
+        if self._pending or unclosed:
+            batches.append(self._flush(unclosed))
+        return batches
+
+    def _add_lines(self, lines: list[bytes]) -> list[ImportBatch]:
+        batches = []
+        for raw in lines:
+            self._line += 1
+            line = raw.rstrip(b"\r").decode("utf-8-sig" if self._line == 1 else "utf-8", errors="replace")
+            line_number = self._line
+            if self.file_format == TaskFileFormat.CSV:
+                # Запись CSV закончена, когда кавычек в ней четное количество ("" внутри поля - тоже пара)
+                if not self._record:
+                    self._record_line, self._quotes = self._line, 0
+                self._record.append(line)
+                self._quotes += line.count('"')
+                if self._quotes % 2:
+                    continue
+                line, line_number, self._record = "\n".join(self._record), self._record_line, []
+                if self._columns is None:
+                    self._columns = self._csv_columns(line)
+                    continue
+            if not line.strip():
+                continue
+            self._pending.append((line_number, line))
+            if len(self._pending) >= self.chunk_size:
+                batches.append(self._flush())
+        return batches
+
+    # Индексы колонок title, description и status по заголовку CSV
+    def _csv_columns(self, header: str) -> tuple:
+        names = [name.strip() for name in next(csv.reader([header]), [])]
+        if "title" not in names:
+            raise InvalidImportError("В заголовке CSV нет колонки title")
+        return tuple(names.index(name) if name in names else None for name in IMPORT_CSV_COLUMNS)
+
+    # Проверяю записи пачки по TaskCreate. unclosed - строка записи CSV с незакрытой кавычкой в конце файла.
+    # Каждую запись разбираю отдельно: ошибка разбора одной записи (например, поле CSV больше лимита модуля csv)
+    # попадает в ошибки пачки, а не обрывает всю загрузку
+    def _flush(self, unclosed: Optional[int] = None) -> ImportBatch:
+        rows, errors, failed = [], [], 0
+        for line_number, record in self._pending:
+            try:
+                task_data = TaskCreate.model_validate(self._record_data(record))
+                if NUL in task_data.title or NUL in (task_data.description or ""):
+                    raise ValueError("Текст задачи содержит символ NUL (\\u0000)")
+            except (ValueError, ValidationError, csv.Error) as e:
+                failed += 1
+                if len(errors) < IMPORT_MAX_ERRORS_PER_BATCH:
+                    errors.append((line_number, import_error_message(e)))
+                continue
+            rows.append((task_data.title, task_data.description, task_data.status.name))
+        if unclosed:
+            failed += 1
+            if len(errors) < IMPORT_MAX_ERRORS_PER_BATCH:
+                errors.append((unclosed, "Не закрыта кавычка"))
+
+        self._batches += 1
+        first_line = self._pending[0][0] if self._pending else unclosed
+        batch = ImportBatch(self._batches, first_line, self._line, rows, errors, failed)
+        self._pending = []
+        return batch
+
+    # Данные одной записи для TaskCreate. Пустые description и status в CSV - значения по умолчанию
+    def _record_data(self, record: str) -> dict:
+        if self.file_format == TaskFileFormat.NDJSON:
+            data = orjson.loads(record)
+            if not isinstance(data, dict):
+                raise ValueError("Ожидаю JSON объект задачи")
+            return data
+        record = next(csv.reader([record]), [])
+        data = {}
+        for name, index in zip(IMPORT_CSV_COLUMNS, self._columns):
+            value = record[index] if index is not None and index < len(record) else ""
+            if value:
+                data[name] = value
+        return data
+
+
+# Текст ошибки строки для отчета
+def import_error_message(e: Exception) -> str:
+    if isinstance(e, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" if error["loc"] else error["msg"]
+            for error in e.errors()
+        )
+    if isinstance(e, orjson.JSONDecodeError):
+        return "Некорректный JSON"
+    if isinstance(e, csv.Error):
+        return f"Некорректная запись CSV: {e}"
+    return str(e)
+
+
+# Временная таблица под COPY: только поля из файла, id, даты и user_id добавляю при переносе в tasks.
+# Своя у каждого соединения, создаю при первой загрузке и дальше переиспользую, строки удаляются при commit
+staging_table = Table(
+    IMPORT_STAGING_TABLE,
+    MetaData(),
+    Column("title", Task.title.type),
+    Column("description", Task.description.type),
+    Column("status", Task.status.type),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DELETE ROWS",
+)
+
+
+def staging_create_statement():
+    return CreateTable(staging_table, if_not_exists=True)
+
+
+def staging_copy_sql() -> str:
+    return f"COPY {IMPORT_STAGING_TABLE} ({', '.join(IMPORT_COLUMNS)}) FROM STDIN"
+
+
+# Один INSERT ... SELECT из временной таблицы в tasks. id генерирует БД (UUIDv7 со временем created_at),
+# created_at (он же updated_at) у всей пачки один, как в build_task_rows
+def staging_insert_statement(user_id: str, created_at: datetime):
+    return insert(Task).from_select(
+        ["id", "title", "description", "status", "created_at", "updated_at", "user_id"],
+        select(
+            uuid7_sql(created_at),
+            staging_table.c.title,
+            staging_table.c.description,
+            staging_table.c.status,
+            literal(created_at, Task.created_at.type),
+            literal(created_at, Task.updated_at.type),
+            literal(user_id, Task.user_id.type),
+        )
+    )
+
+
+# Счетчики и календарь для пачки считаю по временной таблице одним запросом каждый,
+# а не по строке на задачу как task_change_statements. Порядок строк тот же, что у delta запросов:
+# статусы по имени, день раньше месяца. Последним - новая версия задач пользователя, как в task_change_statements
+def staging_change_statements(user_id: str, created_at: datetime) -> list:
+    user = literal(user_id, Task.user_id.type)
+    day = created_at.date()
+    counters = select(
+        user, staging_table.c.status, literal(day, TaskCounter.day.type), func.count()
+    ).group_by(staging_table.c.status).order_by(cast(staging_table.c.status, String))
+    calendar = union_all(*(
+        select(user, literal(period), literal(bucket, TaskCalendar.bucket.type), func.count())
+        .select_from(staging_table)
+        for period, bucket in ((CALENDAR_DAY, day), (CALENDAR_MONTH, day.replace(day=1)))
+    ))
+    return [counter_add_from_statement(counters), calendar_add_from_statement(calendar), version_bump_statement(user_id)]
+
+
+# Отчет по одной пачке
+def import_batch_report(batch: ImportBatch, imported: int) -> dict:
+    return {
+        "batch": batch.number,
+        "first_line": batch.first_line,
+        "last_line": batch.last_line,
+        "imported": imported,
+        "failed": batch.failed,
+        "errors": [{"line": line, "error": error} for line, error in batch.errors],
+    }
+
+
+# Отчет по всей загрузке из отчетов пачек. error - загрузка оборвалась, batches - пачки, загруженные до ошибки
+def import_report(batches: list[dict], error: Optional[str] = None) -> dict:
+    report = {
+        "imported": sum(batch["imported"] for batch in batches),
+        "failed": sum(batch["failed"] for batch in batches),
+        "batches": batches,
+    }
+    if error is not None:
+        report["error"] = error
+    return report
@@ -0,0 +1,67 @@
+# Поиск задач по заголовку и описанию (q= в GET /tasks): разбираю строку пользователя в tsquery,
+# строю условие поиска и ранг для сортировки. Условие использует GIN индекс по tasks.search_vector.
+# Каждое слово ищу как префикс (слово:*), поэтому находится и недописанное слово. Общее для sync и async
+import re
+from typing import NamedTuple, Optional
+
+from sqlalchemy import func, literal, literal_column, or_
+
+from src.core.config import TASK_SEARCH_TRIGRAM
+from src.models.task import Task, TASK_SEARCH_CONFIG
+
+# Слова запроса - буквы и цифры, остальное (в том числе синтаксис tsquery) считаю разделителями
+SEARCH_WORD_RE = re.compile(r"[^\W_]+")
+# Больше слов в запросе не беру: каждое слово - отдельное условие по индексу
+SEARCH_MAX_WORDS = 8
+
+
+# В строке поиска нет ни одного слова
+class InvalidSearchError(ValueError):
+    pass
+
+
+# Разобранный поисковый запрос: text - строка как ввел пользователь (для поиска подстроки),
+# tsquery - слова через & с префиксным поиском
+class TaskSearch(NamedTuple):
+    text: str
+    tsquery: str
+
+
+# Разбираю q=. None - поиска нет
+def parse_search_query(q: Optional[str]) -> Optional[TaskSearch]:
+    if q is None or not q.strip():
+        return None
+    words = SEARCH_WORD_RE.findall(q.lower())
+    if not words:
+        raise InvalidSearchError("В поисковом запросе нет слов")
+    return TaskSearch(q.strip(), " & ".join(f"{word}:*" for word in words[:SEARCH_MAX_WORDS]))
+
+
+# to_tsquery должна быть константой плана, иначе Postgres считает ее заново для каждой найденной строки
+# (на частом слове это в 3-4 раза дольше). Поэтому конфигурацию пишу как 'russian'::regconfig, а строку
+# запроса подставляю в SQL при выполнении (literal_execute): с параметром psycopg после 5 вызовов
+# переходит на подготовленный запрос с generic планом, где параметр не сворачивается
+def search_tsquery(search: TaskSearch):
+    return func.to_tsquery(
+        literal_column(f"'{TASK_SEARCH_CONFIG}'::regconfig"),
+        literal(search.tsquery, literal_execute=True),
+    )
+
+
+# Экранирую % и _ для LIKE
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Условие поиска. С TASK_SEARCH_TRIGRAM еще и подстрока в заголовке (по триграммному индексу)
+def task_search_filter(search: TaskSearch):
+    condition = Task.search_vector.op("@@")(search_tsquery(search))
+    if TASK_SEARCH_TRIGRAM:
+        condition = or_(condition, Task.title.ilike(f"%{escape_like(search.text)}%", escape="\\"))
+    return condition
+
+
+# Ранг задачи для сортировки результатов поиска: совпадения в заголовке весят больше, чем в описании.
+# Найденные только по подстроке получают 0 и идут после остальных
+def task_search_rank(search: TaskSearch):
+    return func.ts_rank(Task.search_vector, search_tsquery(search))
@@ -1,145 +1,719 @@
 # Создаю, получаю, обновляю и удаляю задачи для пользователей
-from typing import Optional
+import base64
+import json
+import uuid
+from datetime import datetime, time, timedelta, date as date_class
+from typing import NamedTuple, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import REAL, and_, cast, delete, func, select, tuple_, update
 
+from src.core.config import (
+    TASK_COUNTERS_ENABLED,
+    TASK_CALENDAR_ENABLED,
+    TASK_CACHE_BACKEND,
+    TASK_CACHE_SIZE,
+    TASK_CACHE_TTL,
+    TASK_FEED_ENABLED,
+)
+from src.core.cache import NullCache, create_cache_backend
+from src.core.ids import uuid7, parse_id
+from src.models.task_calendar import CALENDAR_DAY, CALENDAR_MONTH
 from src.models.task import Task, TaskStatus as TaskStatusEnum
-from src.schemas.task import TaskCreate, TaskUpdate, TaskStatus
+from src.models.task_event import EVENT_CREATED, EVENT_UPDATED, EVENT_DELETED, EVENT_IMPORTED
+from src.schemas.task import TaskCreate, TaskUpdate, TaskStatus, TaskBatchUpdateItem
+from src.services.task_counters import counter_delta_statement, counters_total_query
+from src.services.task_calendar import (
+    calendar_delta_statement,
+    calendar_buckets_query,
+    format_calendar_days,
+    format_calendar_months,
+)
+from src.services.task_events import task_event_statement
+from src.services.task_versions import version_bump_statement, task_version_query
+from src.services.task_search import TaskSearch, task_search_filter, task_search_rank
+from src.services.task_import import (
+    ImportBatch,
+    staging_create_statement,
+    staging_copy_sql,
+    staging_insert_statement,
+    staging_change_statements,
+    import_batch_report,
+)
+from src.services.task_batch import (
+    BATCH_CREATED,
+    BATCH_UPDATED,
+    BATCH_DELETED,
+    valid_batch_ids,
+    task_update_values,
+    build_task_rows,
+    tasks_insert_statement,
+    locked_tasks_query,
+    group_task_updates,
+    tasks_update_statement,
+    tasks_by_ids_query,
+    tasks_delete_statement,
+    batch_results,
+)
 
 
-# Создаю новую задачу для пользователя, сохраняю в БД
-def create_task(db: Session, task_data: TaskCreate, user_id: str) -> Task:
-    task = Task(
+# Собираю объект задачи из данных запроса. updated_at новой задачи равен created_at, время в id - тоже
+def build_task(task_data: TaskCreate, user_id: str) -> Task:
+    now = datetime.utcnow()
+    return Task(
+        id=uuid7(now),
         title=task_data.title,
         description=task_data.description,
         status=TaskStatusEnum(task_data.status.value) if task_data.status else TaskStatusEnum.PENDING,
+        created_at=now,
+        updated_at=now,
         user_id=user_id
     )
+
+
+# Запросы, которые нужно выполнить в той же транзакции при изменении задач пользователя:
+# счетчики task_counters, календарь task_calendar, версия задач task_versions и событие ленты изменений.
+# removed/added - (статус, created_at) удаленных и добавленных строк, изменение задачи - это удаление
+# старой строки и добавление новой. kind и task_ids - вид события и id измененных задач
+def task_change_statements(user_id: str, removed=(), added=(), kind: Optional[str] = None, task_ids=()) -> list:
+    removed, added = list(removed), list(added)
+    statements = [
+        counter_delta_statement(user_id, removed, added),
+        calendar_delta_statement(user_id, removed, added),
+        version_bump_statement(user_id) if removed or added else None,
+    ]
+    return [stmt for stmt in statements if stmt is not None] + task_event_statements(user_id, kind, task_ids)
+
+
+# Событие для ленты изменений (kind - EVENT_CREATED и т.д.): пишу в журнал последним запросом транзакции,
+# чтобы блокировка пользователя держалась как можно меньше. Пусто, если лента выключена или ничего не изменилось
+def task_event_statements(user_id: str, kind: Optional[str], task_ids=None, count: Optional[int] = None) -> list:
+    if not TASK_FEED_ENABLED or kind is None:
+        return []
+    task_ids = list(task_ids) if task_ids is not None else None
+    if not (count if task_ids is None else task_ids):
+        return []
+    return [task_event_statement(user_id, kind, task_ids, count)]
+
+
+# Выполняю запросы из task_change_statements в текущей транзакции
+def execute_statements(db: Session, statements: list) -> None:
+    for stmt in statements:
+        db.execute(stmt)
+
+
+# Кеш чтения задач: отдельные задачи и первые страницы списка по пользователю и набору фильтров.
+# Все ключи пользователя содержат его версию: любое изменение задач пользователя меняет версию,
+# и старые записи больше не находятся (их вытеснит LRU или TTL). Если версию вытеснили из кеша,
+# создаю новую - старые записи тоже перестают находиться, устаревшие данные отдать нельзя
+task_cache = create_cache_backend(TASK_CACHE_BACKEND, TASK_CACHE_SIZE)
+
+
+# Снимок задачи для кеша: неизменяемый и не привязан к сессии, атрибуты те же что у модели
+class CachedTask(NamedTuple):
+    id: str
+    title: str
+    description: Optional[str]
+    status: TaskStatusEnum
+    created_at: datetime
+    user_id: Optional[str]
+
+
+def snapshot_task(task: Task) -> CachedTask:
+    return CachedTask(task.id, task.title, task.description, task.status, task.created_at, task.user_id)
+
+
+def _task_cache_version_key(user_id: str) -> str:
+    return f"tasks:{user_id}:version"
+
+
+# Текущая версия кеша пользователя, None - кеш выключен.
+# Версию читаю до запроса в БД, чтобы запись, пересекшаяся с изменением, попала под старую версию
+def task_cache_version(user_id: str) -> Optional[str]:
+    if isinstance(task_cache, NullCache):
+        return None
+    key = _task_cache_version_key(user_id)
+    version = task_cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        task_cache.set(key, version)
+    return version
+
+
+# Сбрасываю кеш пользователя после commit изменения его задач
+def invalidate_user_tasks(user_id: str) -> None:
+    if not isinstance(task_cache, NullCache):
+        task_cache.set(_task_cache_version_key(user_id), uuid.uuid4().hex)
+
+
+# Начало ключей кеша пользователя, None - кеш выключен. task_version - версия задач из task_versions,
+# если роут ее уже прочитал для ETag: с ней запись, положенная другим воркером до изменения, не найдется
+def _task_cache_prefix(user_id: str, task_version: Optional[int] = None) -> Optional[str]:
+    version = task_cache_version(user_id)
+    if version is None:
+        return None
+    if task_version is not None:
+        return f"tasks:{user_id}:{version}:{task_version}"
+    return f"tasks:{user_id}:{version}"
+
+
+# Ключ кеша одной задачи, None - кеш выключен
+def task_cache_key(user_id: str, task_id: str, task_version: Optional[int] = None) -> Optional[str]:
+    prefix = _task_cache_prefix(user_id, task_version)
+    if prefix is None:
+        return None
+    return f"{prefix}:task:{task_id}"
+
+
+# Ключ кеша страницы списка. Кеширую только первую страницу (без skip и курсора) - ее читают чаще всего.
+# Для day_group добавляю сегодняшнюю дату, иначе после полуночи "today" отдал бы вчерашний список
+def tasks_page_cache_key(
+    user_id: str,
+    status: Optional[TaskStatus],
+    date: Optional[str],
+    day_group: Optional[str],
+    month: Optional[str],
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    with_total: bool,
+    exact_total: bool,
+    fields: Optional[tuple[str, ...]] = None,
+    task_version: Optional[int] = None
+) -> Optional[str]:
+    if skip or cursor:
+        return None
+    prefix = _task_cache_prefix(user_id, task_version)
+    if prefix is None:
+        return None
+    params = [
+        status.value if status else "",
+        date or "",
+        day_group or "",
+        date_class.today().isoformat() if day_group else "",
+        month or "",
+        str(limit),
+        "1" if with_total else "0",
+        "1" if exact_total else "0",
+        ",".join(fields) if fields else "",
+    ]
+    return f"{prefix}:page:" + "|".join(params)
+
+
+# Кладу страницу списка в кеш. Строки списка храню обычными кортежами в порядке колонок запроса -
+# это самое компактное представление, ответ списка все равно распаковывает их по позиции
+def cache_tasks_page(key: Optional[str], tasks: list, total: Optional[int], next_cursor: Optional[str]) -> None:
+    if key is not None:
+        task_cache.set(key, (tuple(map(tuple, tasks)), total, next_cursor), TASK_CACHE_TTL)
+
+
+# Страница списка из кеша в том же виде, что возвращает get_tasks, или None
+def cached_tasks_page(key: Optional[str]) -> Optional[tuple[list, Optional[int], Optional[str]]]:
+    if key is None:
+        return None
+    cached = task_cache.get(key)
+    if cached is None:
+        return None
+    tasks, total, next_cursor = cached
+    return list(tasks), total, next_cursor
+
+
+# Создаю новую задачу для пользователя, сохраняю в БД
+def create_task(db: Session, task_data: TaskCreate, user_id: str) -> Task:
+    task = build_task(task_data, user_id)
     db.add(task)
+    # flush - чтобы у задачи появился created_at для счетчиков
+    db.flush()
+    execute_statements(db, task_change_statements(
+        user_id, added=[(task.status, task.created_at)], kind=EVENT_CREATED, task_ids=[task.id]
+    ))
     db.commit()
+    invalidate_user_tasks(user_id)
     db.refresh(task)
     return task
 
 
-# Получаю задачу по ID, проверяю что она принадлежит пользователю
+# Получаю задачу по ID, проверяю что она принадлежит пользователю. Не UUID - задачи нет
 def get_task_by_id(db: Session, task_id: str, user_id: str) -> Optional[Task]:
+    task_id = parse_id(task_id)
+    if task_id is None:
+        return None
     return db.query(Task).filter(
         and_(Task.id == task_id, Task.user_id == user_id)
     ).first()
 
 
-# Получаю список задач пользователя, можно отфильтровать по статусу, дате, группе дней или месяцу
-def get_tasks(
+# Запрос колонок одной задачи пользователя (TASK_COLUMNS), без ORM объекта
+def task_row_query(task_id: str, user_id: str):
+    return select(*TASK_COLUMNS).where(Task.id == task_id, Task.user_id == user_id)
+
+
+# То же самое через кеш: для чтения задачи в роуте. Возвращаю снимок задачи (CachedTask).
+# task_version - версия задач пользователя, если роут ее уже прочитал (см. _task_cache_prefix)
+def get_task_cached(
     db: Session,
+    task_id: str,
     user_id: str,
-    status: Optional[TaskStatus] = None,
+    task_version: Optional[int] = None
+) -> Optional[CachedTask]:
+    task_id = parse_id(task_id)
+    if task_id is None:
+        return None
+    key = task_cache_key(user_id, task_id, task_version)
+    if key is not None:
+        cached = task_cache.get(key)
+        if cached is not None:
+            return cached
+    
+    task = db.execute(task_row_query(task_id, user_id)).first()
+    if task is None:
+        return None
+    cached = snapshot_task(task)
+    if key is not None:
+        task_cache.set(key, cached, TASK_CACHE_TTL)
+    return cached
+
+
+# Перевожу фильтр по дате, группе дней или месяцу в полуинтервал [start, end) по created_at.
+# end=None - без верхней границы, None вместо интервала - фильтра по дате нет (или он некорректный).
+# Сравниваю сам столбец с границами, а не func.date()/extract() от него, чтобы работал индекс по created_at
+def task_date_range(
     date: Optional[str] = None,
     day_group: Optional[str] = None,
-    month: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 100
-) -> tuple[list[Task], int]:
-    from datetime import datetime, timedelta, date as date_class
-    from sqlalchemy import func
-    
-    query = db.query(Task).filter(Task.user_id == user_id)
-    
-    if status:
-        query = query.filter(Task.status == TaskStatusEnum(status.value))
-    
+    month: Optional[str] = None
+) -> Optional[tuple[datetime, Optional[datetime]]]:
     # Фильтрую по конкретной дате (YYYY-MM-DD)
     if date:
         try:
             filter_date = datetime.fromisoformat(date.replace('Z', '+00:00')).date()
-            query = query.filter(func.date(Task.created_at) == filter_date)
         except (ValueError, AttributeError):
-            pass
+            return None
+        start = datetime.combine(filter_date, time.min)
+        return start, start + timedelta(days=1)
     
     # Фильтрую по группе дней (today, yesterday, week, month)
-    elif day_group:
-        today = date_class.today()
-        try:
-            if day_group == 'today':
-                query = query.filter(func.date(Task.created_at) == today)
-            elif day_group == 'yesterday':
-                yesterday = today - timedelta(days=1)
-                query = query.filter(func.date(Task.created_at) == yesterday)
-            elif day_group == 'week':
-                week_ago = today - timedelta(days=7)
-                query = query.filter(func.date(Task.created_at) >= week_ago)
-            elif day_group == 'month':
-                month_ago = today - timedelta(days=30)
-                query = query.filter(func.date(Task.created_at) >= month_ago)
-        except (ValueError, AttributeError):
-            pass
+    if day_group:
+        today = datetime.combine(date_class.today(), time.min)
+        if day_group == 'today':
+            return today, today + timedelta(days=1)
+        if day_group == 'yesterday':
+            return today - timedelta(days=1), today
+        if day_group == 'week':
+            return today - timedelta(days=7), None
+        if day_group == 'month':
+            return today - timedelta(days=30), None
+        return None
     
     # Фильтрую по месяцу (YYYY-MM)
-    elif month:
+    if month:
         try:
             year, month_num = month.split('-')
-            # Фильтрую по году и месяцу
-            query = query.filter(
-                func.extract('year', Task.created_at) == int(year),
-                func.extract('month', Task.created_at) == int(month_num)
-            )
+            start = datetime(int(year), int(month_num), 1)
         except (ValueError, AttributeError):
-            pass
+            return None
+        if start.month == 12:
+            return start, datetime(start.year + 1, 1, 1)
+        return start, datetime(start.year, start.month + 1, 1)
+    
+    return None
+
+
+# Собираю условия фильтрации задач пользователя по статусу, дате, группе дней или месяцу
+# и поисковому запросу. Условия общие для sync и async версий сервиса
+def build_task_filters(
+    user_id: str,
+    status: Optional[TaskStatus] = None,
+    date: Optional[str] = None,
+    day_group: Optional[str] = None,
+    month: Optional[str] = None,
+    search: Optional[TaskSearch] = None
+) -> list:
+    filters = [Task.user_id == user_id]
+    
+    if search is not None:
+        filters.append(task_search_filter(search))
     
-    total = query.count()
-    tasks = query.order_by(Task.created_at.desc()).offset(skip).limit(limit).all()
+    if status:
+        filters.append(Task.status == TaskStatusEnum(status.value))
+    
+    date_range = task_date_range(date, day_group, month)
+    if date_range:
+        start, end = date_range
+        filters.append(Task.created_at >= start)
+        if end is not None:
+            filters.append(Task.created_at < end)
     
-    return tasks, total
+    return filters
+
+
+# Курсор пагинации битый или подделан
+class InvalidCursorError(ValueError):
+    pass
+
+
+# Курсор для keyset пагинации: (created_at, id) последней задачи страницы в base64 JSON,
+# для результатов поиска еще и ранг. Для клиента это непрозрачная строка, он просто передает ее в следующий запрос
+def encode_task_cursor(task: Task, rank: Optional[float] = None) -> str:
+    payload = {"c": task.created_at.isoformat(), "i": str(task.id)}
+    if rank is not None:
+        payload["r"] = rank
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+# Разбираю курсор обратно в (created_at, id, ранг или None)
+def decode_task_cursor(cursor: str) -> tuple[datetime, str, Optional[float]]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        rank = payload.get("r")
+        if rank is not None and not isinstance(rank, (int, float)):
+            raise ValueError(rank)
+        return datetime.fromisoformat(payload["c"]), str(uuid.UUID(payload["i"])), rank
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise InvalidCursorError("Некорректный курсор пагинации") from e
+
+
+# Колонки задачи для ответов API. Выбираю их напрямую: строки без ORM объектов и identity map
+# заметно дешевле на больших страницах, а атрибуты у них те же что у модели
+TASK_COLUMNS = (Task.id, Task.title, Task.description, Task.status, Task.created_at, Task.user_id)
 
+# Поля задачи в ответе API в порядке TaskResponse и их колонки. id и createdAt отдаю всегда -
+# по ним строится курсор, и без id клиент ничего не сделает с задачей
+TASK_FIELDS = {
+    "title": Task.title,
+    "description": Task.description,
+    "status": Task.status,
+    "id": Task.id,
+    "createdAt": Task.created_at,
+    "userId": Task.user_id,
+}
+TASK_REQUIRED_FIELDS = ("id", "createdAt")
 
-# Обновляю задачу, меняю только те поля которые переданы
+
+# В fields= передано неизвестное поле
+class InvalidFieldsError(ValueError):
+    pass
+
+
+# Разбираю fields=title,status в кортеж полей ответа в порядке TaskResponse. None - все поля
+def parse_task_fields(fields: Optional[str]) -> Optional[tuple[str, ...]]:
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - TASK_FIELDS.keys()
+    if unknown:
+        raise InvalidFieldsError(f"Неизвестные поля задачи: {', '.join(sorted(unknown))}")
+    requested.update(TASK_REQUIRED_FIELDS)
+    if requested == TASK_FIELDS.keys():
+        return None
+    return tuple(name for name in TASK_FIELDS if name in requested)
+
+
+# Колонки для списка задач: все (TASK_COLUMNS) или только выбранные поля, в порядке полей
+def task_list_columns(fields: Optional[tuple[str, ...]] = None) -> tuple:
+    if fields is None:
+        return TASK_COLUMNS
+    return tuple(TASK_FIELDS[name] for name in fields)
+
+
+# Запрос страницы задач, сортирую по (created_at, id) DESC - id нужен чтобы порядок был однозначным.
+# С курсором беру строки строго после него (keyset, стоит одинаково для любой страницы),
+# без курсора - OFFSET как раньше. Беру на строку больше, чтобы узнать есть ли следующая страница.
+# columns - выбрать эти колонки вместо ORM объектов Task.
+# С поиском (search) сначала сортирую по рангу, ранг добавляю последней колонкой строки и в курсор
+def tasks_page_query(
+    filters: list,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    columns: Optional[tuple] = None,
+    search: Optional[TaskSearch] = None
+):
+    stmt = select(*columns) if columns else select(Task)
+    rank = task_search_rank(search) if search is not None else None
+    if rank is not None:
+        stmt = stmt.add_columns(rank.label("rank"))
+    stmt = stmt.where(*filters)
+    if cursor:
+        created_at, task_id, cursor_rank = decode_task_cursor(cursor)
+        if rank is None:
+            stmt = stmt.where(
+                tuple_(Task.created_at, Task.id)
+                < tuple_(created_at, task_id, types=[Task.created_at.type, Task.id.type])
+            )
+        elif cursor_rank is None:
+            raise InvalidCursorError("Курсор не от результатов поиска")
+        else:
+            # Ранг в курсоре - короткая десятичная запись float4 из ответа БД. Привожу ее обратно к real
+            # в SQL: как float8 она не равна рангу той же строки, и задачи с равным рангом терялись бы
+            stmt = stmt.where(
+                tuple_(rank, Task.created_at, Task.id)
+                < tuple_(cast(cursor_rank, REAL), created_at, task_id, types=[REAL(), Task.created_at.type, Task.id.type])
+            )
+    elif skip:
+        stmt = stmt.offset(skip)
+    order = [Task.created_at.desc(), Task.id.desc()]
+    if rank is not None:
+        order.insert(0, rank.desc())
+    return stmt.order_by(*order).limit(limit + 1)
+
+
+# Отрезаю лишнюю строку из tasks_page_query. Если она была - отдаю курсор на следующую страницу.
+# ranked - в строках последней колонкой ранг поиска: кладу его в курсор и отрезаю от строк
+def split_tasks_page(tasks: list, limit: int, ranked: bool = False) -> tuple[list, Optional[str]]:
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = encode_task_cursor(tasks[-1], tasks[-1][-1] if ranked else None)
+    if ranked:
+        tasks = [tuple(task[:-1]) for task in tasks]
+    return tasks, next_cursor
+
+
+# Запрос количества задач под фильтрами
+def tasks_count_query(filters: list):
+    return select(func.count()).select_from(Task).where(*filters)
+
+
+# Запрос total для списка задач: из счетчиков task_counters, если они включены и фильтр по целым дням,
+# иначе (или если exact=True, или с поиском) точный COUNT(*) по задачам
+def task_total_query(
+    user_id: str,
+    status: Optional[TaskStatus] = None,
+    date: Optional[str] = None,
+    day_group: Optional[str] = None,
+    month: Optional[str] = None,
+    exact: bool = False,
+    search: Optional[TaskSearch] = None
+):
+    if TASK_COUNTERS_ENABLED and not exact and search is None:
+        stmt = counters_total_query(user_id, status, task_date_range(date, day_group, month))
+        if stmt is not None:
+            return stmt
+    return tasks_count_query(build_task_filters(user_id, status, date, day_group, month, search))
+
+
+# Получаю страницу задач пользователя, можно отфильтровать по статусу, дате, группе дней или месяцу.
+# Возвращаю строки задач с колонками task_list_columns(fields), total (None если with_total=False)
+# и курсор следующей страницы (None если это последняя). Первую страницу отдаю из кеша, если она там есть
+# (task_version - как в get_task_cached). search - поиск q=, результаты по рангу, их не кеширую
+def get_tasks(
+    db: Session,
+    user_id: str,
+    status: Optional[TaskStatus] = None,
+    date: Optional[str] = None,
+    day_group: Optional[str] = None,
+    month: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    with_total: bool = True,
+    exact_total: bool = False,
+    fields: Optional[tuple[str, ...]] = None,
+    task_version: Optional[int] = None,
+    search: Optional[TaskSearch] = None
+) -> tuple[list[tuple], Optional[int], Optional[str]]:
+    cache_key = None
+    if search is None:
+        cache_key = tasks_page_cache_key(
+            user_id, status, date, day_group, month, skip, limit, cursor, with_total, exact_total, fields, task_version
+        )
+    cached = cached_tasks_page(cache_key)
+    if cached is not None:
+        return cached
+    
+    filters = build_task_filters(user_id, status, date, day_group, month, search)
+    
+    total = None
+    if with_total:
+        total = db.execute(task_total_query(user_id, status, date, day_group, month, exact_total, search)).scalar()
+    tasks = db.execute(tasks_page_query(filters, skip, limit, cursor, task_list_columns(fields), search)).all()
+    tasks, next_cursor = split_tasks_page(list(tasks), limit, ranked=search is not None)
+    cache_tasks_page(cache_key, tasks, total, next_cursor)
+    
+    return tasks, total, next_cursor
+
+
+# Отсоединяю задачи от сессии до commit: иначе commit сбросит их атрибуты
+# и ответ со списком задач сделает отдельный SELECT на каждую
+def detach_tasks(db: Session, tasks) -> None:
+    for task in tasks:
+        db.expunge(task)
+
+
+# Один UPDATE задачи пользователя с RETURNING: новая строка и статус до изменения (для счетчиков).
+# Старый статус беру из подзапроса с FOR UPDATE - он блокирует строку и читает ее до UPDATE.
+# Задача не найдена или чужая - запрос не вернет строк
+def task_update_statement(task_id: str, user_id: str, values: dict):
+    old = select(Task.id, Task.status).where(
+        Task.id == task_id,
+        Task.user_id == user_id,
+    ).with_for_update().subquery("old")
+    return update(Task).where(Task.id == old.c.id).values(**values).returning(
+        Task, old.c.status.label("old_status")
+    ).execution_options(synchronize_session=False)
+
+
+# Один DELETE задачи пользователя с RETURNING статуса и даты удаленной строки (для счетчиков)
+def task_delete_statement(task_id: str, user_id: str):
+    return delete(Task).where(
+        Task.id == task_id,
+        Task.user_id == user_id,
+    ).returning(Task.id, Task.status, Task.created_at).execution_options(synchronize_session=False)
+
+
+# Обновляю задачу одним UPDATE ... RETURNING, меняю только те поля которые переданы.
+# Счетчики трогаю только если поменялся статус. Без изменений просто отдаю задачу
 def update_task(
     db: Session,
     task_id: str,
     user_id: str,
     task_data: TaskUpdate
 ) -> Optional[Task]:
-    task = get_task_by_id(db, task_id, user_id)
-    if not task:
+    task_id = parse_id(task_id)
+    if task_id is None:
         return None
+    values = task_update_values(task_data)
+    if not values:
+        return get_task_by_id(db, task_id, user_id)
     
-    if task_data.title is not None:
-        task.title = task_data.title
-    if task_data.description is not None:
-        task.description = task_data.description
-    if task_data.status is not None:
-        task.status = TaskStatusEnum(task_data.status.value)
+    row = db.execute(task_update_statement(task_id, user_id, values)).first()
+    if row is None:
+        return None
     
+    task, old_status = row
+    execute_statements(db, task_change_statements(
+        user_id,
+        removed=[(old_status, task.created_at)],
+        added=[(task.status, task.created_at)],
+        kind=EVENT_UPDATED,
+        task_ids=[task.id]
+    ))
+    detach_tasks(db, [task])
     db.commit()
-    db.refresh(task)
+    invalidate_user_tasks(user_id)
     return task
 
 
-# Удаляю задачу пользователя, возвращаю True если удалил
+# Удаляю задачу пользователя одним DELETE ... RETURNING, возвращаю True если удалил
 def delete_task(db: Session, task_id: str, user_id: str) -> bool:
-    task = get_task_by_id(db, task_id, user_id)
-    if not task:
+    task_id = parse_id(task_id)
+    if task_id is None:
+        return False
+    row = db.execute(task_delete_statement(task_id, user_id)).first()
+    if row is None:
         return False
     
-    db.delete(task)
+    execute_statements(db, task_change_statements(
+        user_id, removed=[(row.status, row.created_at)], kind=EVENT_DELETED, task_ids=[row.id]
+    ))
     db.commit()
+    invalidate_user_tasks(user_id)
     return True
 
-# Получаю список доступных дат для фильтрации (даты когда были созданы задачи)
-def get_available_dates(db: Session, user_id: str) -> list[str]:
-    from sqlalchemy import func, cast, Date
+
+# Создаю пакет задач одним INSERT ... RETURNING в одной транзакции вместе со счетчиками
+def create_tasks_batch(db: Session, tasks_data: list[TaskCreate], user_id: str) -> list[tuple]:
+    rows = build_task_rows(tasks_data, user_id)
+    tasks = db.scalars(tasks_insert_statement(), rows).all()
+    execute_statements(db, task_change_statements(
+        user_id,
+        added=[(task.status, task.created_at) for task in tasks],
+        kind=EVENT_CREATED,
+        task_ids=[task.id for task in tasks]
+    ))
+    detach_tasks(db, tasks)
+    db.commit()
+    invalidate_user_tasks(user_id)
+    return [(task.id, BATCH_CREATED, task) for task in tasks]
+
+
+# Обновляю пакет задач в одной транзакции: блокирую задачи одним SELECT ... FOR UPDATE (старые статусы
+# нужны для счетчиков), потом один UPDATE на каждую группу одинаковых изменений.
+# Возвращаю (id, результат, задача) по каждому элементу в порядке запроса
+def update_tasks_batch(db: Session, items: list[TaskBatchUpdateItem], user_id: str) -> list[tuple]:
+    ids = [item.id for item in items]
+    valid = valid_batch_ids(ids)
+    old_rows = {row.id: row for row in db.execute(locked_tasks_query(user_id, list(valid.values())))}
+    existing = {task_id: uuid_id for task_id, uuid_id in valid.items() if uuid_id in old_rows}
+
+    found = {}
+    for values, group_ids in group_task_updates(items, existing).items():
+        if values:
+            tasks = db.scalars(tasks_update_statement(user_id, group_ids, dict(values))).all()
+        else:
+            tasks = db.scalars(tasks_by_ids_query(user_id, group_ids)).all()
+        found.update((task.id, task) for task in tasks)
+
+    execute_statements(db, task_change_statements(
+        user_id,
+        removed=[(old_rows[task_id].status, old_rows[task_id].created_at) for task_id in found],
+        added=[(task.status, task.created_at) for task in found.values()],
+        kind=EVENT_UPDATED,
+        task_ids=list(found)
+    ))
+    detach_tasks(db, found.values())
+    db.commit()
+    invalidate_user_tasks(user_id)
+    return batch_results(ids, valid, found, BATCH_UPDATED)
+
+
+# Удаляю пакет задач одним DELETE ... RETURNING в одной транзакции вместе со счетчиками
+def delete_tasks_batch(db: Session, ids: list[str], user_id: str) -> list[tuple]:
+    valid = valid_batch_ids(ids)
+    deleted = db.execute(tasks_delete_statement(user_id, list(valid.values()))).all() if valid else []
+    execute_statements(db, task_change_statements(
+        user_id,
+        removed=[(row.status, row.created_at) for row in deleted],
+        kind=EVENT_DELETED,
+        task_ids=[row.id for row in deleted]
+    ))
+    db.commit()
+    invalidate_user_tasks(user_id)
+    return batch_results(ids, valid, {row.id: True for row in deleted}, BATCH_DELETED)
+
+
+# Загружаю пачку из TaskImportReader в одной транзакции: COPY во временную таблицу, один INSERT ... SELECT
+# в tasks, счетчики и календарь. Возвращаю отчет по пачке
+def import_tasks_batch(db: Session, batch: ImportBatch, user_id: str) -> dict:
+    if not batch.rows:
+        return import_batch_report(batch, 0)
+    created_at = datetime.utcnow()
+    db.execute(staging_create_statement())
+    with db.connection().connection.driver_connection.cursor() as cursor:
+        with cursor.copy(staging_copy_sql()) as copy:
+            for row in batch.rows:
+                copy.write_row(row)
+    db.execute(staging_insert_statement(user_id, created_at))
+    execute_statements(db, staging_change_statements(user_id, created_at) + task_event_statements(
+        user_id, EVENT_IMPORTED, count=len(batch.rows)
+    ))
+    db.commit()
+    invalidate_user_tasks(user_id)
+    return import_batch_report(batch, len(batch.rows))
+
+
+# Текущая версия задач пользователя для ETag (0 - задачи еще не менялись).
+# Читаю до запроса данных: если изменение попадет между ними, ETag будет старым и следующий запрос получит 200
+def get_task_version(db: Session, user_id: str) -> int:
+    return db.execute(task_version_query(user_id)).scalar() or 0
+
+
+# Запрос уникальных дат создания задач пользователя, сортирую по убыванию
+def available_dates_query(user_id: str):
+    from sqlalchemy import select, cast, Date
     
-    # Получаю уникальные даты из created_at, сортирую по убыванию
-    dates_query = db.query(
+    return select(
         cast(Task.created_at, Date).label('date')
-    ).filter(
+    ).where(
         Task.user_id == user_id
     ).distinct().order_by(
         cast(Task.created_at, Date).desc()
-    ).all()
-    
-    # Форматирую даты в ISO формат (YYYY-MM-DD)
+    )
+
+
+# Форматирую даты в ISO формат (YYYY-MM-DD)
+def format_available_dates(rows) -> list[str]:
     result = []
-    for row in dates_query:
+    for row in rows:
         date_value = row.date if hasattr(row, 'date') else row[0]
         if date_value:
             if hasattr(date_value, 'isoformat'):
@@ -151,26 +725,35 @@ def get_available_dates(db: Session, user_id: str) -> list[str]:
     
     return result
 
-# Получаю список доступных месяцев для фильтрации (месяцы когда были созданы задачи)
-def get_available_months(db: Session, user_id: str) -> list[str]:
-    from sqlalchemy import func, extract
+
+# Получаю список доступных дат для фильтрации (даты когда были созданы задачи).
+# По умолчанию из календаря task_calendar, без него - DISTINCT по всем задачам
+def get_available_dates(db: Session, user_id: str) -> list[str]:
+    if TASK_CALENDAR_ENABLED:
+        return format_calendar_days(db.execute(calendar_buckets_query(user_id, CALENDAR_DAY)).scalars())
+    return format_available_dates(db.execute(available_dates_query(user_id)).all())
+
+
+# Запрос уникальных комбинаций года и месяца, использую extract для совместимости
+def available_months_query(user_id: str):
+    from sqlalchemy import select, extract
     
-    # Получаю уникальные комбинации года и месяца используя extract для совместимости
-    # Сначала получаю задачи, потом группирую по году и месяцу
-    months_query = db.query(
+    return select(
         extract('year', Task.created_at).label('year'),
         extract('month', Task.created_at).label('month')
-    ).filter(
+    ).where(
         Task.user_id == user_id
     ).distinct().order_by(
         extract('year', Task.created_at).desc(),
         extract('month', Task.created_at).desc()
-    ).all()
-    
-    # Форматирую в список строк формата YYYY-MM
+    )
+
+
+# Форматирую в список строк формата YYYY-MM
+def format_available_months(rows) -> list[str]:
     result = []
     seen = set()
-    for row in months_query:
+    for row in rows:
         year = int(row.year) if hasattr(row, 'year') and row.year else int(row[0])
         month = int(row.month) if hasattr(row, 'month') and row.month else int(row[1])
         month_str = f"{year:04d}-{month:02d}"
@@ -180,6 +763,14 @@ def get_available_months(db: Session, user_id: str) -> list[str]:
     
     return result
 
+
+# Получаю список доступных месяцев для фильтрации (месяцы когда были созданы задачи).
+# По умолчанию из календаря task_calendar, без него - DISTINCT по всем задачам
+def get_available_months(db: Session, user_id: str) -> list[str]:
+    if TASK_CALENDAR_ENABLED:
+        return format_calendar_months(db.execute(calendar_buckets_query(user_id, CALENDAR_MONTH)).scalars())
+    return format_available_months(db.execute(available_months_query(user_id)).all())
+
 # TODO(!!! tests): unit-тесты для всех методов сервиса:
 # - создание задачи
 # - получение задачи по ID (с проверкой владельца)
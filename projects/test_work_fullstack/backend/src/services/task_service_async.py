@@ -0,0 +1,316 @@
+# Асинхронные версии функций task_service для режима DB_MODE=async.
+# Фильтры, построение запросов и форматирование общие с sync версией, здесь только выполнение через AsyncSession
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import TASK_CALENDAR_ENABLED, TASK_CACHE_TTL
+from src.core.ids import parse_id
+from src.models.task import Task
+from src.models.task_calendar import CALENDAR_DAY, CALENDAR_MONTH
+from src.models.task_event import EVENT_CREATED, EVENT_UPDATED, EVENT_DELETED, EVENT_IMPORTED
+from src.schemas.task import TaskCreate, TaskUpdate, TaskStatus, TaskBatchUpdateItem
+from src.services.task_service import (
+    build_task,
+    task_update_statement,
+    task_delete_statement,
+    task_change_statements,
+    task_event_statements,
+    build_task_filters,
+    task_total_query,
+    tasks_page_query,
+    task_list_columns,
+    task_row_query,
+    split_tasks_page,
+    CachedTask,
+    task_cache,
+    snapshot_task,
+    task_cache_key,
+    tasks_page_cache_key,
+    cache_tasks_page,
+    cached_tasks_page,
+    invalidate_user_tasks,
+    task_version_query,
+    available_dates_query,
+    format_available_dates,
+    available_months_query,
+    format_available_months,
+)
+from src.services.task_search import TaskSearch
+from src.services.task_calendar import calendar_buckets_query, format_calendar_days, format_calendar_months
+from src.services.task_import import (
+    ImportBatch,
+    staging_create_statement,
+    staging_copy_sql,
+    staging_insert_statement,
+    staging_change_statements,
+    import_batch_report,
+)
+from src.services.task_batch import (
+    BATCH_CREATED,
+    BATCH_UPDATED,
+    BATCH_DELETED,
+    valid_batch_ids,
+    task_update_values,
+    build_task_rows,
+    tasks_insert_statement,
+    locked_tasks_query,
+    group_task_updates,
+    tasks_update_statement,
+    tasks_by_ids_query,
+    tasks_delete_statement,
+    batch_results,
+)
+
+
+# Выполняю запросы из task_change_statements в текущей транзакции
+async def execute_statements(db: AsyncSession, statements: list) -> None:
+    for stmt in statements:
+        await db.execute(stmt)
+
+
+# Создаю новую задачу для пользователя, сохраняю в БД
+async def create_task(db: AsyncSession, task_data: TaskCreate, user_id: str) -> Task:
+    task = build_task(task_data, user_id)
+    db.add(task)
+    # flush - чтобы у задачи появился created_at для счетчиков
+    await db.flush()
+    await execute_statements(db, task_change_statements(
+        user_id, added=[(task.status, task.created_at)], kind=EVENT_CREATED, task_ids=[task.id]
+    ))
+    await db.commit()
+    invalidate_user_tasks(user_id)
+    await db.refresh(task)
+    return task
+
+
+# Получаю задачу по ID, проверяю что она принадлежит пользователю. Не UUID - задачи нет
+async def get_task_by_id(db: AsyncSession, task_id: str, user_id: str) -> Optional[Task]:
+    task_id = parse_id(task_id)
+    if task_id is None:
+        return None
+    result = await db.execute(
+        select(Task).where(Task.id == task_id, Task.user_id == user_id)
+    )
+    return result.scalars().first()
+
+
+# То же самое через кеш: для чтения задачи в роуте. Возвращаю снимок задачи (CachedTask).
+# task_version - версия задач пользователя, если роут ее уже прочитал
+async def get_task_cached(
+    db: AsyncSession,
+    task_id: str,
+    user_id: str,
+    task_version: Optional[int] = None
+) -> Optional[CachedTask]:
+    task_id = parse_id(task_id)
+    if task_id is None:
+        return None
+    key = task_cache_key(user_id, task_id, task_version)
+    if key is not None:
+        cached = task_cache.get(key)
+        if cached is not None:
+            return cached
+
+    task = (await db.execute(task_row_query(task_id, user_id))).first()
+    if task is None:
+        return None
+    cached = snapshot_task(task)
+    if key is not None:
+        task_cache.set(key, cached, TASK_CACHE_TTL)
+    return cached
+
+
+# Получаю страницу задач пользователя, можно отфильтровать по статусу, дате, группе дней или месяцу.
+# Возвращаю строки задач с колонками task_list_columns(fields), total (None если with_total=False)
+# и курсор следующей страницы (None если это последняя). Первую страницу отдаю из кеша, если она там есть
+# (task_version - как в get_task_cached). search - поиск q=, результаты по рангу, их не кеширую
+async def get_tasks(
+    db: AsyncSession,
+    user_id: str,
+    status: Optional[TaskStatus] = None,
+    date: Optional[str] = None,
+    day_group: Optional[str] = None,
+    month: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    with_total: bool = True,
+    exact_total: bool = False,
+    fields: Optional[tuple[str, ...]] = None,
+    task_version: Optional[int] = None,
+    search: Optional[TaskSearch] = None
+) -> tuple[list[tuple], Optional[int], Optional[str]]:
+    cache_key = None
+    if search is None:
+        cache_key = tasks_page_cache_key(
+            user_id, status, date, day_group, month, skip, limit, cursor, with_total, exact_total, fields, task_version
+        )
+    cached = cached_tasks_page(cache_key)
+    if cached is not None:
+        return cached
+
+    filters = build_task_filters(user_id, status, date, day_group, month, search)
+
+    total = None
+    if with_total:
+        total = await db.scalar(task_total_query(user_id, status, date, day_group, month, exact_total, search))
+    result = await db.execute(tasks_page_query(filters, skip, limit, cursor, task_list_columns(fields), search))
+    tasks, next_cursor = split_tasks_page(list(result.all()), limit, ranked=search is not None)
+    cache_tasks_page(cache_key, tasks, total, next_cursor)
+
+    return tasks, total, next_cursor
+
+
+# Обновляю задачу одним UPDATE ... RETURNING, меняю только те поля которые переданы
+async def update_task(
+    db: AsyncSession,
+    task_id: str,
+    user_id: str,
+    task_data: TaskUpdate
+) -> Optional[Task]:
+    task_id = parse_id(task_id)
+    if task_id is None:
+        return None
+    values = task_update_values(task_data)
+    if not values:
+        return await get_task_by_id(db, task_id, user_id)
+
+    row = (await db.execute(task_update_statement(task_id, user_id, values))).first()
+    if row is None:
+        return None
+
+    task, old_status = row
+    await execute_statements(db, task_change_statements(
+        user_id,
+        removed=[(old_status, task.created_at)],
+        added=[(task.status, task.created_at)],
+        kind=EVENT_UPDATED,
+        task_ids=[task.id]
+    ))
+    await db.commit()
+    invalidate_user_tasks(user_id)
+    return task
+
+
+# Удаляю задачу пользователя одним DELETE ... RETURNING, возвращаю True если удалил
+async def delete_task(db: AsyncSession, task_id: str, user_id: str) -> bool:
+    task_id = parse_id(task_id)
+    if task_id is None:
+        return False
+    row = (await db.execute(task_delete_statement(task_id, user_id))).first()
+    if row is None:
+        return False
+
+    await execute_statements(db, task_change_statements(
+        user_id, removed=[(row.status, row.created_at)], kind=EVENT_DELETED, task_ids=[row.id]
+    ))
+    await db.commit()
+    invalidate_user_tasks(user_id)
+    return True
+
+
+# Создаю пакет задач одним INSERT ... RETURNING в одной транзакции вместе со счетчиками
+async def create_tasks_batch(db: AsyncSession, tasks_data: list[TaskCreate], user_id: str) -> list[tuple]:
+    rows = build_task_rows(tasks_data, user_id)
+    tasks = (await db.scalars(tasks_insert_statement(), rows)).all()
+    await execute_statements(db, task_change_statements(
+        user_id,
+        added=[(task.status, task.created_at) for task in tasks],
+        kind=EVENT_CREATED,
+        task_ids=[task.id for task in tasks]
+    ))
+    await db.commit()
+    invalidate_user_tasks(user_id)
+    return [(task.id, BATCH_CREATED, task) for task in tasks]
+
+
+# Обновляю пакет задач в одной транзакции: SELECT ... FOR UPDATE для старых статусов,
+# потом один UPDATE на каждую группу одинаковых изменений
+async def update_tasks_batch(db: AsyncSession, items: list[TaskBatchUpdateItem], user_id: str) -> list[tuple]:
+    ids = [item.id for item in items]
+    valid = valid_batch_ids(ids)
+    result = await db.execute(locked_tasks_query(user_id, list(valid.values())))
+    old_rows = {row.id: row for row in result}
+    existing = {task_id: uuid_id for task_id, uuid_id in valid.items() if uuid_id in old_rows}
+
+    found = {}
+    for values, group_ids in group_task_updates(items, existing).items():
+        if values:
+            tasks = (await db.scalars(tasks_update_statement(user_id, group_ids, dict(values)))).all()
+        else:
+            tasks = (await db.scalars(tasks_by_ids_query(user_id, group_ids))).all()
+        found.update((task.id, task) for task in tasks)
+
+    await execute_statements(db, task_change_statements(
+        user_id,
+        removed=[(old_rows[task_id].status, old_rows[task_id].created_at) for task_id in found],
+        added=[(task.status, task.created_at) for task in found.values()],
+        kind=EVENT_UPDATED,
+        task_ids=list(found)
+    ))
+    await db.commit()
+    invalidate_user_tasks(user_id)
+    return batch_results(ids, valid, found, BATCH_UPDATED)
+
+
+# Удаляю пакет задач одним DELETE ... RETURNING в одной транзакции вместе со счетчиками
+async def delete_tasks_batch(db: AsyncSession, ids: list[str], user_id: str) -> list[tuple]:
+    valid = valid_batch_ids(ids)
+    deleted = (await db.execute(tasks_delete_statement(user_id, list(valid.values())))).all() if valid else []
+    await execute_statements(db, task_change_statements(
+        user_id,
+        removed=[(row.status, row.created_at) for row in deleted],
+        kind=EVENT_DELETED,
+        task_ids=[row.id for row in deleted]
+    ))
+    await db.commit()
+    invalidate_user_tasks(user_id)
+    return batch_results(ids, valid, {row.id: True for row in deleted}, BATCH_DELETED)
+
+
+# Загружаю пачку из TaskImportReader в одной транзакции: COPY во временную таблицу и INSERT ... SELECT.
+# COPY идет через async соединение psycopg под сессией
+async def import_tasks_batch(db: AsyncSession, batch: ImportBatch, user_id: str) -> dict:
+    if not batch.rows:
+        return import_batch_report(batch, 0)
+    created_at = datetime.utcnow()
+    await db.execute(staging_create_statement())
+    connection = await (await db.connection()).get_raw_connection()
+    async with connection.driver_connection.cursor() as cursor:
+        async with cursor.copy(staging_copy_sql()) as copy:
+            for row in batch.rows:
+                await copy.write_row(row)
+    await db.execute(staging_insert_statement(user_id, created_at))
+    await execute_statements(db, staging_change_statements(user_id, created_at) + task_event_statements(
+        user_id, EVENT_IMPORTED, count=len(batch.rows)
+    ))
+    await db.commit()
+    invalidate_user_tasks(user_id)
+    return import_batch_report(batch, len(batch.rows))
+
+
+# Текущая версия задач пользователя для ETag (0 - задачи еще не менялись)
+async def get_task_version(db: AsyncSession, user_id: str) -> int:
+    return await db.scalar(task_version_query(user_id)) or 0
+
+
+# Получаю список доступных дат для фильтрации (даты когда были созданы задачи).
+# По умолчанию из календаря task_calendar, без него - DISTINCT по всем задачам
+async def get_available_dates(db: AsyncSession, user_id: str) -> list[str]:
+    if TASK_CALENDAR_ENABLED:
+        result = await db.execute(calendar_buckets_query(user_id, CALENDAR_DAY))
+        return format_calendar_days(result.scalars())
+    result = await db.execute(available_dates_query(user_id))
+    return format_available_dates(result.all())
+
+
+# Получаю список доступных месяцев для фильтрации (месяцы когда были созданы задачи).
+# По умолчанию из календаря task_calendar, без него - DISTINCT по всем задачам
+async def get_available_months(db: AsyncSession, user_id: str) -> list[str]:
+    if TASK_CALENDAR_ENABLED:
+        result = await db.execute(calendar_buckets_query(user_id, CALENDAR_MONTH))
+        return format_calendar_months(result.scalars())
+    result = await db.execute(available_months_query(user_id))
+    return format_available_months(result.all())
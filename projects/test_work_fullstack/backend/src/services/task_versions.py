@@ -0,0 +1,43 @@
+# Версия задач пользователя (таблица task_versions) и ETag ответов чтения задач.
+# Версия растет в той же транзакции, что и изменение задач, поэтому одинакова для всех воркеров:
+# если клиент прислал ETag с текущей версией, задачи не изменились и можно ответить 304,
+# не выполняя запрос списка и не собирая тело ответа
+import hashlib
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.models.task_version import TaskVersion
+
+
+# Запрос, который увеличивает версию пользователя на 1 (первое изменение создает строку с версией 1)
+def version_bump_statement(user_id: str):
+    stmt = pg_insert(TaskVersion).values(user_id=user_id, version=1)
+    return stmt.on_conflict_do_update(
+        index_elements=[TaskVersion.user_id],
+        set_={"version": TaskVersion.version + 1},
+    )
+
+
+# Запрос текущей версии пользователя. Строки нет - задачи еще не менялись, версия 0
+def task_version_query(user_id: str):
+    return select(TaskVersion.version).where(TaskVersion.user_id == user_id)
+
+
+# Слабый ETag: версия и хеш пользователя и всего, от чего еще зависит тело ответа (путь, параметры).
+# Пользователь в хеше нужен, чтобы после смены пользователя в браузере не совпал ETag с той же версией
+def task_etag(user_id: str, version: int, *parts: str) -> str:
+    digest = hashlib.blake2b("\n".join((user_id, *parts)).encode(), digest_size=8).hexdigest()
+    return f'W/"{version}-{digest}"'
+
+
+# Совпадает ли ETag с заголовком If-None-Match (список ETag через запятую или *).
+# Для GET сравнение слабое: префикс W/ не учитываю
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
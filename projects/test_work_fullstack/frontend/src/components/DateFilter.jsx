@@ -32,13 +32,13 @@ function getDateFilter() {
   return null;
 }
 
-function DateFilter({ selectedDate, selectedDayGroup, selectedMonth, onDateChange, onDayGroupChange, onMonthChange }) {
+function DateFilter({ selectedDate, selectedDayGroup, selectedMonth, onDateChange, onDayGroupChange, onMonthChange, refreshKey }) {
   const [availableDates, setAvailableDates] = useState([]);
   const [availableMonths, setAvailableMonths] = useState([]);
   const [loading, setLoading] = useState(true);
   const [filterType, setFilterType] = useState('none'); // none, day, day_group, month
 
-  // Загружаю доступные даты и месяцы из БД
+  // Загружаю доступные даты и месяцы из БД. refreshKey меняется, когда задачи изменились
   useEffect(() => {
     const loadData = async () => {
       try {
@@ -59,7 +59,7 @@ function DateFilter({ selectedDate, selectedDayGroup, selectedMonth, onDateChang
     };
 
     loadData();
-  }, []);
+  }, [refreshKey]);
 
   // Загружаю сохраненный фильтр из куки при монтировании
   useEffect(() => {
@@ -16,10 +16,15 @@ function TasksPage({ onLogout }) {
   const [dateFilter, setDateFilter] = useState(null);
   const [dayGroupFilter, setDayGroupFilter] = useState(null);
   const [monthFilter, setMonthFilter] = useState(null);
+  // searchInput - текст в поле поиска, searchQuery - то, что ушло на сервер (с задержкой после ввода)
+  const [searchInput, setSearchInput] = useState('');
+  const [searchQuery, setSearchQuery] = useState('');
   const [error, setError] = useState('');
   const [selectedTask, setSelectedTask] = useState(null);
   const [isCreateModalOpen, setIsCreateModalOpen] = useState(false);
   const [userEmail, setUserEmail] = useState('');
+  // Растет при каждом изменении задач из ленты, по нему перезагружаю список и фильтр дат
+  const [changeVersion, setChangeVersion] = useState(0);
 
   // Получаю email пользователя из localStorage
   useEffect(() => {
@@ -39,7 +44,7 @@ function TasksPage({ onLogout }) {
     try {
       setLoading(true);
       setError('');
-      const data = await tasksAPI.getTasks(statusFilter, dateFilter, dayGroupFilter, monthFilter);
+      const data = await tasksAPI.getTasks(statusFilter, dateFilter, dayGroupFilter, monthFilter, searchQuery);
       setTasks(data.tasks || []);
     } catch (err) {
       setError('Ошибка загрузки задач: ' + err.message);
@@ -51,7 +56,18 @@ function TasksPage({ onLogout }) {
   // Перезагружаю задачи при изменении фильтров
   useEffect(() => {
     loadTasks();
-  }, [statusFilter, dateFilter, dayGroupFilter, monthFilter]);
+  }, [statusFilter, dateFilter, dayGroupFilter, monthFilter, searchQuery, changeVersion]);
+
+  // Ищу через 300 мс после последнего нажатия, а не на каждую букву
+  useEffect(() => {
+    const timer = setTimeout(() => setSearchQuery(searchInput.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [searchInput]);
+
+  // Слушаю ленту изменений: задачи, измененные в другой вкладке или через импорт, сразу видны
+  useEffect(() => {
+    return tasksAPI.subscribeTaskChanges(() => setChangeVersion((version) => version + 1));
+  }, []);
 
   // Создаю задачу, потом перезагружаю список
   const handleCreateTask = async (taskData) => {
@@ -152,6 +168,22 @@ function TasksPage({ onLogout }) {
           {/* Фильтры и кнопка создания */}
           <div className="space-y-4">
             <div className="flex flex-col lg:flex-row gap-4 items-start lg:items-end justify-between">
+              {/* Поиск по заголовку и описанию */}
+              <div className="flex-1 w-full sm:w-auto">
+                <label htmlFor="task-search" className="block text-gray-700 text-sm font-bold mb-2">
+                  Поиск
+                </label>
+                <input
+                  id="task-search"
+                  type="search"
+                  value={searchInput}
+                  onChange={(e) => setSearchInput(e.target.value)}
+                  maxLength={200}
+                  placeholder="Название или описание"
+                  className="shadow appearance-none border rounded-xl w-full sm:w-auto min-w-[200px] py-2.5 px-4 text-gray-700 leading-tight focus:outline-none focus:ring-2 focus:ring-blue-500 bg-white transition-all duration-200"
+                />
+              </div>
+
               {/* Фильтр по статусу */}
               <div className="flex-1 w-full sm:w-auto">
                 <label htmlFor="status-filter" className="block text-gray-700 text-sm font-bold mb-2">
@@ -184,6 +216,7 @@ function TasksPage({ onLogout }) {
                 onDateChange={setDateFilter}
                 onDayGroupChange={setDayGroupFilter}
                 onMonthChange={setMonthFilter}
+                refreshKey={changeVersion}
               />
 
               {/* Кнопка создания задачи */}
@@ -215,7 +248,9 @@ function TasksPage({ onLogout }) {
               alt="Нет задач"
               className="w-16 h-16 mx-auto mb-4 opacity-50"
             />
-            <p className="text-gray-600 text-lg">Нет задач. Создайте первую задачу!</p>
+            <p className="text-gray-600 text-lg">
+              {searchQuery ? 'Ничего не найдено' : 'Нет задач. Создайте первую задачу!'}
+            </p>
           </div>
         ) : (
           <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-6">
@@ -79,9 +79,10 @@ export const authAPI = {
 
 // API для задач
 export const tasksAPI = {
-  // Получаю список задач, можно отфильтровать по статусу, дате, группе дней или месяцу
-  async getTasks(status = null, date = null, dayGroup = null, month = null) {
+  // Получаю список задач, можно отфильтровать по статусу, дате, группе дней или месяцу и искать по тексту
+  async getTasks(status = null, date = null, dayGroup = null, month = null, query = null) {
     const params = new URLSearchParams();
+    if (query) params.append('q', query);
     if (status) params.append('status', status);
     if (date) params.append('date', date);
     if (dayGroup) params.append('day_group', dayGroup);
@@ -127,6 +128,62 @@ export const tasksAPI = {
   async getAvailableMonths() {
     return fetchAPI('/tasks/months');
   },
+
+  // Подписываюсь на ленту изменений задач (SSE /tasks/events). EventSource не умеет передавать
+  // заголовок Authorization, поэтому читаю поток через fetch и сам разбираю сообщения.
+  // onEvent получает события ({type: 'created' | 'updated' | 'deleted' | 'imported' | 'reset', ...}).
+  // При обрыве переподключаюсь с последним id, сервер досылает пропущенное.
+  // Возвращаю функцию отписки
+  subscribeTaskChanges(onEvent) {
+    const controller = new AbortController();
+    let lastEventId = null;
+
+    // Разбираю одно сообщение SSE: строки id:, event:, data:. Комментарии (": ping") пропускаю
+    const handleMessage = (message) => {
+      let data = null;
+      for (const line of message.split('\n')) {
+        if (line.startsWith('id:')) lastEventId = line.slice(3).trim();
+        else if (line.startsWith('data:')) data = line.slice(5).trim();
+      }
+      if (data) {
+        const event = JSON.parse(data);
+        if (event.type !== 'ready') onEvent(event);
+      }
+    };
+
+    const connect = async () => {
+      while (!controller.signal.aborted) {
+        try {
+          const token = getToken();
+          const response = await fetch(`${API_BASE_URL}/tasks/events`, {
+            headers: {
+              ...(token && { Authorization: `Bearer ${token}` }),
+              ...(lastEventId && { 'Last-Event-ID': lastEventId }),
+            },
+            signal: controller.signal,
+          });
+          // Лента отключена на сервере или токен невалиден - не переподключаюсь
+          if (response.status === 503 || response.status === 401 || response.status === 403) return;
+          const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+          let buffer = '';
+          for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += value;
+            const messages = buffer.split('\n\n');
+            buffer = messages.pop();
+            messages.forEach(handleMessage);
+          }
+        } catch (err) {
+          if (controller.signal.aborted) return;
+        }
+        await new Promise((resolve) => setTimeout(resolve, 3000));
+      }
+    };
+
+    connect();
+    return () => controller.abort();
+  },
 };
 
 // TODO(!!! tests): unit-тесты для API методов: